@@ -0,0 +1,200 @@
+"""Mood analytics over the full history, computed with NumPy.
+
+Each function loads the columns it needs once, as arrays with one element
+per row, and works on whole arrays instead of looping over ORM objects:
+rolling averages come from cumulative sums over a daily grid, streaks from
+run lengths, and activity impact from ``bincount`` over the activity days.
+Missing values are NaN, so averages and correlations only use the days that
+have them.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+WINDOWS = (7, 30)
+MIN_CORRELATION_PAIRS = 3
+
+def _since(days: Optional[int]) -> Optional[date]:
+    return date.today() - timedelta(days=days - 1) if days else None
+
+def load_mood(db: Session, user_id: int, since: Optional[date] = None) -> dict:
+    """Load the user's mood history as arrays, oldest day first.
+
+    ``day`` is ``datetime64[D]``; the levels and sleep hours are floats with
+    NaN where they were not recorded.
+    """
+    table = models.MoodEntry.__table__
+    query = select(
+        cast(table.c.entry_day, String), table.c.mood_level, table.c.energy_level, table.c.stress_level,
+        table.c.sleep_hours
+    ).where(table.c.user_id == user_id, table.c.entry_day.is_not(None)).order_by(table.c.entry_day)
+    if since:
+        query = query.where(table.c.entry_day >= since)
+    rows = db.execute(query).all()
+    days, mood, energy, stress, sleep = zip(*rows) if rows else ((),) * 5
+    return {
+        "day": np.array(days, dtype="datetime64[D]"),
+        "mood": np.array(mood, dtype=float),
+        "energy": np.array(energy, dtype=float),
+        "stress": np.array(stress, dtype=float),
+        "sleep": np.array(sleep, dtype=float),
+    }
+
+def load_activity_days(db: Session, user_id: int, since: Optional[date] = None):
+    """Load the user's distinct ``(activity_type, day)`` pairs as two arrays."""
+    table = models.WellnessActivity.__table__
+    day = func.date(table.c.date)
+    query = select(table.c.activity_type, day).where(
+        table.c.user_id == user_id, table.c.activity_type.is_not(None)
+    ).distinct()
+    if since:
+        query = query.where(day >= since.isoformat())
+    rows = db.execute(query).all()
+    types, days = zip(*rows) if rows else ((), ())
+    return np.array(types, dtype=object), np.array(days, dtype="datetime64[D]")
+
+def _round(value, digits: int = 2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+def _rounded_list(values: np.ndarray, digits: int = 2) -> list:
+    return [None if value != value else value for value in np.round(values, digits).tolist()]  # NaN != NaN
+
+def _window_means(values: np.ndarray, counts: np.ndarray, window: int) -> np.ndarray:
+    """Mean over the trailing ``window`` days for every day of a daily grid."""
+    value_sums = np.concatenate(([0.0], np.cumsum(values)))
+    count_sums = np.concatenate(([0.0], np.cumsum(counts)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    total = count_sums[end] - count_sums[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (value_sums[end] - value_sums[start]) / total, np.nan)
+
+def rolling_averages(db: Session, user_id: int, days: int = 90) -> list:
+    """Daily mood with its trailing 7- and 30-day means, for the last ``days`` days."""
+    first = date.today() - timedelta(days=days - 1)
+    # The grid starts early enough to fill the longest window of the first day
+    grid_start = first - timedelta(days=max(WINDOWS) - 1)
+    size = days + max(WINDOWS) - 1
+    mood = load_mood(db, user_id, since=grid_start)
+    recorded = ~np.isnan(mood["mood"])
+    offsets = (mood["day"][recorded] - np.datetime64(grid_start, "D")).astype(int)
+    in_grid = offsets < size
+    values = np.bincount(offsets[in_grid], weights=mood["mood"][recorded][in_grid], minlength=size)
+    counts = np.bincount(offsets[in_grid], minlength=size).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(counts > 0, values / counts, np.nan)
+
+    shown = slice(size - days, size)
+    columns = {"mood": _rounded_list(daily[shown])}
+    for window in WINDOWS:
+        columns[f"avg_{window}d"] = _rounded_list(_window_means(values, counts, window)[shown])
+    dates = np.arange(np.datetime64(first, "D"), np.datetime64(first, "D") + days).astype(str).tolist()
+    return [dict(zip(("date", *columns), row)) for row in zip(dates, *columns.values())]
+
+def _runs(flags: np.ndarray):
+    """Length of the trailing run of True values and of the longest run."""
+    breaks = np.flatnonzero(~flags)
+    bounds = np.concatenate(([-1], breaks, [len(flags)]))
+    longest = int(np.max(np.diff(bounds) - 1)) if len(flags) else 0
+    return int(len(flags) - 1 - bounds[-2]), longest
+
+def streaks(db: Session, user_id: int, target_mood: int = 5) -> dict:
+    """Check-in streaks at or above ``target_mood``, and consecutive days logged."""
+    mood = load_mood(db, user_id)
+    recorded = ~np.isnan(mood["mood"])
+    current, longest = _runs(mood["mood"][recorded] >= target_mood)
+
+    days = mood["day"]
+    logging = 0
+    if len(days) and (np.datetime64(date.today(), "D") - days[-1]).astype(int) <= 1:
+        # Consecutive calendar days ending with the latest check-in (today or yesterday)
+        logging, _ = _runs(np.concatenate(([False], np.diff(days).astype(int) == 1)))
+        logging += 1
+    return {"target_mood": target_mood, "current": current, "longest": longest, "logging_days": logging}
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> dict:
+    paired = ~(np.isnan(x) | np.isnan(y))
+    n = int(paired.sum())
+    if n < MIN_CORRELATION_PAIRS:
+        return {"r": None, "n": n}
+    x, y = x[paired] - x[paired].mean(), y[paired] - y[paired].mean()
+    spread = np.sqrt((x * x).sum() * (y * y).sum())
+    return {"r": _round((x * y).sum() / spread, 3) if spread else None, "n": n}
+
+def correlations(db: Session, user_id: int, days: Optional[int] = None) -> dict:
+    """Pearson correlation of mood with sleep, stress and energy, over the last ``days`` days or all history."""
+    mood = load_mood(db, user_id, since=_since(days))
+    return {
+        "sleep_mood": _pearson(mood["sleep"], mood["mood"]),
+        "stress_mood": _pearson(mood["stress"], mood["mood"]),
+        "energy_mood": _pearson(mood["energy"], mood["mood"]),
+    }
+
+def activity_impact(db: Session, user_id: int, days: Optional[int] = None) -> list:
+    """Average mood on days with each activity type compared with the days without it.
+
+    Only days with a mood check-in count. ``impact`` is the difference of the
+    two averages; types are ordered by it, most positive first.
+    """
+    since = _since(days)
+    mood = load_mood(db, user_id, since=since)
+    types, activity_days = load_activity_days(db, user_id, since=since)
+    recorded = ~np.isnan(mood["mood"])
+    mood_days, mood_levels = mood["day"][recorded], mood["mood"][recorded]
+    if not len(mood_days) or not len(types):
+        return []
+
+    names, type_index = np.unique(types, return_inverse=True)
+    position = np.searchsorted(mood_days, activity_days)
+    matched = position < len(mood_days)
+    matched[matched] = mood_days[position[matched]] == activity_days[matched]
+    # One (type, day) pair per row, so each check-in counts at most once per type
+    with_count = np.bincount(type_index[matched], minlength=len(names))
+    with_sum = np.bincount(type_index[matched], weights=mood_levels[position[matched]], minlength=len(names))
+    without_count = len(mood_levels) - with_count
+    without_sum = mood_levels.sum() - with_sum
+    with np.errstate(invalid="ignore", divide="ignore"):
+        with_mean = np.where(with_count > 0, with_sum / with_count, np.nan)
+        without_mean = np.where(without_count > 0, without_sum / without_count, np.nan)
+    impact = with_mean - without_mean
+
+    result = [{
+        "activity_type": name,
+        "days": int(count),
+        "avg_mood_with": _round(mean_with),
+        "avg_mood_without": _round(mean_without),
+        "impact": _round(delta),
+    } for name, count, mean_with, mean_without, delta in zip(names, with_count, with_mean, without_mean, impact)]
+    return sorted(result, key=lambda row: (row["impact"] is None, -(row["impact"] or 0), row["activity_type"]))
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    """Indices of the ``threshold`` points Largest-Triangle-Three-Buckets keeps from a series.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the point kept before it and
+    the average of the next bucket, which preserves peaks and dips.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if np.isnan(y).any():
+        raise ValueError("lttb_indices needs a y value for every point")  # NaN areas would win every argmax
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Buckets for the inner points; bucket i covers [bounds[i], bounds[i + 1])
+    bounds = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+    bounds[-1] = n - 1
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        prev_x, prev_y = x[kept[i]], y[kept[i]]
+        areas = np.abs((prev_x - next_x) * (y[start:end] - prev_y) - (prev_x - x[start:end]) * (next_y - prev_y))
+        kept[i + 1] = start + int(np.argmax(areas))
+    return kept
@@ -0,0 +1,117 @@
+"""Fingerprinted, precompressed static assets.
+
+``python -m app.assets`` copies every file under ``static/`` to
+``static/dist/`` with a hash of its content in the name, e.g.
+``dist/js/app.3f9c2d1e7a.js``, writes ``.gz`` and ``.br`` variants of the
+text files beside it and records the names in ``static/dist/manifest.json``.
+Templates link assets with ``asset_url("js/app.js")``, which returns the
+hashed URL, or the plain one while there is no build (during development).
+
+A hashed name always has the same content, so ``AssetFiles`` serves those
+files with ``Cache-Control: immutable`` and the smallest variant the client
+accepts; browsers keep them for a year without revalidating, and a changed
+file gets a new name. Unhashed files are served with ``no-cache``, i.e.
+revalidated on every use.
+"""
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import os
+import re
+from mimetypes import guess_type
+from pathlib import Path, PurePosixPath
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .compression import accepted_encodings
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST = "dist"
+HASH_LENGTH = 10
+HASHED_NAME = re.compile(r"\.[0-9a-f]{%d}\.\w+$" % HASH_LENGTH)
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".json", ".svg", ".html", ".txt", ".map"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # in order of preference
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def build(static_dir: Path = STATIC_DIR) -> dict:
+    """Write the hashed copies, their compressed variants and the manifest; return the manifest.
+
+    Files from earlier builds are kept, so pages rendered before a deploy can
+    still load the assets they link to.
+    """
+    import brotli  # only needed to build
+
+    dist = static_dir / DIST
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        if not source.is_file() or dist in source.parents:
+            continue
+        content = source.read_bytes()
+        relative = PurePosixPath(source.relative_to(static_dir).as_posix())
+        digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        hashed = relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+        target = dist / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        if relative.suffix in COMPRESSIBLE_SUFFIXES:
+            target.with_name(target.name + ".gz").write_bytes(gzip.compress(content, 9, mtime=0))
+            target.with_name(target.name + ".br").write_bytes(brotli.compress(content, quality=11))
+        manifest[str(relative)] = f"{DIST}/{hashed}"
+    dist.mkdir(exist_ok=True)
+    (dist / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return manifest
+
+@functools.lru_cache(maxsize=None)
+def manifest() -> dict:
+    """Asset paths to their hashed paths, from the last build; empty without one."""
+    try:
+        return json.loads((STATIC_DIR / DIST / "manifest.json").read_text())
+    except FileNotFoundError:
+        return {}
+
+def url(path: str) -> str:
+    """URL of a static asset, e.g. ``url("js/app.js")``; registered as ``asset_url`` in the templates."""
+    return "/static/" + manifest().get(path, path)
+
+class AssetFiles(StaticFiles):
+    """``StaticFiles`` with long-lived caching and precompressed variants for hashed assets."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        full_path = os.fspath(full_path)
+        if not HASHED_NAME.search(full_path):
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+        media_type = guess_type(full_path)[0] or "text/plain"
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted:
+                try:
+                    stat_result = os.stat(full_path + suffix)
+                except FileNotFoundError:
+                    continue
+                full_path += suffix
+                headers["Content-Encoding"] = encoding
+                break
+        response = FileResponse(full_path, status_code=status_code, headers=headers, media_type=media_type,
+                                method=scope["method"], stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the hashed and precompressed static assets.")
+    parser.add_argument("--static-dir", type=Path, default=STATIC_DIR)
+    args = parser.parse_args()
+    for path, hashed in build(args.static_dir).items():
+        print(f"{path} -> {hashed}")
+
+if __name__ == "__main__":
+    main()
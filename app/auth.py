@@ -0,0 +1,138 @@
+"""Accounts and bearer-token authentication.
+
+Passwords are stored as salted PBKDF2-SHA256 hashes and access tokens are
+HS256 JWTs (python-jose) carrying the user id as ``sub``. Endpoints get the
+acting user from ``current_user_id``: the token's user, or the default user
+for requests without a token. The default user owns everything recorded
+before accounts existed, so it only answers anonymous requests while nobody
+has registered (single-user deployments and the web UI keep working), or
+when ``AUTH_REQUIRED=0`` opts into that explicitly.
+"""
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from . import database
+from .config import settings
+from .models import DEFAULT_USER_ID, User
+
+ALGORITHM = "HS256"
+PBKDF2_ITERATIONS = 200_000
+
+_bearer = HTTPBearer(auto_error=False)
+_accounts_exist = False  # accounts are never deleted, so once one is seen this stays set
+
+@functools.lru_cache(maxsize=None)
+def secret_key() -> str:
+    """``SECRET_KEY``, or a generated key shared through a file next to the database.
+
+    Every worker process must sign with the same key, so the first one to
+    start writes it and the others read it back. Loaded once the database is
+    configured, at startup.
+    """
+    if settings.secret_key:
+        return settings.secret_key
+    if database.SQLITE_PATH is None:
+        return secrets.token_urlsafe(32)
+    path = database.SQLITE_PATH + ".secret"
+    candidate = f"{path}.{os.getpid()}"
+    fd = os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(secrets.token_urlsafe(32))
+    try:
+        os.link(candidate, path)  # publishes the complete file, and only if no other worker did first
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(candidate)
+    with open(path) as f:
+        return f.read().strip()
+
+def configure():
+    """Load the signing key and forget what was known about accounts; run at startup."""
+    global _accounts_exist
+    _accounts_exist = False
+    secret_key.cache_clear()
+    secret_key()
+
+def accounts_exist() -> bool:
+    """Whether anyone has registered an account, i.e. there is a user besides the default one."""
+    global _accounts_exist
+    if not _accounts_exist:
+        with database.engine.connect() as connection:
+            _accounts_exist = connection.execute(
+                select(User.id).where(User.id != DEFAULT_USER_ID).limit(1)
+            ).first() is not None
+    return _accounts_exist
+
+async def anonymous_allowed() -> bool:
+    if settings.auth_required is not None:
+        return not settings.auth_required
+    # Another worker may have registered the first account, so ask the database until one is seen
+    return not (_accounts_exist or await run_in_threadpool(accounts_exist))
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    """Encode a password as ``pbkdf2_sha256$iterations$salt$hash``."""
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+def verify_password(password: str, password_hash: Optional[str]) -> bool:
+    try:
+        scheme, iterations, salt, expected = (password_hash or "").split("$")
+    except ValueError:
+        return False
+    if scheme != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(salt), int(iterations))
+    return hmac.compare_digest(digest, _unb64(expected))
+
+def create_access_token(user_id: int, expires_minutes: Optional[int] = None) -> str:
+    expires = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or settings.token_expire_minutes)
+    return jwt.encode({"sub": str(user_id), "exp": expires}, secret_key(), algorithm=ALGORITHM)
+
+def decode_access_token(token: str) -> int:
+    """The user id a token was issued for; raises ``ValueError`` if it is invalid or expired."""
+    try:
+        claims = jwt.decode(token, secret_key(), algorithms=[ALGORITHM])
+        return int(claims["sub"])
+    except (JWTError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid token: {e}") from e
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+async def current_user_id(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> int:
+    """The acting user: the bearer token's, or the default user if none is sent and anonymous use is allowed."""
+    if credentials is None:
+        if not await anonymous_allowed():
+            raise _unauthorized("Not authenticated")
+        return DEFAULT_USER_ID
+    try:
+        return decode_access_token(credentials.credentials)
+    except ValueError:
+        raise _unauthorized("Invalid or expired token")
+
+async def stream_user_id(access_token: Optional[str] = None,
+                         credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> int:
+    """Like ``current_user_id``, but also takes the token as ``?access_token=``: EventSource cannot send headers."""
+    if credentials is None and access_token:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token)
+    return await current_user_id(credentials)
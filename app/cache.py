@@ -0,0 +1,135 @@
+"""In-process response cache for the dashboard endpoints.
+
+Entries live for ``CACHE_TTL`` seconds in a size-bounded LRU and are stamped
+with the data version they were computed from:
+
+* a local generation, bumped after every commit in this process, and
+* SQLite's ``PRAGMA data_version``, which changes when another connection
+  commits, so writes handled by other worker processes also invalidate.
+
+Keys include the user, so users never see each other's responses. ETags
+are a hash of the response body, so they are strong and agree across
+workers and restarts.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    version: tuple
+    expires: float
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+class ResponseCache:
+    def __init__(self, ttl: float, max_entries: int, enabled: bool = True, database_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version_connection = None
+        if enabled and database_path:
+            # Never writes, so its data_version moves with every other connection's commits
+            self._version_connection = sqlite3.connect(database_path, check_same_thread=False)
+
+    def version(self) -> tuple:
+        """The current data version; take it before computing a response."""
+        with self._lock:
+            data_version = None
+            if self._version_connection is not None:
+                data_version = self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+            return self.generation, data_version
+
+    def get(self, key: Hashable, version: tuple) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != version or entry.expires <= time.monotonic()):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, version: tuple) -> CachedResponse:
+        """Wrap a freshly computed body, storing it if the data has not changed meanwhile."""
+        entry = CachedResponse(body, make_etag(body), version, time.monotonic() + self.ttl)
+        if not self.enabled:
+            return entry
+        with self._lock:
+            if version[0] != self.generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def close(self):
+        if self._version_connection is not None:
+            self._version_connection.close()
+            self._version_connection = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+# Replaced at app startup by one that also follows other processes' commits, see configure()
+response_cache = ResponseCache(settings.cache_ttl, settings.cache_max_entries, enabled=settings.cache_enabled)
+
+def configure(database_path: Optional[str]) -> ResponseCache:
+    """Start a fresh ``response_cache`` for the configured database."""
+    global response_cache
+    response_cache.close()
+    response_cache = ResponseCache(settings.cache_ttl, settings.cache_max_entries, enabled=settings.cache_enabled,
+                                   database_path=database_path)
+    return response_cache
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Only the crud write paths commit; reads just close their session
+    response_cache.invalidate()
@@ -0,0 +1,149 @@
+"""Runtime configuration read from environment variables."""
+import os
+from dataclasses import dataclass, fields
+from typing import Optional
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+@dataclass
+class Settings:
+    database_url: str = "sqlite:///./data/mental_health.db"
+    db_async: bool = False  # use AsyncSession on aiosqlite instead of the threadpool
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # SQLite pragmas applied to every new connection
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"  # OFF, NORMAL, FULL or EXTRA
+    sqlite_cache_size: int = -64000  # negative values are KiB, i.e. 64 MiB
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_busy_timeout: int = 5000  # milliseconds
+    sqlite_auto_vacuum: str = "INCREMENTAL"  # NONE, FULL or INCREMENTAL; only takes effect on new databases
+
+    batch_chunk_size: int = 500  # rows per executemany in the batch endpoints
+
+    # Group commit: single-row writes share one transaction, see app/writer.py
+    write_coalescing: bool = False
+    write_batch_ms: int = 5  # longest a write waits for others to join its commit
+    write_batch_max: int = 100  # writes per commit
+
+    # Dashboard response cache
+    cache_enabled: bool = True
+    cache_ttl: int = 60  # seconds
+    cache_max_entries: int = 256
+
+    # Request and SQL metrics on /metrics
+    metrics_enabled: bool = True
+    slow_query_ms: int = 100  # statements at least this slow are logged and counted by fingerprint
+
+    # Authentication. Without a token requests act as the default user until someone registers an
+    # account (unset), always (False, an explicit opt-in to the single-user mode) or never (True)
+    auth_required: Optional[bool] = None
+    secret_key: str = ""  # signs access tokens; generated and kept beside the SQLite file if unset
+    token_expire_minutes: int = 24 * 60
+
+    events_keepalive: int = 15  # seconds between keepalive comments on idle /api/events streams
+    events_max_age: int = 300  # seconds before a stream is closed; clients reconnect and reload
+    # Pass changes on to the streams of the other worker processes; on by default with WEB_CONCURRENCY > 1
+    events_shared: bool = False
+    events_poll_ms: int = 500  # how often each worker looks for changes made by the others
+
+    # Gzip for JSON and HTML responses, see app/compression.py
+    gzip_enabled: bool = True
+    gzip_min_size: int = 1024  # bytes; smaller bodies gain little and cost a compressor
+
+    # Background maintenance, see app/maintenance.py
+    maintenance_enabled: bool = True
+    maintenance_jobs: str = "optimize=3600,vacuum=3600,compact_rollups=21600,integrity_check=86400"  # job=seconds
+    maintenance_idle_ms: int = 200  # quiet time without a new request before each job step
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL", cls.database_url),
+            db_async=env_flag("DB_ASYNC", cls.db_async),
+            db_pool_size=env_int("DB_POOL_SIZE", cls.db_pool_size),
+            db_max_overflow=env_int("DB_MAX_OVERFLOW", cls.db_max_overflow),
+            sqlite_wal=env_flag("SQLITE_WAL", cls.sqlite_wal),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", cls.sqlite_synchronous).upper(),
+            sqlite_cache_size=env_int("SQLITE_CACHE_SIZE", cls.sqlite_cache_size),
+            sqlite_mmap_size=env_int("SQLITE_MMAP_SIZE", cls.sqlite_mmap_size),
+            sqlite_busy_timeout=env_int("SQLITE_BUSY_TIMEOUT", cls.sqlite_busy_timeout),
+            sqlite_auto_vacuum=os.getenv("SQLITE_AUTO_VACUUM", cls.sqlite_auto_vacuum).upper(),
+            batch_chunk_size=max(1, env_int("BATCH_CHUNK_SIZE", cls.batch_chunk_size)),
+            write_coalescing=env_flag("WRITE_COALESCING", cls.write_coalescing),
+            write_batch_ms=max(0, env_int("WRITE_BATCH_MS", cls.write_batch_ms)),
+            write_batch_max=max(1, env_int("WRITE_BATCH_MAX", cls.write_batch_max)),
+            cache_enabled=env_flag("CACHE_ENABLED", cls.cache_enabled),
+            cache_ttl=env_int("CACHE_TTL", cls.cache_ttl),
+            cache_max_entries=max(1, env_int("CACHE_MAX_ENTRIES", cls.cache_max_entries)),
+            metrics_enabled=env_flag("METRICS_ENABLED", cls.metrics_enabled),
+            slow_query_ms=env_int("SLOW_QUERY_MS", cls.slow_query_ms),
+            auth_required=env_flag("AUTH_REQUIRED", cls.auth_required),
+            secret_key=os.getenv("SECRET_KEY", cls.secret_key),
+            token_expire_minutes=env_int("TOKEN_EXPIRE_MINUTES", cls.token_expire_minutes),
+            events_keepalive=max(1, env_int("EVENTS_KEEPALIVE", cls.events_keepalive)),
+            events_max_age=max(1, env_int("EVENTS_MAX_AGE", cls.events_max_age)),
+            events_shared=env_flag("EVENTS_SHARED", env_int("WEB_CONCURRENCY", 1) > 1),
+            events_poll_ms=max(10, env_int("EVENTS_POLL_MS", cls.events_poll_ms)),
+            gzip_enabled=env_flag("GZIP_ENABLED", cls.gzip_enabled),
+            gzip_min_size=max(0, env_int("GZIP_MIN_SIZE", cls.gzip_min_size)),
+            maintenance_enabled=env_flag("MAINTENANCE_ENABLED", cls.maintenance_enabled),
+            maintenance_jobs=os.getenv("MAINTENANCE_JOBS", cls.maintenance_jobs),
+            maintenance_idle_ms=max(0, env_int("MAINTENANCE_IDLE_MS", cls.maintenance_idle_ms)),
+        )
+
+    @property
+    def async_database_url(self) -> str:
+        """The configured URL with the matching asyncio driver."""
+        if self.database_url.startswith("sqlite:"):
+            return self.database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+        return self.database_url
+
+    @property
+    def maintenance_intervals(self) -> dict:
+        """``MAINTENANCE_JOBS`` as job names and their intervals in seconds."""
+        intervals = {}
+        for item in self.maintenance_jobs.split(","):
+            if item.strip():
+                name, _, seconds = item.partition("=")
+                intervals[name.strip()] = int(seconds)
+        return intervals
+
+    @property
+    def sqlite_pragmas(self) -> dict:
+        pragmas = {
+            # Before journal_mode: a new file's auto_vacuum mode is fixed once anything is written to it
+            "auto_vacuum": self.sqlite_auto_vacuum,
+            "synchronous": self.sqlite_synchronous,
+            "cache_size": self.sqlite_cache_size,
+            "mmap_size": self.sqlite_mmap_size,
+            "busy_timeout": self.sqlite_busy_timeout,
+        }
+        if self.sqlite_wal:
+            pragmas["journal_mode"] = "WAL"
+        return pragmas
+
+
+settings = Settings.from_env()
+
+
+def configure(new_settings: Settings) -> Settings:
+    """Make ``new_settings`` the process-wide settings.
+
+    Modules hold on to ``settings`` itself, so its fields are replaced in place.
+    """
+    for field in fields(Settings):
+        setattr(settings, field.name, getattr(new_settings, field.name))
+    return settings
@@ -1,225 +1,695 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
-from . import models, schemas
-from typing import List
-from datetime import datetime, timedelta
+from sqlalchemy import exc, text
+from sqlalchemy import String, cast, column, delete, desc, func, insert, literal, literal_column, select, table, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import analytics, events, models, schemas, rollups, utils
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta, timezone
+import base64
+import html
+import json
+
+# Pagination
+def encode_cursor(key: str, row_id: int) -> str:
+    """Opaque token for the position after the row with this sort key and id."""
+    return base64.urlsafe_b64encode(json.dumps([key, row_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        key, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(key), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _select_fields(model, schema, user_id: int):
+    """Select the user's rows with the columns ``schema`` exposes, in its field order, as plain rows."""
+    table = model.__table__
+    return select(*(table.c[name] for name in schema.model_fields)).where(table.c.user_id == user_id)
+
+def _paginate(db: Session, query, model, key_column, skip: int, limit: int, cursor: Optional[str]):
+    """Newest-first page keyed on ``(key_column, id)``; returns ``(rows, next_cursor)``.
+
+    ``query`` is a Core select (see ``_select_fields``) and the rows are plain
+    dicts, ready to encode without going through ORM objects and Pydantic.
+    With a cursor the page starts with a range seek on the ``(user_id, key)``
+    index instead of skipping rows; ``skip`` (offset mode) is only used
+    without one.
+    """
+    query = query.order_by(desc(key_column), desc(model.id))
+    if cursor:
+        key, row_id = decode_cursor(cursor)
+        # Compare with the stored text so timestamps with and without microseconds order correctly
+        query = query.where(tuple_(key_column, model.id) < tuple_(literal(key, String), row_id))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = [dict(row) for row in db.execute(query.limit(limit + 1)).mappings()]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last_id = rows[-1]["id"]
+    key = db.execute(select(cast(key_column, String)).where(model.id == last_id)).scalar()
+    return rows, encode_cursor(key, last_id)
+
+def _rollup_total(db: Session, user_id: int, field: str) -> int:
+    totals = rollups.get_overall(db, user_id)
+    return totals[field] if totals else 0
+
+def _owned(db: Session, model, user_id: int, row_id: int):
+    """The user's row with this id, or None; other users' rows are never found."""
+    return db.query(model).filter(model.id == row_id, model.user_id == user_id).first()
+
+def _publish_change(db: Session, user_id: int, name: str, action: str, obj, schema):
+    """Send a committed change and the user's new stats to their open ``/api/events`` streams."""
+    if not events.broker.has_subscribers(user_id):
+        return
+    item = {"id": obj.id} if action == "deleted" else schema.model_validate(obj).model_dump()
+    events.record(db, user_id, name, {"action": action, "item": item})
+    events.record(db, user_id, "stats", get_wellness_stats(db, user_id).model_dump())
+
+# Users
+def create_user(db: Session, username: str, password_hash: str):
+    """Create an account; returns None if the username is taken."""
+    try:
+        db_user = models.User(username=username, password_hash=password_hash)
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        return db_user
+    except exc.IntegrityError:
+        db.rollback()
+        return None
+
+def get_user_by_username(db: Session, username: str):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def get_user(db: Session, user_id: int):
+    return db.query(models.User).filter(models.User.id == user_id).first()
 
 # Mood Entry CRUD
-def create_mood_entry(db: Session, mood_entry: schemas.MoodEntryCreate):
+def create_mood_entry(db: Session, user_id: int, mood_entry: schemas.MoodEntryCreate):
+    """Create the user's mood entry for today, or update the fields that were sent if it exists."""
     try:
-        # Check if entry already exists for today
-        today = datetime.now().date()
-        existing = db.query(models.MoodEntry).filter(
-            func.date(models.MoodEntry.date) == today
-        ).first()
-
-        if existing:
-            # Update existing entry
-            for key, value in mood_entry.model_dump(exclude_unset=True).items():
-                setattr(existing, key, value)
-            db.commit()
-            db.refresh(existing)
-            return existing
-
-        # Create new entry
-        db_entry = models.MoodEntry(**mood_entry.model_dump())
-        db.add(db_entry)
+        # entry_day from the same UTC timestamp as date, so get_today_mood_entry finds the row
+        now = _utcnow()
+        stmt = sqlite_insert(models.MoodEntry).values(
+            **mood_entry.model_dump(), user_id=user_id, date=now, entry_day=now.date()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.MoodEntry.user_id, models.MoodEntry.entry_day],
+            set_={key: stmt.excluded[key] for key in mood_entry.model_dump(exclude_unset=True)}
+        ).returning(models.MoodEntry)
+        db_entry = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+        rollups.replace_mood_day(db, db_entry)
+        # RETURNING already loaded every column; detach so the commit doesn't expire them
+        db.expunge(db_entry)
+        events.changed(db, user_id)
         db.commit()
-        db.refresh(db_entry)
+        _publish_change(db, user_id, "mood", "saved", db_entry, schemas.MoodEntry)
         return db_entry
     except Exception as e:
         db.rollback()
         raise e
 
-def get_mood_entries(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.MoodEntry).order_by(desc(models.MoodEntry.date)).offset(skip).limit(limit).all()
+def get_mood_entries(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = _select_fields(models.MoodEntry, schemas.MoodEntry, user_id)
+    return _paginate(db, query, models.MoodEntry, models.MoodEntry.date, skip, limit, cursor)
+
+def count_mood_entries(db: Session, user_id: int) -> int:
+    return _rollup_total(db, user_id, "mood_entries")
 
-def get_mood_entry_by_date(db: Session, date: datetime):
+def get_mood_entry_by_date(db: Session, user_id: int, date: datetime):
     return db.query(models.MoodEntry).filter(
-        func.date(models.MoodEntry.date) == date.date()
+        models.MoodEntry.user_id == user_id, models.MoodEntry.entry_day == date.date()
     ).first()
 
-def update_mood_entry(db: Session, entry_id: int, entry_update: schemas.MoodEntryCreate):
-    db_entry = db.query(models.MoodEntry).filter(models.MoodEntry.id == entry_id).first()
+def get_today_mood_entry(db: Session, user_id: int):
+    """The user's mood entry for the current UTC day, the day create_mood_entry saves to."""
+    return get_mood_entry_by_date(db, user_id, _utcnow())
+
+def update_mood_entry(db: Session, user_id: int, entry_id: int, entry_update: schemas.MoodEntryCreate):
+    db_entry = _owned(db, models.MoodEntry, user_id, entry_id)
     if db_entry:
+        rollups.remove(db, db_entry)
         for key, value in entry_update.model_dump().items():
             setattr(db_entry, key, value)
+        rollups.add(db, db_entry)
+        events.changed(db, user_id)
         db.commit()
         db.refresh(db_entry)
+        _publish_change(db, user_id, "mood", "saved", db_entry, schemas.MoodEntry)
     return db_entry
 
-def delete_mood_entry(db: Session, entry_id: int):
-    db_entry = db.query(models.MoodEntry).filter(models.MoodEntry.id == entry_id).first()
+def delete_mood_entry(db: Session, user_id: int, entry_id: int):
+    db_entry = _owned(db, models.MoodEntry, user_id, entry_id)
     if db_entry:
+        rollups.remove(db, db_entry)
         db.delete(db_entry)
+        events.changed(db, user_id)
         db.commit()
+        _publish_change(db, user_id, "mood", "deleted", db_entry, schemas.MoodEntry)
     return db_entry
 
 # Journal Entry CRUD
-def create_journal_entry(db: Session, journal_entry: schemas.JournalEntryCreate):
-    db_entry = models.JournalEntry(**journal_entry.model_dump())
+def create_journal_entry(db: Session, user_id: int, journal_entry: schemas.JournalEntryCreate):
+    db_entry = models.JournalEntry(**journal_entry.model_dump(), user_id=user_id)
     db.add(db_entry)
+    db.flush()
+    rollups.add(db, db_entry)
+    _sync_tags(db, user_id, db_entry.id, None, db_entry.tags)
+    events.changed(db, user_id)
     db.commit()
     db.refresh(db_entry)
+    _publish_change(db, user_id, "journal", "saved", db_entry, schemas.JournalEntry)
     return db_entry
 
-def get_journal_entries(db: Session, skip: int = 0, limit: int = 100, include_private: bool = True):
-    query = db.query(models.JournalEntry)
+def get_journal_entries(db: Session, user_id: int, skip: int = 0, limit: int = 100, include_private: bool = True,
+                        cursor: Optional[str] = None):
+    query = _select_fields(models.JournalEntry, schemas.JournalEntry, user_id)
     if not include_private:
-        query = query.filter(models.JournalEntry.is_private == False)
-    return query.order_by(desc(models.JournalEntry.date)).offset(skip).limit(limit).all()
+        query = query.where(models.JournalEntry.is_private == False)
+    return _paginate(db, query, models.JournalEntry, models.JournalEntry.date, skip, limit, cursor)
+
+def count_journal_entries(db: Session, user_id: int, include_private: bool = True) -> int:
+    if include_private:
+        return _rollup_total(db, user_id, "journal_entries")
+    return db.query(func.count(models.JournalEntry.id)).filter(
+        models.JournalEntry.user_id == user_id, models.JournalEntry.is_private == False
+    ).scalar()
 
-def get_journal_entry_by_id(db: Session, entry_id: int):
-    return db.query(models.JournalEntry).filter(models.JournalEntry.id == entry_id).first()
+def get_journal_entry_by_id(db: Session, user_id: int, entry_id: int):
+    return _owned(db, models.JournalEntry, user_id, entry_id)
 
-def update_journal_entry(db: Session, entry_id: int, entry_update: schemas.JournalEntryCreate):
-    db_entry = db.query(models.JournalEntry).filter(models.JournalEntry.id == entry_id).first()
+def update_journal_entry(db: Session, user_id: int, entry_id: int, entry_update: schemas.JournalEntryCreate):
+    db_entry = _owned(db, models.JournalEntry, user_id, entry_id)
     if db_entry:
+        rollups.remove(db, db_entry)
+        old_tags = db_entry.tags
         for key, value in entry_update.model_dump().items():
             setattr(db_entry, key, value)
+        rollups.add(db, db_entry)
+        _sync_tags(db, user_id, db_entry.id, old_tags, db_entry.tags)
+        events.changed(db, user_id)
         db.commit()
         db.refresh(db_entry)
+        _publish_change(db, user_id, "journal", "saved", db_entry, schemas.JournalEntry)
     return db_entry
 
-def delete_journal_entry(db: Session, entry_id: int):
-    db_entry = db.query(models.JournalEntry).filter(models.JournalEntry.id == entry_id).first()
+def delete_journal_entry(db: Session, user_id: int, entry_id: int):
+    db_entry = _owned(db, models.JournalEntry, user_id, entry_id)
     if db_entry:
+        rollups.remove(db, db_entry)
+        _sync_tags(db, user_id, db_entry.id, db_entry.tags, None)
         db.delete(db_entry)
+        events.changed(db, user_id)
         db.commit()
+        _publish_change(db, user_id, "journal", "deleted", db_entry, schemas.JournalEntry)
     return db_entry
 
+# Journal tags (normalized copy of JournalEntry.tags with per-user, per-tag entry counts)
+def _link_tags(db: Session, user_id: int, entry_tags: dict):
+    """Link each of the user's entry ids to its tag names, creating tags and counting the new links."""
+    counts = {}
+    for names in entry_tags.values():
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+    if not counts:
+        return
+    tags = models.Tag.__table__
+    stmt = sqlite_insert(tags).values([
+        {"user_id": user_id, "name": name, "entry_count": count} for name, count in counts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tags.c.user_id, tags.c.name], set_={"entry_count": tags.c.entry_count + stmt.excluded.entry_count}
+    ).returning(tags.c.name, tags.c.id)
+    tag_ids = dict(db.execute(stmt).all())
+    db.execute(insert(models.JournalEntryTag.__table__), [
+        {"tag_id": tag_ids[name], "entry_id": entry_id} for entry_id, names in entry_tags.items() for name in names
+    ])
+
+def _unlink_tags(db: Session, user_id: int, entry_id: int, names: List[str]):
+    """Unlink the entry from its tag names, deleting the tags no other entry carries."""
+    tags, links = models.Tag.__table__, models.JournalEntryTag.__table__
+    named = (tags.c.user_id == user_id, tags.c.name.in_(names))
+    db.execute(delete(links).where(links.c.entry_id == entry_id, links.c.tag_id.in_(select(tags.c.id).where(*named))))
+    db.execute(delete(tags).where(*named, tags.c.entry_count <= 1))
+    db.execute(update(tags).where(*named).values(entry_count=tags.c.entry_count - 1))
+
+def _sync_tags(db: Session, user_id: int, entry_id: int, old_tags: Optional[str], new_tags: Optional[str]):
+    old, new = utils.normalize_tags(old_tags), utils.normalize_tags(new_tags)
+    removed = [name for name in old if name not in new]
+    added = [name for name in new if name not in old]
+    if removed:
+        _unlink_tags(db, user_id, entry_id, removed)
+    if added:
+        _link_tags(db, user_id, {entry_id: added})
+
+def _tagged_entry_ids(user_id: int, names: List[str], match_all: bool):
+    # Tags belong to one user, so the links found through them are that user's entries
+    links, tags = models.JournalEntryTag.__table__, models.Tag.__table__
+    query = select(links.c.entry_id).join(tags, tags.c.id == links.c.tag_id).where(
+        tags.c.user_id == user_id, tags.c.name.in_(names)
+    )
+    if match_all:
+        return query.group_by(links.c.entry_id).having(func.count() == len(names))
+    return query.distinct()
+
+def get_journal_entries_by_tags(db: Session, user_id: int, tags: List[str], match_all: bool = False, skip: int = 0,
+                                limit: int = 100, cursor: Optional[str] = None):
+    query = _select_fields(models.JournalEntry, schemas.JournalEntry, user_id).where(
+        models.JournalEntry.id.in_(_tagged_entry_ids(user_id, tags, match_all))
+    )
+    return _paginate(db, query, models.JournalEntry, models.JournalEntry.date, skip, limit, cursor)
+
+def count_journal_entries_by_tags(db: Session, user_id: int, tags: List[str], match_all: bool = False) -> int:
+    return db.execute(
+        select(func.count()).select_from(_tagged_entry_ids(user_id, tags, match_all).subquery())
+    ).scalar()
+
+def get_tag_counts(db: Session, user_id: int, limit: int = 50):
+    return db.query(models.Tag.name, models.Tag.entry_count.label("count")).filter(
+        models.Tag.user_id == user_id, models.Tag.entry_count > 0
+    ).order_by(desc(models.Tag.entry_count), models.Tag.name).limit(limit).all()
+
+# Journal search (FTS5 index kept in sync by triggers, see migrations)
+journal_fts = table("journal_fts", column("rowid"), column("title"), column("content"), column("tags"))
+
+def build_match_query(text: str, prefix: bool = False) -> Optional[str]:
+    """Turn free text into an FTS5 query where every word must match.
+
+    Words are quoted so user input can't inject FTS syntax; a trailing ``*``
+    (or ``prefix=True``) turns a word into a prefix query.
+    """
+    terms = []
+    for word in text.split():
+        is_prefix = prefix or word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if is_prefix else ""))
+    return " ".join(terms) or None
+
+# snippet() and highlight() return the stored text as is; they mark matches with
+# these sentinels, which become <mark> tags once the text has been escaped
+_MARK_START, _MARK_END = "\ue000", "\ue001"
+
+def _marked_html(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    return html.escape(text).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def search_journal_entries(db: Session, user_id: int, query: str, prefix: bool = False,
+                           start_date: Optional[date] = None, end_date: Optional[date] = None,
+                           include_private: bool = True, limit: int = 20):
+    """Rank the user's journal entries matching ``query`` with BM25 (title, content and tags weighted 5:1:2).
+
+    The index is shared by all users, so matches are filtered to the user's
+    entries after the MATCH; BM25 statistics are over the whole index.
+    """
+    match = build_match_query(query, prefix)
+    if match is None:
+        return []
+
+    fts = literal_column("journal_fts")
+    bm25 = func.bm25(fts, 5.0, 1.0, 2.0)
+    results = db.query(
+        models.JournalEntry,
+        bm25.label("rank"),
+        func.snippet(fts, -1, _MARK_START, _MARK_END, "…", 16).label("snippet"),
+        func.highlight(fts, 0, _MARK_START, _MARK_END).label("title_highlight")
+    ).select_from(journal_fts).join(
+        models.JournalEntry, models.JournalEntry.id == journal_fts.c.rowid
+    ).filter(fts.op("MATCH")(match), models.JournalEntry.user_id == user_id)
+
+    if start_date:
+        results = results.filter(models.JournalEntry.date >= datetime.combine(start_date, time.min))
+    if end_date:
+        results = results.filter(models.JournalEntry.date < datetime.combine(end_date, time.min) + timedelta(days=1))
+    if not include_private:
+        results = results.filter(models.JournalEntry.is_private == False)
+
+    return [{
+        "entry": entry,
+        "score": -rank,  # bm25() is lower-is-better
+        "snippet": _marked_html(snippet),
+        "title_highlight": _marked_html(title_highlight)
+    } for entry, rank, snippet, title_highlight in results.order_by(bm25).limit(limit)]
+
 # Wellness Activity CRUD
-def create_wellness_activity(db: Session, activity: schemas.WellnessActivityCreate):
-    db_activity = models.WellnessActivity(**activity.model_dump())
+def create_wellness_activity(db: Session, user_id: int, activity: schemas.WellnessActivityCreate):
+    db_activity = models.WellnessActivity(**activity.model_dump(), user_id=user_id)
     db.add(db_activity)
+    db.flush()
+    rollups.add(db, db_activity)
+    events.changed(db, user_id)
     db.commit()
     db.refresh(db_activity)
+    _publish_change(db, user_id, "activity", "saved", db_activity, schemas.WellnessActivity)
     return db_activity
 
-def get_wellness_activities(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.WellnessActivity).order_by(desc(models.WellnessActivity.date)).offset(skip).limit(limit).all()
+def get_wellness_activities(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = _select_fields(models.WellnessActivity, schemas.WellnessActivity, user_id)
+    return _paginate(db, query, models.WellnessActivity, models.WellnessActivity.date, skip, limit, cursor)
 
-def get_activities_by_type(db: Session, activity_type: str, skip: int = 0, limit: int = 100):
-    return db.query(models.WellnessActivity).filter(
+def get_activities_by_type(db: Session, user_id: int, activity_type: str, skip: int = 0, limit: int = 100,
+                           cursor: Optional[str] = None):
+    query = _select_fields(models.WellnessActivity, schemas.WellnessActivity, user_id).where(
         models.WellnessActivity.activity_type == activity_type
-    ).order_by(desc(models.WellnessActivity.date)).offset(skip).limit(limit).all()
+    )
+    return _paginate(db, query, models.WellnessActivity, models.WellnessActivity.date, skip, limit, cursor)
+
+def count_wellness_activities(db: Session, user_id: int) -> int:
+    return _rollup_total(db, user_id, "activity_count")
 
-def update_wellness_activity(db: Session, activity_id: int, activity_update: schemas.WellnessActivityCreate):
-    db_activity = db.query(models.WellnessActivity).filter(models.WellnessActivity.id == activity_id).first()
+def update_wellness_activity(db: Session, user_id: int, activity_id: int, activity_update: schemas.WellnessActivityCreate):
+    db_activity = _owned(db, models.WellnessActivity, user_id, activity_id)
     if db_activity:
+        rollups.remove(db, db_activity)
         for key, value in activity_update.model_dump().items():
             setattr(db_activity, key, value)
+        rollups.add(db, db_activity)
+        events.changed(db, user_id)
         db.commit()
         db.refresh(db_activity)
+        _publish_change(db, user_id, "activity", "saved", db_activity, schemas.WellnessActivity)
     return db_activity
 
-def delete_wellness_activity(db: Session, activity_id: int):
-    db_activity = db.query(models.WellnessActivity).filter(models.WellnessActivity.id == activity_id).first()
+def delete_wellness_activity(db: Session, user_id: int, activity_id: int):
+    db_activity = _owned(db, models.WellnessActivity, user_id, activity_id)
     if db_activity:
+        rollups.remove(db, db_activity)
         db.delete(db_activity)
+        events.changed(db, user_id)
         db.commit()
+        _publish_change(db, user_id, "activity", "deleted", db_activity, schemas.WellnessActivity)
     return db_activity
 
 # Goal CRUD
-def create_goal(db: Session, goal: schemas.GoalCreate):
-    db_goal = models.Goal(**goal.model_dump())
+def create_goal(db: Session, user_id: int, goal: schemas.GoalCreate):
+    db_goal = models.Goal(**goal.model_dump(), user_id=user_id)
     db.add(db_goal)
+    db.flush()
+    rollups.add(db, db_goal)
+    events.changed(db, user_id)
     db.commit()
     db.refresh(db_goal)
+    _publish_change(db, user_id, "goal", "saved", db_goal, schemas.Goal)
     return db_goal
 
-def get_goals(db: Session, skip: int = 0, limit: int = 100, include_completed: bool = True):
-    query = db.query(models.Goal)
+def get_goals(db: Session, user_id: int, skip: int = 0, limit: int = 100, include_completed: bool = True,
+              cursor: Optional[str] = None):
+    query = _select_fields(models.Goal, schemas.Goal, user_id)
     if not include_completed:
-        query = query.filter(models.Goal.is_completed == False)
-    return query.order_by(desc(models.Goal.created_at)).offset(skip).limit(limit).all()
+        query = query.where(models.Goal.is_completed == False)
+    return _paginate(db, query, models.Goal, models.Goal.created_at, skip, limit, cursor)
 
-def get_goal_by_id(db: Session, goal_id: int):
-    return db.query(models.Goal).filter(models.Goal.id == goal_id).first()
+def count_goals(db: Session, user_id: int, include_completed: bool = True) -> int:
+    active = _rollup_total(db, user_id, "active_goals")
+    return active + _rollup_total(db, user_id, "completed_goals") if include_completed else active
 
-def update_goal(db: Session, goal_id: int, goal_update: dict):
-    db_goal = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
+def get_goal_by_id(db: Session, user_id: int, goal_id: int):
+    return _owned(db, models.Goal, user_id, goal_id)
+
+def update_goal(db: Session, user_id: int, goal_id: int, goal_update: dict):
+    db_goal = _owned(db, models.Goal, user_id, goal_id)
     if db_goal:
+        rollups.remove(db, db_goal)
         for key, value in goal_update.items():
             setattr(db_goal, key, value)
+        rollups.add(db, db_goal)
+        events.changed(db, user_id)
         db.commit()
         db.refresh(db_goal)
+        _publish_change(db, user_id, "goal", "saved", db_goal, schemas.Goal)
     return db_goal
 
-def complete_goal(db: Session, goal_id: int):
-    return update_goal(db, goal_id, {"is_completed": True})
+def complete_goal(db: Session, user_id: int, goal_id: int):
+    return update_goal(db, user_id, goal_id, {"is_completed": True})
 
-def delete_goal(db: Session, goal_id: int):
-    db_goal = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
+def delete_goal(db: Session, user_id: int, goal_id: int):
+    db_goal = _owned(db, models.Goal, user_id, goal_id)
     if db_goal:
+        rollups.remove(db, db_goal)
         db.delete(db_goal)
+        events.changed(db, user_id)
         db.commit()
+        _publish_change(db, user_id, "goal", "deleted", db_goal, schemas.Goal)
     return db_goal
 
-# Statistics and analytics
-def get_wellness_stats(db: Session) -> schemas.WellnessStats:
-    """Get comprehensive wellness statistics."""
+# Batch ingest (one write transaction, one executemany per chunk)
+def _utcnow() -> datetime:
+    # Same clock as the func.now() column defaults: SQLite's CURRENT_TIMESTAMP is UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _dated_rows(user_id: int, items) -> List[dict]:
+    now = _utcnow()
+    rows = [item.model_dump() for item in items]
+    for row in rows:
+        row["user_id"] = user_id
+        row["date"] = row["date"] or now
+    return rows
+
+def _insert_returning_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    table = model.__table__
+    # RETURNING order is unspecified; SQLAlchemy matches the ids back to the rows
+    stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    return db.execute(stmt, rows).scalars().all()
+
+def _insert_mood_chunk(db: Session, user_id: int, items) -> List[int]:
+    rows = _dated_rows(user_id, items)
+    for row in rows:
+        row["entry_day"] = row["date"].date()
+    # Items for the same day replace each other: keep the last one, rather than
+    # leave it to the order SQLite applies (and returns) the upserted rows in
+    by_day = {row["entry_day"]: row for row in rows}
+    table = models.MoodEntry.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.entry_day],
+        set_={key: stmt.excluded[key] for key in rows[0] if key not in ("user_id", "entry_day")}
+    ).returning(*table.c)
+    entries = db.execute(stmt, list(by_day.values())).mappings().all()
+    rollups.replace_mood_days(db, entries)
+    ids = {entry["entry_day"]: entry["id"] for entry in entries}
+    return [ids[row["entry_day"]] for row in rows]
+
+def _insert_journal_chunk(db: Session, user_id: int, items) -> List[int]:
+    rows = _dated_rows(user_id, items)
+    ids = _insert_returning_ids(db, models.JournalEntry, rows)
+    rollups.add_many(db, models.JournalEntry, rows)
+    _link_tags(db, user_id, {entry_id: utils.normalize_tags(row["tags"]) for entry_id, row in zip(ids, rows)})
+    return ids
+
+def _insert_activity_chunk(db: Session, user_id: int, items) -> List[int]:
+    rows = _dated_rows(user_id, items)
+    ids = _insert_returning_ids(db, models.WellnessActivity, rows)
+    rollups.add_many(db, models.WellnessActivity, rows)
+    return ids
+
+def _insert_goal_chunk(db: Session, user_id: int, items) -> List[int]:
+    now = _utcnow()
+    rows = [item.model_dump() for item in items]
+    for row in rows:
+        row["user_id"] = user_id
+        row["start_date"] = row["start_date"] or now
+    ids = _insert_returning_ids(db, models.Goal, rows)
+    rollups.add_many(db, models.Goal, rows)
+    return ids
+
+def _insert_isolated(db: Session, user_id: int, chunk, insert_chunk) -> List[dict]:
+    """Insert ``(index, item)`` pairs for the user in a savepoint and return a result per item.
+
+    If the chunk fails its items are retried one at a time, so only the
+    offending items are reported as errors.
+    """
+    try:
+        with db.begin_nested():
+            ids = insert_chunk(db, user_id, [item for _, item in chunk])
+        return [{"index": index, "status": "created", "id": row_id} for (index, _), row_id in zip(chunk, ids)]
+    except exc.DBAPIError:
+        pass
+    results = []
+    for index, item in chunk:
+        try:
+            with db.begin_nested():
+                [row_id] = insert_chunk(db, user_id, [item])
+            results.append({"index": index, "status": "created", "id": row_id})
+        except exc.DBAPIError as e:
+            results.append({"index": index, "status": "error", "error": str(e.orig)})
+    return results
+
+def _begin_write(db: Session):
+    # Take the write lock up front; savepoints then nest inside this transaction
+    db.execute(text("BEGIN IMMEDIATE"))
+
+def _insert_batch(db: Session, user_id: int, items, insert_chunk, chunk_size: int) -> List[dict]:
+    """Insert ``(index, item)`` pairs chunk by chunk and commit once."""
+    try:
+        _begin_write(db)
+        results = []
+        for offset in range(0, len(items), chunk_size):
+            results.extend(_insert_isolated(db, user_id, items[offset:offset + chunk_size], insert_chunk))
+        events.changed(db, user_id)
+        db.commit()
+        events.record(db, user_id, "resync", {})  # too many rows for deltas; open streams reload instead
+        return results
+    except Exception as e:
+        db.rollback()
+        raise e
 
-    # Mood stats
-    mood_entries = db.query(models.MoodEntry).all()
-    total_entries = len(mood_entries)
+def create_mood_entries_batch(db: Session, user_id: int, items, chunk_size: int = 500) -> List[dict]:
+    """Insert mood check-ins; a later item for the same day replaces the earlier one."""
+    return _insert_batch(db, user_id, items, _insert_mood_chunk, chunk_size)
 
-    avg_mood = None
-    avg_energy = None
-    avg_stress = None
-    avg_sleep = None
+def create_journal_entries_batch(db: Session, user_id: int, items, chunk_size: int = 500) -> List[dict]:
+    return _insert_batch(db, user_id, items, _insert_journal_chunk, chunk_size)
 
-    if mood_entries:
-        moods = [e.mood_level for e in mood_entries if e.mood_level]
-        energies = [e.energy_level for e in mood_entries if e.energy_level]
-        stresses = [e.stress_level for e in mood_entries if e.stress_level]
-        sleeps = [e.sleep_hours for e in mood_entries if e.sleep_hours]
+def create_wellness_activities_batch(db: Session, user_id: int, items, chunk_size: int = 500) -> List[dict]:
+    return _insert_batch(db, user_id, items, _insert_activity_chunk, chunk_size)
 
-        avg_mood = sum(moods) / len(moods) if moods else None
-        avg_energy = sum(energies) / len(energies) if energies else None
-        avg_stress = sum(stresses) / len(stresses) if stresses else None
-        avg_sleep = sum(sleeps) / len(sleeps) if sleeps else None
+def create_goals_batch(db: Session, user_id: int, items, chunk_size: int = 500) -> List[dict]:
+    return _insert_batch(db, user_id, items, _insert_goal_chunk, chunk_size)
 
-    # Journal and activity counts
-    total_journal_entries = db.query(func.count(models.JournalEntry.id)).scalar()
-    total_activities = db.query(func.count(models.WellnessActivity.id)).scalar()
+# Streaming import (one transaction per chunk, with a resumable checkpoint)
+IMPORT_INSERTERS = {
+    "mood": _insert_mood_chunk,
+    "journal": _insert_journal_chunk,
+    "activities": _insert_activity_chunk,
+    "goals": _insert_goal_chunk,
+}
 
-    # Goals
-    completed_goals = db.query(func.count(models.Goal.id)).filter(models.Goal.is_completed == True).scalar()
-    active_goals = db.query(func.count(models.Goal.id)).filter(models.Goal.is_completed == False).scalar()
+def get_import_checkpoint(db: Session, user_id: int, import_id: str):
+    # Read as a plain row: the checkpoint is only ever written with Core upserts
+    table = models.ImportCheckpoint.__table__
+    return db.execute(select(table).where(table.c.user_id == user_id, table.c.id == import_id)).mappings().first()
 
-    return schemas.WellnessStats(
-        total_entries=total_entries,
-        avg_mood=round(avg_mood, 1) if avg_mood else None,
-        avg_energy=round(avg_energy, 1) if avg_energy else None,
-        avg_stress=round(avg_stress, 1) if avg_stress else None,
-        avg_sleep=round(avg_sleep, 1) if avg_sleep else None,
-        total_journal_entries=total_journal_entries,
-        total_activities=total_activities,
-        completed_goals=completed_goals,
-        active_goals=active_goals
-    )
+def import_chunk(db: Session, user_id: int, import_id: str, records, position: int, failed: int,
+                 completed: bool = False) -> List[dict]:
+    """Insert validated ``(index, record_type, item)`` records and advance the checkpoint.
 
-def get_mood_trends(db: Session, days: int = 30):
-    """Get mood trends for the last N days."""
-    start_date = datetime.now() - timedelta(days=days)
+    ``position`` is the number of input records consumed once this chunk is in
+    and ``failed`` the records of the chunk that did not validate. Both are
+    committed with the rows, so a resumed import continues exactly after them.
+    """
+    try:
+        _begin_write(db)
+        by_type = {}
+        for index, record_type, item in records:
+            by_type.setdefault(record_type, []).append((index, item))
+        results = []
+        for record_type, chunk in by_type.items():
+            results.extend(_insert_isolated(db, user_id, chunk, IMPORT_INSERTERS[record_type]))
+        created = sum(result["status"] == "created" for result in results)
+        failed += len(results) - created
+
+        table = models.ImportCheckpoint.__table__
+        stmt = sqlite_insert(table).values(user_id=user_id, id=import_id, position=position, created=created,
+                                           failed=failed, completed=completed, updated_at=func.now())
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.user_id, table.c.id], set_={
+            "position": stmt.excluded.position,
+            "created": table.c.created + stmt.excluded.created,
+            "failed": table.c.failed + stmt.excluded.failed,
+            "completed": stmt.excluded.completed,
+            "updated_at": stmt.excluded.updated_at,
+        })
+        db.execute(stmt)
+        events.changed(db, user_id)
+        db.commit()
+        events.record(db, user_id, "resync", {})
+        return results
+    except Exception as e:
+        db.rollback()
+        raise e
+
+# Statistics and analytics
+def _rounded(value):
+    return round(value, 1) if value else None
 
-    entries = db.query(models.MoodEntry).filter(
-        models.MoodEntry.date >= start_date
-    ).order_by(models.MoodEntry.date).all()
+def get_wellness_stats(db: Session, user_id: int) -> schemas.WellnessStats:
+    """Get comprehensive wellness statistics from the user's overall rollup."""
+    totals = rollups.get_overall(db, user_id)
+    if totals is None:
+        totals = dict.fromkeys(rollups.OVERALL_FIELDS, 0)
 
-    return [{
-        "date": entry.date.strftime("%Y-%m-%d"),
-        "mood": entry.mood_level,
-        "energy": entry.energy_level,
-        "stress": entry.stress_level,
-        "sleep": entry.sleep_hours
-    } for entry in entries]
-
-def get_recent_activities(db: Session, days: int = 7):
+    return schemas.WellnessStats(
+        total_entries=totals["mood_entries"],
+        avg_mood=_rounded(rollups.average(totals, "mood")),
+        avg_energy=_rounded(rollups.average(totals, "energy")),
+        avg_stress=_rounded(rollups.average(totals, "stress")),
+        avg_sleep=_rounded(rollups.average(totals, "sleep")),
+        total_journal_entries=totals["journal_entries"],
+        total_activities=totals["activity_count"],
+        completed_goals=totals["completed_goals"],
+        active_goals=totals["active_goals"]
+    )
+
+TREND_MAX_POINTS = 2000
+
+def get_mood_trends(db: Session, user_id: int, days: int = 30, bucket: str = "day", max_points: Optional[int] = None):
+    """Get mood trends for the last N days, one point per day, week or month.
+
+    Each point has the bucket's averages and the lowest and highest daily
+    average. Longer series are downsampled with LTTB to ``max_points`` (and
+    never more than ``TREND_MAX_POINTS``), keeping the shape of the mood line.
+    """
+    start_day = (datetime.now() - timedelta(days=days)).date()
+    rows = rollups.get_buckets(db, user_id, start_day, bucket)
+    max_points = min(max_points or TREND_MAX_POINTS, TREND_MAX_POINTS)
+    if len(rows) > max_points:
+        # Buckets with only sleep readings, say, have no point on the mood line
+        rows = [row for row in rows if row["mood_count"]]
+    if len(rows) > max_points:
+        days_since = [(date.fromisoformat(row["period"]) - start_day).days for row in rows]
+        moods = [rollups.average(row, "mood") for row in rows]
+        rows = [rows[i] for i in analytics.lttb_indices(days_since, moods, max_points)]
+
+    trends = []
+    for row in rows:
+        point = {"date": row["period"], "entries": row["mood_entries"]}
+        for name in rollups.MEASURES:
+            point[name] = _rounded(rollups.average(row, name))
+            point[f"{name}_min"] = _rounded(row[f"{name}_min"])
+            point[f"{name}_max"] = _rounded(row[f"{name}_max"])
+        trends.append(point)
+    return trends
+
+def get_recent_activities(db: Session, user_id: int, days: int = 7):
     """Get recent wellness activities."""
     start_date = datetime.now() - timedelta(days=days)
 
-    return db.query(models.WellnessActivity).filter(
+    query = _select_fields(models.WellnessActivity, schemas.WellnessActivity, user_id).where(
         models.WellnessActivity.date >= start_date
-    ).order_by(desc(models.WellnessActivity.date)).limit(10).all()
+    ).order_by(desc(models.WellnessActivity.date)).limit(10)
+    return [dict(row) for row in db.execute(query).mappings()]
+
+DASHBOARD_FIELDS = ("stats", "trends", "recent", "mood", "journal", "activities", "goals")
+
+def get_dashboard(db: Session, user_id: int, fields=DASHBOARD_FIELDS, limit: int = 100) -> dict:
+    """Build the requested dashboard panels from one read snapshot.
+
+    The list panels hold the first page of the matching list endpoint, as
+    plain rows like the list endpoints themselves.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # One read transaction for every panel, so they agree with each other
+        db.execute(text("BEGIN"))
+    panels = {}
+    if "stats" in fields:
+        panels["stats"] = get_wellness_stats(db, user_id)
+    if "trends" in fields:
+        panels["trends"] = get_mood_trends(db, user_id, 30)
+    if "recent" in fields:
+        panels["recent"] = get_recent_activities(db, user_id, 7)
+    if "mood" in fields:
+        entries, next_cursor = get_mood_entries(db, user_id, limit=limit)
+        panels["mood"] = {"entries": entries, "total": count_mood_entries(db, user_id), "next_cursor": next_cursor}
+    if "journal" in fields:
+        entries, next_cursor = get_journal_entries(db, user_id, limit=limit)
+        panels["journal"] = {"entries": entries, "total": count_journal_entries(db, user_id), "next_cursor": next_cursor}
+    if "activities" in fields:
+        activities, next_cursor = get_wellness_activities(db, user_id, limit=limit)
+        panels["activities"] = {"activities": activities, "total": count_wellness_activities(db, user_id),
+                                "next_cursor": next_cursor}
+    if "goals" in fields:
+        goals, next_cursor = get_goals(db, user_id, limit=limit)
+        panels["goals"] = {"goals": goals, "total": count_goals(db, user_id), "next_cursor": next_cursor}
+    return panels
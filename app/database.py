@@ -1,26 +1,108 @@
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from .config import settings
 
-# Ensure data directory exists
-DATA_DIR = Path("./data")
-DATA_DIR.mkdir(exist_ok=True)
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/mental_health.db"
+def _pool_args(url: str) -> dict:
+    # In-memory SQLite keeps SQLAlchemy's single-connection pool
+    if make_url(url).get_backend_name() == "sqlite" and not _is_sqlite_file(url):
+        return {}
+    return {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    echo=False
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure every new SQLite connection from the settings."""
+    cursor = dbapi_connection.cursor()
+    for name, value in settings.sqlite_pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+# Set by configure(); importing this module creates no engine and touches no file
+engine = None
+async_engine = None  # only with DB_ASYNC=1
+SQLITE_PATH = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# Results are serialized after the session work is done, so keep them loaded
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def configure():
+    """Create the engines from the settings and bind the session factories to them.
+
+    Run by the app's lifespan in each worker process, after any fork, and by
+    scripts before they open sessions. Engines connect lazily, on first use.
+    """
+    global engine, async_engine, SQLITE_PATH
+    url = settings.database_url
+    SQLITE_PATH = make_url(url).database if _is_sqlite_file(url) else None
+    if SQLITE_PATH is not None:
+        Path(SQLITE_PATH).parent.mkdir(parents=True, exist_ok=True)
+
+    engine = create_engine(url, connect_args={"check_same_thread": False}, echo=False, **_pool_args(url))
+    SessionLocal.configure(bind=engine)
+    async_engine = None
+    if settings.db_async:
+        # aiosqlite file URLs default to NullPool, i.e. a new connection and thread per session
+        async_engine = create_async_engine(
+            settings.async_database_url, poolclass=AsyncAdaptedQueuePool, echo=False, **_pool_args(url)
+        )
+        AsyncSessionLocal.configure(bind=async_engine)
+
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        if async_engine is not None:
+            event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    return engine
+
+async def dispose():
+    """Close the pooled connections of the engines made by ``configure``."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+async def get_session():
+    """Session dependency used by the API handlers: an AsyncSession with DB_ASYNC=1, else a Session."""
+    if async_engine is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = SessionLocal()  # connects on first use, inside the threadpool
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+
+async def run(db, fn, *args, **kwargs):
+    """Await a synchronous crud function without blocking the event loop.
+
+    On an AsyncSession the function runs through ``run_sync`` against the
+    aiosqlite connection; a plain Session is handed to the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def _run_in_new_session(fn, *args, **kwargs):
+    with SessionLocal() as db:
+        return fn(db, *args, **kwargs)
+
+async def run_with_session(fn, *args, **kwargs):
+    """Like ``run``, but opens (and closes) a session just for this call.
+
+    For handlers that often answer without touching the database, where a
+    session dependency would cost an extra threadpool hop per request.
+    """
+    if async_engine is not None:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(_run_in_new_session, fn, *args, **kwargs)
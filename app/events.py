@@ -0,0 +1,205 @@
+"""In-process pub/sub behind the ``/api/events`` Server-Sent Events stream.
+
+The crud write paths call ``record`` once their change is committed, with a
+small delta: the created or updated row, or the id of a deleted one,
+followed by the user's new stat aggregates. Each open stream of that user
+gets the deltas in commit order and patches its state instead of reloading
+lists. Nothing is computed or serialized for users without a stream.
+
+Writes run on threadpool threads, so deltas reach the streams' event loops
+through ``call_soon_threadsafe``. Under group commit (``app/writer.py``) a
+write's ``db.commit()`` only releases its savepoint; its deltas are held in
+``db.info`` and published by the writer once the batch has committed.
+
+Subscribers are per process. With ``EVENTS_SHARED`` (on by default when
+``WEB_CONCURRENCY`` > 1) the write paths also call ``changed`` before they
+commit, which adds a row to the ``event_feed`` table in the same transaction.
+Every worker's ``Relay`` reads the rows the other workers added every
+``EVENTS_POLL_MS`` and sends ``resync`` to the streams of those users, so a
+stream also follows the writes that other workers handled.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional
+
+import orjson
+from sqlalchemy import delete, func, insert, select
+from starlette.concurrency import run_in_threadpool
+
+from . import database, models
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 256  # undelivered messages per stream before it is told to resync
+DEFER_KEY = "deferred_events"
+FEED_RETENTION_SECONDS = 60  # far longer than any worker takes between two polls
+PRUNE_SECONDS = 30
+
+class Subscription:
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def _deliver(self, message: bytes):
+        # Runs on the subscriber's loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A stream that fell this far behind reloads instead of replaying deltas
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event("resync", {}))
+
+    async def get(self, timeout: float):
+        """The next message, or None after ``timeout`` seconds without one."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if self.queue.empty():
+            self.overflowed = False
+        return message
+
+class Broker:
+    def __init__(self):
+        self.published = 0
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, user_id: int, message: bytes):
+        """Send an encoded event to every stream of the user; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        if not subscribers:
+            return
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, message)
+            except RuntimeError:  # the stream's loop has closed
+                self.unsubscribe(subscription)
+        self.published += 1
+
+broker = Broker()
+
+def format_event(name: str, data) -> bytes:
+    return b"event: " + name.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+def record(db, user_id: int, name: str, data):
+    """Publish an event for a committed change, or hold it for the writer if the commit is deferred."""
+    message = format_event(name, data)
+    deferred = db.info.get(DEFER_KEY)
+    if deferred is not None:
+        deferred.append((user_id, message))
+    else:
+        broker.publish(user_id, message)
+
+def publish_all(messages):
+    for user_id, message in messages:
+        broker.publish(user_id, message)
+
+class Relay:
+    """Passes the changes other worker processes committed on to this process's streams, as ``resync``."""
+
+    def __init__(self, poll_ms: int):
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.interval = poll_ms / 1000
+        self.relayed = 0
+        self._last_id = 0
+        self._pruned = 0.0
+        self._task = None
+
+    def note(self, db, user_id: int):
+        table = models.EventFeedEntry.__table__
+        db.execute(insert(table).values(origin=self.origin, user_id=user_id, created_at=time.time()))
+
+    async def start(self):
+        self._last_id = await run_in_threadpool(self._latest)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                user_ids = await run_in_threadpool(self._poll)
+            except Exception:
+                logger.exception("Reading the event feed failed")
+                continue
+            for user_id in user_ids:
+                broker.publish(user_id, format_event("resync", {}))
+                self.relayed += 1
+
+    def _latest(self) -> int:
+        table = models.EventFeedEntry.__table__
+        with database.engine.connect() as connection:
+            return connection.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+
+    def _poll(self) -> set:
+        """The users with changes from other workers since the last poll; also deletes old entries now and then."""
+        table = models.EventFeedEntry.__table__
+        now = time.time()
+        with database.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.id, table.c.origin, table.c.user_id).where(table.c.id > self._last_id)
+                .order_by(table.c.id)
+            ).all()
+            if now - self._pruned >= PRUNE_SECONDS:
+                connection.execute(delete(table).where(table.c.created_at < now - FEED_RETENTION_SECONDS))
+                connection.commit()
+                self._pruned = now
+        if rows:
+            self._last_id = rows[-1].id
+        return {row.user_id for row in rows if row.origin != self.origin and broker.has_subscribers(row.user_id)}
+
+relay: Optional[Relay] = None
+
+def configure() -> Optional[Relay]:
+    """Make a fresh ``relay`` if ``EVENTS_SHARED`` is on (at app startup); the lifespan starts it."""
+    global relay
+    relay = Relay(settings.events_poll_ms) if settings.events_shared else None
+    return relay
+
+def changed(db, user_id: int):
+    """Note a change of the user's data for the other workers' streams; call it before the write commits."""
+    if relay is not None:
+        relay.note(db, user_id)
@@ -0,0 +1,117 @@
+"""Streaming data export in NDJSON and CSV.
+
+Rows are read with Core ``yield_per`` cursors inside one read transaction and
+encoded into fixed-size byte chunks, so memory stays flat however much
+history is exported. NDJSON holds every record type, one JSON object per
+line with a ``type`` field; CSV holds a single record type.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import select
+
+from . import database, models
+from .config import settings
+
+RECORD_TYPES = {
+    "mood": models.MoodEntry,
+    "journal": models.JournalEntry,
+    "activities": models.WellnessActivity,
+    "goals": models.Goal,
+}
+
+# Derived columns that an import recomputes, and the owner, which an import sets to the importing user
+_SKIPPED_COLUMNS = {"entry_day", "user_id"}
+
+YIELD_PER = 1000
+CHUNK_BYTES = 64 * 1024
+
+# A one-pass scan gains nothing from the page cache or mmap, which would
+# otherwise fill up to their configured sizes while exporting
+SCAN_PRAGMAS = {"cache_size": -2000, "mmap_size": 0}
+
+def columns(record_type: str) -> List[str]:
+    table = RECORD_TYPES[record_type].__table__
+    return [column.key for column in table.c if column.key not in _SKIPPED_COLUMNS]
+
+def iter_rows(connection, record_type: str, user_id: int, include_private: bool = True) -> Iterator[dict]:
+    """Yield the user's rows of one record type as plain mappings, oldest id first."""
+    table = RECORD_TYPES[record_type].__table__
+    query = select(*(table.c[name] for name in columns(record_type))).where(table.c.user_id == user_id).order_by(table.c.id)
+    if record_type == "journal" and not include_private:
+        query = query.where(table.c.is_private == False)
+    result = connection.execution_options(yield_per=YIELD_PER).execute(query)
+    for row in result.mappings():
+        yield row
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def ndjson_lines(connection, record_types: Iterable[str], user_id: int, include_private: bool = True) -> Iterator[bytes]:
+    for record_type in record_types:
+        for row in iter_rows(connection, record_type, user_id, include_private):
+            yield (json.dumps({"type": record_type, **row}, default=_json_default) + "\n").encode()
+
+def csv_lines(connection, record_type: str, user_id: int, include_private: bool = True) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns(record_type))
+    for row in iter_rows(connection, record_type, user_id, include_private):
+        writer.writerow(value.isoformat() if isinstance(value, (datetime, date)) else value for value in row.values())
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def _chunked(pieces: Iterable[bytes], size: int = CHUNK_BYTES) -> Iterator[bytes]:
+    # Fewer, larger writes: each chunk is a threadpool hop and a send() for the server
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream(fmt: str, record_types: List[str], user_id: int, include_private: bool = True,
+           compress: bool = False) -> Iterator[bytes]:
+    """Encode the user's export as byte chunks, reading everything from one snapshot.
+
+    Uses its own connection from the sync engine, so the generator can outlive
+    the request's session and works the same with DB_ASYNC.
+    """
+    with database.engine.connect() as connection:
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            for name, value in SCAN_PRAGMAS.items():
+                connection.exec_driver_sql(f"PRAGMA {name}={value}")
+            # One read transaction, so all record types come from the same snapshot
+            connection.exec_driver_sql("BEGIN")
+        try:
+            if fmt == "csv":
+                lines = csv_lines(connection, record_types[0], user_id, include_private)
+            else:
+                lines = ndjson_lines(connection, record_types, user_id, include_private)
+            chunks = _chunked(lines)
+            yield from (_gzipped(chunks) if compress else chunks)
+        finally:
+            connection.rollback()
+            if sqlite:
+                # The connection goes back to the pool
+                for name in SCAN_PRAGMAS:
+                    connection.exec_driver_sql(f"PRAGMA {name}={settings.sqlite_pragmas[name]}")
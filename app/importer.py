@@ -0,0 +1,130 @@
+"""Streaming import of the NDJSON and CSV export formats.
+
+The request body is read incrementally and split into records, which are
+validated with the batch item schemas (the ``*Create`` fields plus the
+original dates) and written one chunk per transaction. Every chunk also
+advances the import's checkpoint, so re-sending an interrupted upload with
+the same ``import_id`` skips the records that were already imported.
+"""
+import csv
+import functools
+import json
+from typing import AsyncIterator, Optional
+
+from . import crud, database, schemas
+
+ITEM_SCHEMAS = {
+    "mood": schemas.MoodEntryBatchItem,
+    "journal": schemas.JournalEntryBatchItem,
+    "activities": schemas.WellnessActivityBatchItem,
+    "goals": schemas.GoalBatchItem,
+}
+
+MAX_REPORTED_ERRORS = 100
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines, keeping the line endings."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8") + "\n"
+    if pending:
+        yield pending.decode("utf-8")
+
+async def iter_raw_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[str]:
+    """Yield one unparsed record at a time: an NDJSON line or a complete CSV row."""
+    record = ""
+    async for line in iter_lines(chunks):
+        if fmt == "ndjson":
+            if line.strip():
+                yield line
+            continue
+        # Quoted CSV fields may span lines; a row is complete once its quotes balance
+        record += line
+        if record.count('"') % 2 == 0:
+            if record.strip():
+                yield record
+            record = ""
+    if record.strip():
+        yield record
+
+@functools.lru_cache(maxsize=None)
+def _required_strings(record_type: Optional[str]) -> frozenset:
+    """Required string fields of the record type, whose empty CSV cells are empty strings rather than missing."""
+    schema = ITEM_SCHEMAS.get(record_type)
+    if schema is None:
+        return frozenset()
+    return frozenset(name for name, field in schema.model_fields.items() if field.is_required() and field.annotation is str)
+
+def parse_record(raw: str, fmt: str, header: Optional[list], record_type: Optional[str]):
+    """Turn a raw record into ``(record_type, validated item)``, raising ValueError if invalid."""
+    if fmt == "csv":
+        [values] = csv.reader([raw])
+        if len(values) != len(header):
+            raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+        # CSV writes None as an empty cell, so elsewhere an empty cell means no value
+        keep = _required_strings(record_type)
+        record = {name: value for name, value in zip(header, values) if value != "" or name in keep}
+    else:
+        record = json.loads(raw)
+        if not isinstance(record, dict):
+            raise ValueError("Expected a JSON object")
+        record_type = record.get("type", record_type)
+    if record_type not in ITEM_SCHEMAS:
+        raise ValueError(f"Unknown record type: {record_type}")
+    return record_type, ITEM_SCHEMAS[record_type].model_validate(record)
+
+async def import_stream(db, user_id: int, chunks: AsyncIterator[bytes], fmt: str, import_id: str,
+                        record_type: Optional[str] = None, chunk_size: int = 500) -> dict:
+    """Import a stream of records for the user, resuming after the import's checkpoint if it has one.
+
+    ``record_type`` is required for CSV and is the default for NDJSON lines
+    without a ``type`` field.
+    """
+    checkpoint = await database.run(db, crud.get_import_checkpoint, user_id, import_id)
+    start = checkpoint["position"] if checkpoint else 0
+    summary = {"import_id": import_id, "resumed_from": start, "errors": []}
+    if checkpoint and checkpoint["completed"]:
+        return _finish(summary, checkpoint)
+
+    errors = summary["errors"]
+
+    def report(result):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(result)
+
+    header = None
+    position = 0
+    records, failed = [], 0
+    async for raw in iter_raw_records(chunks, fmt):
+        if fmt == "csv" and header is None:
+            [header] = csv.reader([raw])
+            continue
+        index = position
+        position += 1
+        if index < start:
+            continue
+        try:
+            found_type, item = parse_record(raw, fmt, header, record_type)
+            records.append((index, found_type, item))
+        except ValueError as e:
+            failed += 1
+            report({"index": index, "status": "error", "error": str(e)})
+        if len(records) + failed >= chunk_size:
+            await _write(db, user_id, import_id, records, position, failed, report)
+            records, failed = [], 0
+
+    await _write(db, user_id, import_id, records, max(position, start), failed, report, completed=True)
+    return _finish(summary, await database.run(db, crud.get_import_checkpoint, user_id, import_id))
+
+async def _write(db, user_id, import_id, records, position, failed, report, completed=False):
+    results = await database.run(db, crud.import_chunk, user_id, import_id, records, position, failed,
+                                 completed=completed)
+    for result in results:
+        if result["status"] == "error":
+            report(result)
+
+def _finish(summary: dict, checkpoint) -> dict:
+    return dict(summary, **{key: checkpoint[key] for key in ("position", "created", "failed", "completed")})
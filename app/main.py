@@ -1,45 +1,104 @@
+"""The web app: routes, and ``create_app`` to build the FastAPI application.
+
+Importing this module only declares routes. Engines, the schema check and
+the caches are set up by the lifespan when the server starts, in every
+worker process. ``app`` is built from the environment's settings, for
+``uvicorn app.main:app``; ``uvicorn --factory app.main:create_app`` or
+``create_app(Settings(...))`` build another.
+"""
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from starlette.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from typing import List
-from . import database, models, schemas, crud, utils
+from typing import List, Optional
+from datetime import date, datetime
+import json
+import time
+import uuid
+import orjson
+from . import (database, schemas, crud, utils, migrations, export, importer, analytics, metrics, auth, writer, events,
+               cache, config, assets, compression, maintenance)
+from .cache import etag_matches
+from .config import Settings, settings
 
 # Determine base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
-STATIC_DIR = BASE_DIR / "static"
+STATIC_DIR = assets.STATIC_DIR
 TEMPLATES_DIR = BASE_DIR / "templates"
 
-app = FastAPI(
-    title="Mental Health Check",
-    description="Track your mood, journal your thoughts, and monitor your wellness journey",
-    version="1.0.0"
-)
+router = APIRouter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine = database.configure()
+    # Request latency and SQL timings, see /metrics
+    if settings.metrics_enabled:
+        metrics.instrument_engine(engine)
+        if database.async_engine is not None:
+            metrics.instrument_engine(database.async_engine.sync_engine)
+    # Create, migrate and backfill the schema if no other worker has yet
+    await run_in_threadpool(migrations.prepare, engine)
+    await run_in_threadpool(auth.configure)
+    cache.configure(database.SQLITE_PATH)
+    writer.configure()
+    assets.manifest.cache_clear()  # pick up a build made since the last start
+    if database.SQLITE_PATH is not None:
+        maintenance.configure().start()
+    # Changes handled by the other workers, for this worker's /api/events streams
+    if events.configure() is not None:
+        await events.relay.start()
+    yield
+    if events.relay is not None:
+        await events.relay.stop()
+    await maintenance.scheduler.stop()
+    # Answer the writes still waiting for their group commit before the server exits
+    await writer.write_queue.drain()
+    cache.response_cache.close()
+    await database.dispose()
 
-# CORS configuration for production
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific domains
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app(app_settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application; ``app_settings`` replace the environment's for the whole process."""
+    if app_settings is not None:
+        config.configure(app_settings)
+    app = FastAPI(
+        title="Mental Health Check",
+        description="Track your mood, journal your thoughts, and monitor your wellness journey",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
 
-# Create database tables
-models.Base.metadata.create_all(bind=database.engine)
+    # CORS configuration for production
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, replace with specific domains
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(maintenance.ActivityMiddleware)
+    if settings.gzip_enabled:
+        app.add_middleware(compression.GZipMiddleware, minimum_size=settings.gzip_min_size)
+    if settings.metrics_enabled:
+        metrics.registry = metrics.Metrics(settings.slow_query_ms / 1000)
+        app.add_middleware(metrics.MetricsMiddleware, router=app.router)
 
-# Mount static files
-if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.include_router(router)
+    if STATIC_DIR.exists():
+        app.mount("/static", assets.AssetFiles(directory=str(STATIC_DIR)), name="static")
+    return app
 
 # Setup templates
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.globals["asset_url"] = assets.url
 
-@app.get("/", response_class=HTMLResponse)
+@router.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     """Serve the main page."""
     try:
@@ -47,69 +106,288 @@ async def read_root(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading page: {str(e)}")
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "Mental Health Check"}
+    return {"status": "healthy", "service": "Mental Health Check", "cache": cache.response_cache.stats(),
+            "maintenance": maintenance.scheduler.stats()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, SQL and cache metrics in the Prometheus text format."""
+    cache_stats = cache.response_cache.stats()
+    body = metrics.registry.render() + "".join(
+        metrics.format_metric(f"response_cache_{name}_total", "counter", f"Dashboard response cache {name}.",
+                              [(f"response_cache_{name}_total", {}, cache_stats[name])])
+        for name in ("hits", "misses", "evictions", "invalidations")
+    ) + metrics.format_metric("response_cache_entries", "gauge", "Entries in the dashboard response cache.",
+                              [("response_cache_entries", {}, cache_stats["entries"])])
+    if settings.write_coalescing:
+        body += metrics.format_metric("write_queue_commits_total", "counter", "Group commits of queued writes.",
+                                      [("write_queue_commits_total", {}, writer.write_queue.batches)])
+        body += metrics.format_metric("write_queue_writes_total", "counter", "Writes committed through the queue.",
+                                      [("write_queue_writes_total", {}, writer.write_queue.writes)])
+    body += metrics.format_metric("event_streams", "gauge", "Open /api/events streams.",
+                                  [("event_streams", {}, events.broker.subscriber_count())])
+    body += metrics.format_metric("events_published_total", "counter", "Events published to open streams.",
+                                  [("events_published_total", {}, events.broker.published)])
+    if events.relay is not None:
+        body += metrics.format_metric("events_relayed_total", "counter",
+                                      "resync events sent for changes handled by other workers.",
+                                      [("events_relayed_total", {}, events.relay.relayed)])
+    body += maintenance.scheduler.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+def _parse_batch(body: bytes, schema):
+    """Validate a JSON array or NDJSON request body item by item.
+
+    Returns the valid ``(index, item)`` pairs and an error result for each
+    item that could not be parsed or validated.
+    """
+    text = body.decode("utf-8")
+    is_array = text.lstrip().startswith("[")
+    records = json.loads(text) if is_array else [line for line in text.splitlines() if line.strip()]
+    items, errors = [], []
+    for index, record in enumerate(records):
+        try:
+            if not is_array:
+                record = json.loads(record)
+            items.append((index, schema.model_validate(record)))
+        except ValueError as e:
+            errors.append({"index": index, "status": "error", "error": str(e)})
+    return items, errors
+
+async def _ingest_batch(request: Request, db, user_id: int, schema, create_batch, label: str):
+    try:
+        items, errors = _parse_batch(await request.body(), schema)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+    try:
+        results = await database.run(db, create_batch, user_id, items,
+                                     chunk_size=settings.batch_chunk_size) if items else []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating {label}: {str(e)}")
+    results = sorted(results + errors, key=lambda result: result["index"])
+    created = sum(result["status"] == "created" for result in results)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+def _list_response(key: str, rows: List[dict], total: Optional[int], next_cursor: Optional[str]) -> Response:
+    """Encode a page of plain rows from crud directly.
+
+    The rows already have the response model's fields, so validating them
+    again through the model would only cost time; ``response_model`` on the
+    list endpoints still documents the shape.
+    """
+    return ORJSONResponse({key: rows, "total": total, "next_cursor": next_cursor})
+
+async def _cached_json(request: Request, user_id: int, fn, *args) -> Response:
+    """Serve the user's ``fn`` result from the response cache, with an ETag and 304 support."""
+    # Trends and recent activity are relative to today, so the day is part of the key
+    key = (user_id, request.url.path, str(request.query_params), date.today())
+    version = cache.response_cache.version()
+    entry = cache.response_cache.get(key, version)
+    hit = entry is not None
+    if not hit:
+        result = await database.run_with_session(fn, user_id, *args)
+        entry = cache.response_cache.put(key, orjson.dumps(result, default=jsonable_encoder), version)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": "HIT" if hit else "MISS"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+# Auth endpoints
+@router.post("/api/auth/register", response_model=schemas.User, status_code=201)
+async def register(user: schemas.UserCreate, db: Session = Depends(database.get_session)):
+    """Create an account."""
+    try:
+        db_user = await database.run(db, crud.create_user, user.username, auth.hash_password(user.password))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
+    if db_user is None:
+        raise HTTPException(status_code=409, detail="Username already taken")
+    return db_user
+
+@router.post("/api/auth/token", response_model=schemas.Token)
+async def login(user: schemas.UserCreate, db: Session = Depends(database.get_session)):
+    """Exchange a username and password for a bearer token."""
+    db_user = await database.run(db, crud.get_user_by_username, user.username)
+    if db_user is None or not auth.verify_password(user.password, db_user.password_hash):
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    return {"access_token": auth.create_access_token(db_user.id), "token_type": "bearer"}
+
+@router.get("/api/auth/me", response_model=schemas.User)
+async def get_current_user(db: Session = Depends(database.get_session), user_id: int = Depends(auth.current_user_id)):
+    """Get the account the request acts as."""
+    db_user = await database.run(db, crud.get_user, user_id)
+    if db_user is None:
+        raise HTTPException(status_code=401, detail="Unknown user", headers={"WWW-Authenticate": "Bearer"})
+    return db_user
 
 # Dashboard endpoints
-@app.get("/api/dashboard/stats")
-async def get_dashboard_stats(db: Session = Depends(database.get_db)):
+@router.get("/api/dashboard")
+async def get_dashboard(request: Request, fields: Optional[str] = None, limit: int = Query(100, ge=1, le=500),
+                        user_id: int = Depends(auth.current_user_id)):
+    """Get several dashboard panels in one response, read from one consistent snapshot.
+
+    `fields` picks panels from stats, trends, recent, mood, journal, activities
+    and goals (all by default); list panels hold the first `limit` rows.
+    """
+    selected = utils.parse_tags(fields) if fields else list(crud.DASHBOARD_FIELDS)
+    unknown = [name for name in selected if name not in crud.DASHBOARD_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dashboard fields: {', '.join(unknown)}")
+    try:
+        return await _cached_json(request, user_id, crud.get_dashboard, tuple(selected), limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching dashboard: {str(e)}")
+
+@router.get("/api/dashboard/stats")
+async def get_dashboard_stats(request: Request, user_id: int = Depends(auth.current_user_id)):
     """Get dashboard statistics."""
     try:
-        return crud.get_wellness_stats(db)
+        return await _cached_json(request, user_id, crud.get_wellness_stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
 
-@app.get("/api/dashboard/trends")
-async def get_mood_trends(db: Session = Depends(database.get_db)):
-    """Get mood trends for the last 30 days."""
+@router.get("/api/dashboard/trends")
+async def get_mood_trends(request: Request, range_: str = Query("30d", alias="range", pattern="^[1-9][0-9]{0,3}[dwmy]$"),
+                          bucket: str = Query("day", pattern="^(day|week|month)$"),
+                          points: Optional[int] = Query(None, ge=3, le=crud.TREND_MAX_POINTS),
+                          user_id: int = Depends(auth.current_user_id)):
+    """Get mood trends over `range` (e.g. 30d, 12w, 6m, 5y), with averages and min/max per day, week or month.
+
+    `points` caps the number of points by downsampling the series (LTTB).
+    """
+    try:
+        days = utils.range_days(range_)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid range: {str(e)}")
     try:
-        return crud.get_mood_trends(db, 30)
+        return await _cached_json(request, user_id, crud.get_mood_trends, days, bucket, points)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching trends: {str(e)}")
 
-@app.get("/api/dashboard/recent")
-async def get_recent_activities(db: Session = Depends(database.get_db)):
+@router.get("/api/dashboard/recent")
+async def get_recent_activities(request: Request, user_id: int = Depends(auth.current_user_id)):
     """Get recent wellness activities."""
     try:
-        return crud.get_recent_activities(db, 7)
+        return await _cached_json(request, user_id, crud.get_recent_activities, 7)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching recent activities: {str(e)}")
 
+# Analytics endpoints
+@router.get("/api/analytics/rolling")
+async def get_rolling_averages(request: Request, days: int = Query(90, ge=1, le=3660),
+                               user_id: int = Depends(auth.current_user_id)):
+    """Get daily mood with its 7- and 30-day rolling averages for the last `days` days."""
+    try:
+        return await _cached_json(request, user_id, analytics.rolling_averages, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing rolling averages: {str(e)}")
+
+@router.get("/api/analytics/streaks")
+async def get_mood_streaks(request: Request, target_mood: int = Query(5, ge=1, le=10),
+                           user_id: int = Depends(auth.current_user_id)):
+    """Get the current and longest streaks of check-ins at or above `target_mood`."""
+    try:
+        return await _cached_json(request, user_id, analytics.streaks, target_mood)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing streaks: {str(e)}")
+
+@router.get("/api/analytics/correlations")
+async def get_mood_correlations(request: Request, days: Optional[int] = Query(None, ge=1),
+                                user_id: int = Depends(auth.current_user_id)):
+    """Get how mood correlates with sleep, stress and energy, over the last `days` days or all history."""
+    try:
+        return await _cached_json(request, user_id, analytics.correlations, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing correlations: {str(e)}")
+
+@router.get("/api/analytics/activity-impact")
+async def get_activity_impact(request: Request, days: Optional[int] = Query(None, ge=1),
+                              user_id: int = Depends(auth.current_user_id)):
+    """Get the average mood on days with each activity type compared with days without it."""
+    try:
+        return await _cached_json(request, user_id, analytics.activity_impact, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing activity impact: {str(e)}")
+
+# Live updates
+@router.get("/api/events")
+async def stream_events(user_id: int = Depends(auth.stream_user_id)):
+    """Server-Sent Events with the user's committed changes.
+
+    `mood`, `journal`, `activity` and `goal` events carry `{"action": "saved",
+    "item": ...}` or `{"action": "deleted", "item": {"id": ...}}`, each followed
+    by a `stats` event with the new dashboard stats. `resync` asks the client
+    to reload (after batch writes, changes handled by another worker process,
+    or if it fell behind). The stream opens with `ready`: load the dashboard
+    then, so no change falls between the two.
+    Streams end after `EVENTS_MAX_AGE` seconds, so that open tabs never hold
+    up a server shutdown for long; EventSource reconnects by itself.
+    """
+    async def stream():
+        subscription = events.broker.subscribe(user_id)
+        deadline = time.monotonic() + settings.events_max_age
+        try:
+            yield b"retry: 3000\n" + events.format_event("ready", {})
+            while (remaining := deadline - time.monotonic()) > 0:
+                message = await subscription.get(min(settings.events_keepalive, remaining))
+                yield message if message is not None else b": keepalive\n\n"
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # Mood endpoints
-@app.post("/api/mood", response_model=schemas.MoodEntry)
-async def create_mood_entry(mood_entry: schemas.MoodEntryCreate, db: Session = Depends(database.get_db)):
+@router.post("/api/mood", response_model=schemas.MoodEntry)
+async def create_mood_entry(mood_entry: schemas.MoodEntryCreate, db: Session = Depends(database.get_session),
+                            user_id: int = Depends(auth.current_user_id)):
     """Create or update today's mood entry."""
     try:
-        return crud.create_mood_entry(db, mood_entry)
+        return await writer.run(db, crud.create_mood_entry, user_id, mood_entry)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating mood entry: {str(e)}")
 
-@app.get("/api/mood", response_model=schemas.MoodEntryList)
-async def get_mood_entries(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    """Get all mood entries."""
+@router.post("/api/mood/batch", response_model=schemas.BatchResult)
+async def create_mood_entries_batch(request: Request, db: Session = Depends(database.get_session),
+                                    user_id: int = Depends(auth.current_user_id)):
+    """Create many mood entries from a JSON array or NDJSON body in one transaction."""
+    return await _ingest_batch(request, db, user_id, schemas.MoodEntryBatchItem, crud.create_mood_entries_batch,
+                               "mood entries")
+
+@router.get("/api/mood", response_model=schemas.MoodEntryList)
+async def get_mood_entries(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include_total: bool = True,
+                           db: Session = Depends(database.get_session), user_id: int = Depends(auth.current_user_id)):
+    """Get mood entries, newest first. Pass `next_cursor` back as `cursor` for the next page."""
     try:
-        entries = crud.get_mood_entries(db, skip=skip, limit=limit)
-        return {"entries": entries, "total": len(entries)}
+        entries, next_cursor = await database.run(db, crud.get_mood_entries, user_id, skip=skip, limit=limit,
+                                                cursor=cursor)
+        total = await database.run(db, crud.count_mood_entries, user_id) if include_total else None
+        return _list_response("entries", entries, total, next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching mood entries: {str(e)}")
 
-@app.get("/api/mood/today")
-async def get_today_mood(db: Session = Depends(database.get_db)):
-    """Get today's mood entry."""
+@router.get("/api/mood/today", response_model=Optional[schemas.MoodEntry])
+async def get_today_mood(db: Session = Depends(database.get_session), user_id: int = Depends(auth.current_user_id)):
+    """Get today's mood entry, or null if there is none yet."""
     try:
-        from datetime import datetime
-        entry = crud.get_mood_entry_by_date(db, datetime.now())
-        return entry or {"message": "No mood entry for today"}
+        entry = await database.run(db, crud.get_today_mood_entry, user_id)
+        if entry is None:
+            return None
+        return schemas.MoodEntry.model_validate(entry)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching today's mood: {str(e)}")
 
-@app.put("/api/mood/{entry_id}", response_model=schemas.MoodEntry)
-async def update_mood_entry(entry_id: int, mood_entry: schemas.MoodEntryCreate, db: Session = Depends(database.get_db)):
+@router.put("/api/mood/{entry_id}", response_model=schemas.MoodEntry)
+async def update_mood_entry(entry_id: int, mood_entry: schemas.MoodEntryCreate, db: Session = Depends(database.get_session),
+                            user_id: int = Depends(auth.current_user_id)):
     """Update a mood entry."""
     try:
-        db_entry = crud.update_mood_entry(db, entry_id, mood_entry)
+        db_entry = await writer.run(db, crud.update_mood_entry, user_id, entry_id, mood_entry)
         if db_entry is None:
             raise HTTPException(status_code=404, detail="Mood entry not found")
         return db_entry
@@ -118,11 +396,12 @@ async def update_mood_entry(entry_id: int, mood_entry: schemas.MoodEntryCreate,
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating mood entry: {str(e)}")
 
-@app.delete("/api/mood/{entry_id}")
-async def delete_mood_entry(entry_id: int, db: Session = Depends(database.get_db)):
+@router.delete("/api/mood/{entry_id}")
+async def delete_mood_entry(entry_id: int, db: Session = Depends(database.get_session),
+                            user_id: int = Depends(auth.current_user_id)):
     """Delete a mood entry."""
     try:
-        db_entry = crud.delete_mood_entry(db, entry_id)
+        db_entry = await writer.run(db, crud.delete_mood_entry, user_id, entry_id)
         if db_entry is None:
             raise HTTPException(status_code=404, detail="Mood entry not found")
         return {"message": "Mood entry deleted successfully"}
@@ -132,28 +411,87 @@ async def delete_mood_entry(entry_id: int, db: Session = Depends(database.get_db
         raise HTTPException(status_code=500, detail=f"Error deleting mood entry: {str(e)}")
 
 # Journal endpoints
-@app.post("/api/journal", response_model=schemas.JournalEntry)
-async def create_journal_entry(journal_entry: schemas.JournalEntryCreate, db: Session = Depends(database.get_db)):
+@router.post("/api/journal", response_model=schemas.JournalEntry)
+async def create_journal_entry(journal_entry: schemas.JournalEntryCreate, db: Session = Depends(database.get_session),
+                               user_id: int = Depends(auth.current_user_id)):
     """Create a new journal entry."""
     try:
-        return crud.create_journal_entry(db, journal_entry)
+        return await writer.run(db, crud.create_journal_entry, user_id, journal_entry)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating journal entry: {str(e)}")
 
-@app.get("/api/journal", response_model=schemas.JournalEntryList)
-async def get_journal_entries(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    """Get all journal entries."""
+@router.post("/api/journal/batch", response_model=schemas.BatchResult)
+async def create_journal_entries_batch(request: Request, db: Session = Depends(database.get_session),
+                                       user_id: int = Depends(auth.current_user_id)):
+    """Create many journal entries from a JSON array or NDJSON body in one transaction."""
+    return await _ingest_batch(request, db, user_id, schemas.JournalEntryBatchItem, crud.create_journal_entries_batch,
+                               "journal entries")
+
+@router.get("/api/journal", response_model=schemas.JournalEntryList)
+async def get_journal_entries(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include_total: bool = True,
+                              db: Session = Depends(database.get_session),
+                              user_id: int = Depends(auth.current_user_id)):
+    """Get journal entries, newest first. Pass `next_cursor` back as `cursor` for the next page."""
     try:
-        entries = crud.get_journal_entries(db, skip=skip, limit=limit)
-        return {"entries": entries, "total": len(entries)}
+        entries, next_cursor = await database.run(db, crud.get_journal_entries, user_id, skip=skip, limit=limit,
+                                                cursor=cursor)
+        total = await database.run(db, crud.count_journal_entries, user_id) if include_total else None
+        return _list_response("entries", entries, total, next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching journal entries: {str(e)}")
 
-@app.get("/api/journal/{entry_id}", response_model=schemas.JournalEntry)
-async def get_journal_entry(entry_id: int, db: Session = Depends(database.get_db)):
+@router.get("/api/journal/search", response_model=schemas.JournalSearchResults)
+async def search_journal_entries(q: str = Query(..., min_length=1), prefix: bool = False,
+                                 start_date: Optional[date] = None, end_date: Optional[date] = None,
+                                 include_private: bool = True, limit: int = Query(20, ge=1, le=100),
+                                 db: Session = Depends(database.get_session),
+                                 user_id: int = Depends(auth.current_user_id)):
+    """Full-text search over journal titles, content and tags, best matches first."""
+    try:
+        results = await database.run(db, crud.search_journal_entries, user_id, q, prefix=prefix, start_date=start_date,
+                                     end_date=end_date, include_private=include_private, limit=limit)
+        return {"results": results, "query": q}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching journal entries: {str(e)}")
+
+@router.get("/api/journal/tags", response_model=schemas.TagCountList)
+async def get_journal_tags(limit: int = Query(50, ge=1, le=500), db: Session = Depends(database.get_session),
+                           user_id: int = Depends(auth.current_user_id)):
+    """Get the most used journal tags with their entry counts."""
+    try:
+        return {"tags": await database.run(db, crud.get_tag_counts, user_id, limit=limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching journal tags: {str(e)}")
+
+@router.get("/api/journal/tagged", response_model=schemas.JournalEntryList)
+async def get_journal_entries_by_tags(tags: str = Query(..., min_length=1), match: str = Query("any", pattern="^(any|all)$"),
+                                      skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                                      include_total: bool = True, db: Session = Depends(database.get_session),
+                                      user_id: int = Depends(auth.current_user_id)):
+    """Get journal entries carrying any (or all) of the comma-separated tags, newest first."""
+    names = utils.normalize_tags(tags)
+    if not names:
+        raise HTTPException(status_code=400, detail="No tags given")
+    try:
+        match_all = match == "all"
+        entries, next_cursor = await database.run(db, crud.get_journal_entries_by_tags, user_id, names,
+                                                  match_all=match_all, skip=skip, limit=limit, cursor=cursor)
+        total = await database.run(db, crud.count_journal_entries_by_tags, user_id, names,
+                                   match_all=match_all) if include_total else None
+        return _list_response("entries", entries, total, next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching tagged journal entries: {str(e)}")
+
+@router.get("/api/journal/{entry_id}", response_model=schemas.JournalEntry)
+async def get_journal_entry(entry_id: int, db: Session = Depends(database.get_session),
+                            user_id: int = Depends(auth.current_user_id)):
     """Get a specific journal entry."""
     try:
-        entry = crud.get_journal_entry_by_id(db, entry_id)
+        entry = await database.run(db, crud.get_journal_entry_by_id, user_id, entry_id)
         if entry is None:
             raise HTTPException(status_code=404, detail="Journal entry not found")
         return entry
@@ -162,11 +500,12 @@ async def get_journal_entry(entry_id: int, db: Session = Depends(database.get_db
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching journal entry: {str(e)}")
 
-@app.put("/api/journal/{entry_id}", response_model=schemas.JournalEntry)
-async def update_journal_entry(entry_id: int, journal_entry: schemas.JournalEntryCreate, db: Session = Depends(database.get_db)):
+@router.put("/api/journal/{entry_id}", response_model=schemas.JournalEntry)
+async def update_journal_entry(entry_id: int, journal_entry: schemas.JournalEntryCreate, db: Session = Depends(database.get_session),
+                               user_id: int = Depends(auth.current_user_id)):
     """Update a journal entry."""
     try:
-        db_entry = crud.update_journal_entry(db, entry_id, journal_entry)
+        db_entry = await writer.run(db, crud.update_journal_entry, user_id, entry_id, journal_entry)
         if db_entry is None:
             raise HTTPException(status_code=404, detail="Journal entry not found")
         return db_entry
@@ -175,11 +514,12 @@ async def update_journal_entry(entry_id: int, journal_entry: schemas.JournalEntr
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating journal entry: {str(e)}")
 
-@app.delete("/api/journal/{entry_id}")
-async def delete_journal_entry(entry_id: int, db: Session = Depends(database.get_db)):
+@router.delete("/api/journal/{entry_id}")
+async def delete_journal_entry(entry_id: int, db: Session = Depends(database.get_session),
+                               user_id: int = Depends(auth.current_user_id)):
     """Delete a journal entry."""
     try:
-        db_entry = crud.delete_journal_entry(db, entry_id)
+        db_entry = await writer.run(db, crud.delete_journal_entry, user_id, entry_id)
         if db_entry is None:
             raise HTTPException(status_code=404, detail="Journal entry not found")
         return {"message": "Journal entry deleted successfully"}
@@ -189,28 +529,43 @@ async def delete_journal_entry(entry_id: int, db: Session = Depends(database.get
         raise HTTPException(status_code=500, detail=f"Error deleting journal entry: {str(e)}")
 
 # Wellness Activity endpoints
-@app.post("/api/activities", response_model=schemas.WellnessActivity)
-async def create_wellness_activity(activity: schemas.WellnessActivityCreate, db: Session = Depends(database.get_db)):
+@router.post("/api/activities", response_model=schemas.WellnessActivity)
+async def create_wellness_activity(activity: schemas.WellnessActivityCreate, db: Session = Depends(database.get_session),
+                                   user_id: int = Depends(auth.current_user_id)):
     """Create a new wellness activity."""
     try:
-        return crud.create_wellness_activity(db, activity)
+        return await writer.run(db, crud.create_wellness_activity, user_id, activity)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating wellness activity: {str(e)}")
 
-@app.get("/api/activities", response_model=schemas.WellnessActivityList)
-async def get_wellness_activities(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    """Get all wellness activities."""
+@router.post("/api/activities/batch", response_model=schemas.BatchResult)
+async def create_wellness_activities_batch(request: Request, db: Session = Depends(database.get_session),
+                                           user_id: int = Depends(auth.current_user_id)):
+    """Create many wellness activities from a JSON array or NDJSON body in one transaction."""
+    return await _ingest_batch(request, db, user_id, schemas.WellnessActivityBatchItem, crud.create_wellness_activities_batch,
+                               "activities")
+
+@router.get("/api/activities", response_model=schemas.WellnessActivityList)
+async def get_wellness_activities(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include_total: bool = True,
+                                  db: Session = Depends(database.get_session),
+                                  user_id: int = Depends(auth.current_user_id)):
+    """Get wellness activities, newest first. Pass `next_cursor` back as `cursor` for the next page."""
     try:
-        activities = crud.get_wellness_activities(db, skip=skip, limit=limit)
-        return {"activities": activities, "total": len(activities)}
+        activities, next_cursor = await database.run(db, crud.get_wellness_activities, user_id, skip=skip, limit=limit,
+                                                   cursor=cursor)
+        total = await database.run(db, crud.count_wellness_activities, user_id) if include_total else None
+        return _list_response("activities", activities, total, next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching wellness activities: {str(e)}")
 
-@app.put("/api/activities/{activity_id}", response_model=schemas.WellnessActivity)
-async def update_wellness_activity(activity_id: int, activity: schemas.WellnessActivityCreate, db: Session = Depends(database.get_db)):
+@router.put("/api/activities/{activity_id}", response_model=schemas.WellnessActivity)
+async def update_wellness_activity(activity_id: int, activity: schemas.WellnessActivityCreate, db: Session = Depends(database.get_session),
+                                   user_id: int = Depends(auth.current_user_id)):
     """Update a wellness activity."""
     try:
-        db_activity = crud.update_wellness_activity(db, activity_id, activity)
+        db_activity = await writer.run(db, crud.update_wellness_activity, user_id, activity_id, activity)
         if db_activity is None:
             raise HTTPException(status_code=404, detail="Wellness activity not found")
         return db_activity
@@ -219,11 +574,12 @@ async def update_wellness_activity(activity_id: int, activity: schemas.WellnessA
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating wellness activity: {str(e)}")
 
-@app.delete("/api/activities/{activity_id}")
-async def delete_wellness_activity(activity_id: int, db: Session = Depends(database.get_db)):
+@router.delete("/api/activities/{activity_id}")
+async def delete_wellness_activity(activity_id: int, db: Session = Depends(database.get_session),
+                                   user_id: int = Depends(auth.current_user_id)):
     """Delete a wellness activity."""
     try:
-        db_activity = crud.delete_wellness_activity(db, activity_id)
+        db_activity = await writer.run(db, crud.delete_wellness_activity, user_id, activity_id)
         if db_activity is None:
             raise HTTPException(status_code=404, detail="Wellness activity not found")
         return {"message": "Wellness activity deleted successfully"}
@@ -233,28 +589,42 @@ async def delete_wellness_activity(activity_id: int, db: Session = Depends(datab
         raise HTTPException(status_code=500, detail=f"Error deleting wellness activity: {str(e)}")
 
 # Goal endpoints
-@app.post("/api/goals", response_model=schemas.Goal)
-async def create_goal(goal: schemas.GoalCreate, db: Session = Depends(database.get_db)):
+@router.post("/api/goals", response_model=schemas.Goal)
+async def create_goal(goal: schemas.GoalCreate, db: Session = Depends(database.get_session),
+                      user_id: int = Depends(auth.current_user_id)):
     """Create a new wellness goal."""
     try:
-        return crud.create_goal(db, goal)
+        return await writer.run(db, crud.create_goal, user_id, goal)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating goal: {str(e)}")
 
-@app.get("/api/goals", response_model=schemas.GoalList)
-async def get_goals(include_completed: bool = True, skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    """Get all wellness goals."""
+@router.post("/api/goals/batch", response_model=schemas.BatchResult)
+async def create_goals_batch(request: Request, db: Session = Depends(database.get_session),
+                             user_id: int = Depends(auth.current_user_id)):
+    """Create many goals from a JSON array or NDJSON body in one transaction."""
+    return await _ingest_batch(request, db, user_id, schemas.GoalBatchItem, crud.create_goals_batch, "goals")
+
+@router.get("/api/goals", response_model=schemas.GoalList)
+async def get_goals(include_completed: bool = True, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                    include_total: bool = True, db: Session = Depends(database.get_session),
+                    user_id: int = Depends(auth.current_user_id)):
+    """Get wellness goals, newest first. Pass `next_cursor` back as `cursor` for the next page."""
     try:
-        goals = crud.get_goals(db, skip=skip, limit=limit, include_completed=include_completed)
-        return {"goals": goals, "total": len(goals)}
+        goals, next_cursor = await database.run(db, crud.get_goals, user_id, skip=skip, limit=limit,
+                                                include_completed=include_completed, cursor=cursor)
+        total = await database.run(db, crud.count_goals, user_id, include_completed) if include_total else None
+        return _list_response("goals", goals, total, next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching goals: {str(e)}")
 
-@app.get("/api/goals/{goal_id}", response_model=schemas.Goal)
-async def get_goal(goal_id: int, db: Session = Depends(database.get_db)):
+@router.get("/api/goals/{goal_id}", response_model=schemas.Goal)
+async def get_goal(goal_id: int, db: Session = Depends(database.get_session),
+                   user_id: int = Depends(auth.current_user_id)):
     """Get a specific goal."""
     try:
-        goal = crud.get_goal_by_id(db, goal_id)
+        goal = await database.run(db, crud.get_goal_by_id, user_id, goal_id)
         if goal is None:
             raise HTTPException(status_code=404, detail="Goal not found")
         return goal
@@ -263,11 +633,12 @@ async def get_goal(goal_id: int, db: Session = Depends(database.get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching goal: {str(e)}")
 
-@app.put("/api/goals/{goal_id}/progress")
-async def update_goal_progress(goal_id: int, current_value: float, db: Session = Depends(database.get_db)):
+@router.put("/api/goals/{goal_id}/progress")
+async def update_goal_progress(goal_id: int, current_value: float, db: Session = Depends(database.get_session),
+                               user_id: int = Depends(auth.current_user_id)):
     """Update goal progress."""
     try:
-        goal = crud.update_goal(db, goal_id, {"current_value": current_value})
+        goal = await writer.run(db, crud.update_goal, user_id, goal_id, {"current_value": current_value})
         if goal is None:
             raise HTTPException(status_code=404, detail="Goal not found")
         return {"message": "Goal progress updated successfully"}
@@ -276,11 +647,12 @@ async def update_goal_progress(goal_id: int, current_value: float, db: Session =
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating goal progress: {str(e)}")
 
-@app.post("/api/goals/{goal_id}/complete")
-async def complete_goal(goal_id: int, db: Session = Depends(database.get_db)):
+@router.post("/api/goals/{goal_id}/complete")
+async def complete_goal(goal_id: int, db: Session = Depends(database.get_session),
+                        user_id: int = Depends(auth.current_user_id)):
     """Mark goal as completed."""
     try:
-        goal = crud.complete_goal(db, goal_id)
+        goal = await writer.run(db, crud.complete_goal, user_id, goal_id)
         if goal is None:
             raise HTTPException(status_code=404, detail="Goal not found")
         return {"message": "Goal completed successfully"}
@@ -289,11 +661,12 @@ async def complete_goal(goal_id: int, db: Session = Depends(database.get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error completing goal: {str(e)}")
 
-@app.delete("/api/goals/{goal_id}")
-async def delete_goal(goal_id: int, db: Session = Depends(database.get_db)):
+@router.delete("/api/goals/{goal_id}")
+async def delete_goal(goal_id: int, db: Session = Depends(database.get_session),
+                      user_id: int = Depends(auth.current_user_id)):
     """Delete a goal."""
     try:
-        db_goal = crud.delete_goal(db, goal_id)
+        db_goal = await writer.run(db, crud.delete_goal, user_id, goal_id)
         if db_goal is None:
             raise HTTPException(status_code=404, detail="Goal not found")
         return {"message": "Goal deleted successfully"}
@@ -301,3 +674,50 @@ async def delete_goal(goal_id: int, db: Session = Depends(database.get_db)):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting goal: {str(e)}")
+
+# Export endpoints
+@router.get("/api/export")
+async def export_data(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), types: Optional[str] = None,
+                      include_private: bool = True, compress: bool = Query(False, alias="gzip"),
+                      user_id: int = Depends(auth.current_user_id)):
+    """Stream all wellness data as NDJSON, or one record type as CSV."""
+    record_types = utils.parse_tags(types) if types else list(export.RECORD_TYPES)
+    unknown = [name for name in record_types if name not in export.RECORD_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown record types: {', '.join(unknown)}")
+    if format == "csv" and len(record_types) != 1:
+        raise HTTPException(status_code=400, detail="CSV exports take exactly one record type")
+
+    filename = f"wellness-{'-'.join(record_types) if format == 'csv' else 'export'}-{datetime.now():%Y%m%d}.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export.stream(format, record_types, user_id, include_private=include_private, compress=compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/api/import", response_model=schemas.ImportResult)
+async def import_data(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                      type: Optional[str] = None, import_id: Optional[str] = Query(None, min_length=1, max_length=128),
+                      db: Session = Depends(database.get_session), user_id: int = Depends(auth.current_user_id)):
+    """Import an NDJSON or CSV export, streaming the body in chunked transactions.
+
+    Re-sending an interrupted upload with the same `import_id` resumes after
+    the last committed chunk.
+    """
+    if type is not None and type not in importer.ITEM_SCHEMAS:
+        raise HTTPException(status_code=400, detail=f"Unknown record type: {type}")
+    if format == "csv" and type is None:
+        raise HTTPException(status_code=400, detail="CSV imports need a record type")
+    try:
+        return await importer.import_stream(db, user_id, request.stream(), format, import_id or uuid.uuid4().hex,
+                                            record_type=type, chunk_size=settings.batch_chunk_size)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import body: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing data: {str(e)}")
+
+app = create_app()
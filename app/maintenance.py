@@ -0,0 +1,324 @@
+"""Background database maintenance, run by a scheduler the lifespan starts.
+
+``MAINTENANCE_JOBS`` lists the jobs as ``name=seconds`` pairs; leave one out
+to turn it off:
+
+* ``optimize``: ``PRAGMA optimize``, which runs ``ANALYZE`` on the tables
+  whose statistics have gone stale, reading at most ``ANALYSIS_LIMIT`` rows
+  per index;
+* ``vacuum``: ``PRAGMA incremental_vacuum``, returning the pages freed by
+  deletes to the file system. It needs ``auto_vacuum=INCREMENTAL``, which new
+  databases get (``SQLITE_AUTO_VACUUM``); an existing database is converted
+  once, offline, by ``python -m app.maintenance vacuum``;
+* ``compact_rollups``: deletes the daily rollup rows of days whose raw rows
+  have all been deleted;
+* ``integrity_check``: ``PRAGMA quick_check``, which only reads.
+
+Jobs yield to foreground traffic. They work in short steps, each its own
+transaction, so the write lock is held for milliseconds at a time, and
+before each step they wait until no request has started for
+``MAINTENANCE_IDLE_MS`` (but not longer than ``MAX_YIELD_SECONDS``).
+
+Every worker runs a scheduler. The last run of each job is kept in the
+``maintenance_runs`` table and a worker claims a due run with a conditional
+UPDATE, so each run happens in one worker only, and every worker reports the
+latest runs on ``/health`` and ``/metrics``.
+
+Usage: python -m app.maintenance [run|vacuum]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from starlette.concurrency import run_in_threadpool
+
+from . import database, metrics, models, rollups
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TICK_SECONDS = 30  # how often workers look for due jobs
+MAX_YIELD_SECONDS = 1  # a step runs anyway after waiting this long for a quiet moment
+ANALYSIS_LIMIT = 1000
+VACUUM_STEP_PAGES = 256  # 1 MiB of 4 KiB pages, a few milliseconds of write lock
+COMPACT_SCAN_ROWS = 5000
+
+_last_request = 0.0  # time.monotonic() when the last request started
+
+class ActivityMiddleware:
+    """Pure ASGI middleware noting when the last request started, so jobs can wait for a quiet moment."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _last_request
+        if scope["type"] == "http":
+            _last_request = time.monotonic()
+        await self.app(scope, receive, send)
+
+# Job steps; each runs in the threadpool on its own connection
+def _optimize_step():
+    with database.engine.connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        connection.exec_driver_sql("PRAGMA optimize")
+        connection.commit()
+
+def _vacuum_state():
+    with database.engine.connect() as connection:
+        mode = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        return mode, connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+
+def _run_script(script: str):
+    # executescript steps each statement to completion; a single execute of
+    # incremental_vacuum frees only one page
+    connection = database.engine.raw_connection()
+    try:
+        connection.driver_connection.executescript(script)
+    finally:
+        connection.close()
+
+def _quick_check():
+    with database.engine.connect() as connection:
+        return [row[0] for row in connection.exec_driver_sql("PRAGMA quick_check(10)")]
+
+def _find_empty_days(after):
+    with database.SessionLocal() as db:
+        return rollups.find_empty_days(db, after, COMPACT_SCAN_ROWS)
+
+def _delete_empty_days(keys) -> int:
+    with database.SessionLocal() as db:
+        deleted = rollups.delete_empty_days(db, keys)
+        db.commit()
+        return deleted
+
+# Jobs; each returns a short description of what it did and raises on failure
+async def optimize(scheduler: "Scheduler") -> str:
+    await scheduler.step(_optimize_step)
+    return "ok"
+
+async def vacuum(scheduler: "Scheduler") -> str:
+    mode, free = await run_in_threadpool(_vacuum_state)
+    if mode != 2:
+        return "skipped: auto_vacuum is not INCREMENTAL (python -m app.maintenance vacuum converts the database)"
+    freed = 0
+    while free:
+        await scheduler.step(_run_script, f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})")
+        _, left = await run_in_threadpool(_vacuum_state)
+        if left >= free:
+            break
+        freed, free = freed + free - left, left
+    if freed:
+        # Let the truncated file reach the disk without waiting for readers
+        await run_in_threadpool(_run_script, "PRAGMA wal_checkpoint(PASSIVE)")
+    return f"freed {freed} pages"
+
+async def compact_rollups(scheduler: "Scheduler") -> str:
+    after, deleted = None, 0
+    while True:
+        keys, after = await scheduler.step(_find_empty_days, after)
+        if keys:
+            deleted += await scheduler.step(_delete_empty_days, keys)
+        if after is None:
+            return f"deleted {deleted} empty days"
+
+async def integrity_check(scheduler: "Scheduler") -> str:
+    problems = await scheduler.step(_quick_check)
+    if problems != ["ok"]:
+        raise RuntimeError("; ".join(problems))
+    return "ok"
+
+JOBS = {job.__name__: job for job in (optimize, vacuum, compact_rollups, integrity_check)}
+
+@dataclass
+class JobStats:
+    interval: int
+    runs: int = 0  # by this process
+    failures: int = 0
+    seconds: float = 0.0
+    yielded: float = 0.0  # of ``seconds``, waiting for quiet moments
+    # The latest run by any worker
+    last_started: Optional[float] = None
+    last_duration_ms: Optional[float] = None
+    last_result: Optional[str] = None
+    last_failed: bool = False
+
+class Scheduler:
+    def __init__(self, intervals: Dict[str, int], idle_ms: int):
+        unknown = set(intervals) - set(JOBS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance jobs: {', '.join(sorted(unknown))} (known: {', '.join(JOBS)})")
+        self.idle = idle_ms / 1000
+        self.jobs = {name: JobStats(interval) for name, interval in intervals.items()}
+        self._task = None
+        self._yielded = 0.0
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            try:
+                await self.run_due()
+            except Exception:
+                logger.exception("Maintenance scheduler tick failed")
+
+    async def step(self, fn, *args):
+        """Run one short step of a job in the threadpool, once no request has started for a while."""
+        started = time.monotonic()
+        deadline = started + MAX_YIELD_SECONDS
+        while True:
+            wait = min(_last_request + self.idle, deadline) - time.monotonic()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self._yielded += time.monotonic() - started
+        return await run_in_threadpool(fn, *args)
+
+    async def run_due(self, force: bool = False):
+        """Run the jobs that are due, or all of them with ``force``, unless another worker has claimed them."""
+        await run_in_threadpool(self._refresh)
+        for name, stats in self.jobs.items():
+            now = time.time()
+            if not force and stats.last_started is not None and stats.last_started > now - stats.interval:
+                continue
+            if await run_in_threadpool(self._claim, name, now, force):
+                await self.run_job(name, now)
+
+    async def run_job(self, name: str, started_at: float):
+        started = time.perf_counter()
+        self._yielded = 0.0
+        failed = False
+        try:
+            result = await JOBS[name](self)
+        except Exception as e:
+            logger.exception("Maintenance job %s failed", name)
+            result, failed = str(e) or type(e).__name__, True
+        seconds = time.perf_counter() - started
+        stats = self.jobs[name]
+        stats.runs += 1
+        stats.failures += failed
+        stats.seconds += seconds
+        stats.yielded += self._yielded
+        stats.last_started, stats.last_duration_ms = started_at, seconds * 1000
+        stats.last_result, stats.last_failed = result, failed
+        await run_in_threadpool(self._record, name, stats)
+
+    def _refresh(self):
+        table = models.MaintenanceRun.__table__
+        with database.engine.connect() as connection:
+            rows = connection.execute(select(table).where(table.c.job.in_(self.jobs))).all()
+        for row in rows:
+            stats = self.jobs[row.job]
+            stats.last_started, stats.last_duration_ms = row.started_at, row.duration_ms
+            stats.last_result, stats.last_failed = row.result, row.failed
+
+    def _claim(self, name: str, now: float, force: bool) -> bool:
+        table = models.MaintenanceRun.__table__
+        claim = update(table).where(table.c.job == name).values(started_at=now)
+        if not force:
+            claim = claim.where(or_(table.c.started_at.is_(None), table.c.started_at <= now - self.jobs[name].interval))
+        with database.engine.begin() as connection:
+            connection.execute(insert(table).values(job=name, failed=False).on_conflict_do_nothing())
+            return connection.execute(claim).rowcount == 1
+
+    def _record(self, name: str, stats: JobStats):
+        table = models.MaintenanceRun.__table__
+        with database.engine.begin() as connection:
+            connection.execute(update(table).where(table.c.job == name).values(
+                duration_ms=stats.last_duration_ms, result=stats.last_result, failed=stats.last_failed
+            ))
+
+    def stats(self) -> dict:
+        """The jobs' latest runs, for ``/health``."""
+        return {
+            name: {
+                "interval_seconds": stats.interval,
+                "last_started": datetime.fromtimestamp(stats.last_started, timezone.utc).isoformat(timespec="seconds")
+                if stats.last_started is not None else None,
+                "last_duration_ms": round(stats.last_duration_ms, 1) if stats.last_duration_ms is not None else None,
+                "last_result": stats.last_result,
+                "last_failed": stats.last_failed,
+            }
+            for name, stats in self.jobs.items()
+        }
+
+    def render(self) -> str:
+        """The jobs' metrics in the Prometheus text format."""
+        families = (
+            ("maintenance_job_runs_total", "counter", "Maintenance job runs by this process.",
+             lambda stats: stats.runs),
+            ("maintenance_job_failures_total", "counter", "Failed maintenance job runs by this process.",
+             lambda stats: stats.failures),
+            ("maintenance_job_seconds_total", "counter", "Time spent in maintenance jobs by this process.",
+             lambda stats: stats.seconds),
+            ("maintenance_job_yield_seconds_total", "counter",
+             "Time maintenance jobs of this process waited for a pause in requests.", lambda stats: stats.yielded),
+            ("maintenance_job_last_duration_seconds", "gauge", "Duration of the latest run by any worker.",
+             lambda stats: (stats.last_duration_ms or 0) / 1000),
+            ("maintenance_job_last_run_timestamp_seconds", "gauge", "Start of the latest run by any worker.",
+             lambda stats: stats.last_started or 0),
+        )
+        return "".join(
+            metrics.format_metric(name, kind, help_text,
+                                  [(name, {"job": job}, value(stats)) for job, stats in self.jobs.items()])
+            for name, kind, help_text, value in families
+        ) if self.jobs else ""
+
+scheduler = Scheduler({}, settings.maintenance_idle_ms)
+
+def configure() -> Scheduler:
+    """Make a fresh ``scheduler`` from the settings (at app startup); the lifespan starts it."""
+    global scheduler
+    scheduler = Scheduler(settings.maintenance_intervals if settings.maintenance_enabled else {},
+                          settings.maintenance_idle_ms)
+    return scheduler
+
+def convert(path: str):
+    """Switch the database to ``auto_vacuum=INCREMENTAL`` with a full VACUUM.
+
+    VACUUM rewrites the whole file and holds the write lock until it is done,
+    so run this with the app stopped.
+    """
+    before = os.path.getsize(path)
+    _run_script("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+    print(f"{path}: {before / 2**20:.1f} MiB -> {os.path.getsize(path) / 2**20:.1f} MiB, "
+          f"auto_vacuum={_vacuum_state()[0]}")
+
+def main(argv=None):
+    from . import migrations
+
+    command = (argv or sys.argv[1:] or ["run"])[0]
+    if command not in ("run", "vacuum"):
+        print("Usage: python -m app.maintenance [run|vacuum]")
+        return 2
+
+    migrations.prepare(database.configure())
+    if command == "vacuum":
+        convert(database.SQLITE_PATH)
+        return 0
+    jobs = Scheduler(settings.maintenance_intervals, idle_ms=0)
+    asyncio.run(jobs.run_due(force=True))
+    for name, stats in jobs.stats().items():
+        print(f"{name}: {stats['last_result']} in {stats['last_duration_ms']} ms")
+    return 1 if any(stats.last_failed for stats in jobs.jobs.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
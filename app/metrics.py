@@ -0,0 +1,208 @@
+"""Request and SQL instrumentation, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and labels it with its route
+template, so ``/api/journal/{entry_id}`` is one series however many ids are
+requested. SQLAlchemy cursor events time every statement and add it to the
+current request's totals, which are kept in a context variable (the
+threadpool and ``run_sync`` both run crud code in a copy of the request's
+context). Statements slower than ``SLOW_QUERY_MS`` are logged and counted by
+fingerprint: the statement with literals and parameter lists collapsed.
+"""
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, one set per label tuple."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            # Bucket counts, then +Inf, then sum
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self, name: str, label_names: Tuple[str, ...]):
+        for labels, series in sorted(self.series.items()):
+            base = dict(zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield f"{name}_bucket", dict(base, le=str(bound)), cumulative
+            yield f"{name}_sum", base, series[-1]
+            yield f"{name}_count", base, cumulative
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_metric(name: str, kind: str, help_text: str, samples: Iterable) -> str:
+    """Render one metric family; ``samples`` are ``(name, labels, value)`` tuples."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for sample_name, labels, value in samples:
+        label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        lines.append(f"{sample_name}{{{label_text}}} {value}" if label_text else f"{sample_name} {value}")
+    return "\n".join(lines) + "\n"
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SPACE = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so its variants (literals, IN lists, VALUES rows) group together."""
+    statement = _LITERALS.sub("?", statement)
+    statement = _LISTS.sub("(...)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+class Metrics:
+    def __init__(self, slow_query_seconds: float):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self.requests: Dict[tuple, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.request_query_seconds = Histogram(LATENCY_BUCKETS)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries: Dict[str, list] = {}  # fingerprint id -> [count, seconds, fingerprint]
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        counter_key = (method, route, str(status))
+        with self._lock:
+            self.requests[counter_key] = self.requests.get(counter_key, 0) + 1
+            self.latency.observe(key, seconds)
+            self.request_queries.observe(key, stats.queries)
+            self.request_query_seconds.observe(key, stats.query_seconds)
+
+    def observe_query(self, statement: str, seconds: float):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += seconds
+        slow = seconds >= self.slow_query_seconds
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+            if not slow:
+                return
+            normalized = fingerprint(statement)
+            key = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+            entry = self.slow_queries.setdefault(key, [0, 0.0, normalized])
+            entry[0] += 1
+            entry[1] += seconds
+        logger.warning("Slow query %s (%.1f ms): %s", key, seconds * 1000, normalized)
+
+    def render(self) -> str:
+        route_labels = ("method", "route")
+        with self._lock:
+            return "".join((
+                format_metric("http_requests_total", "counter", "HTTP requests by route and status.", (
+                    ("http_requests_total", dict(zip(route_labels + ("status",), key)), count)
+                    for key, count in sorted(self.requests.items())
+                )),
+                format_metric("http_request_duration_seconds", "histogram", "Request latency by route.",
+                              self.latency.samples("http_request_duration_seconds", route_labels)),
+                format_metric("http_request_db_queries", "histogram", "SQL statements per request.",
+                              self.request_queries.samples("http_request_db_queries", route_labels)),
+                format_metric("http_request_db_seconds", "histogram", "Time spent in SQL per request.",
+                              self.request_query_seconds.samples("http_request_db_seconds", route_labels)),
+                format_metric("db_queries_total", "counter", "SQL statements executed.",
+                              [("db_queries_total", {}, self.queries)]),
+                format_metric("db_query_seconds_total", "counter", "Time spent executing SQL.",
+                              [("db_query_seconds_total", {}, self.query_seconds)]),
+                format_metric("db_slow_queries_total", "counter", "Slow SQL statements by fingerprint.", (
+                    ("db_slow_queries_total", {"fingerprint": key}, count)
+                    for key, (count, _, _) in sorted(self.slow_queries.items())
+                )),
+                format_metric("db_slow_query_seconds_total", "counter", "Time spent in slow SQL by fingerprint.", (
+                    ("db_slow_query_seconds_total", {"fingerprint": key}, seconds)
+                    for key, (_, seconds, _) in sorted(self.slow_queries.items())
+                )),
+            ))
+
+def instrument_engine(engine, metrics: Optional[Metrics] = None):
+    """Time every statement run on ``engine`` (pass ``async_engine.sync_engine`` for asyncio engines)."""
+    metrics = metrics or registry
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        metrics.observe_query(statement, time.perf_counter() - context._metrics_started)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and SQL totals per route."""
+
+    def __init__(self, app, router, metrics: Optional[Metrics] = None):
+        self.app = app
+        self.metrics = metrics or registry
+        self.router = router
+        self._route_paths = {}
+
+    def _route(self, scope) -> str:
+        # The router stores the matched endpoint in the scope; map it back to its path template
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            # Mounts (static files) match with their app as the endpoint
+            self._route_paths = {getattr(route, "endpoint", None) or route.app: route.path for route in self.router.routes}
+            path = self._route_paths.setdefault(endpoint, UNMATCHED_ROUTE)
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            self.metrics.observe_request(scope["method"], self._route(scope), status,
+                                         time.perf_counter() - started, stats)
+
+registry = Metrics(settings.slow_query_ms / 1000)
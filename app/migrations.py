@@ -0,0 +1,222 @@
+"""Schema migrations for existing SQLite databases.
+
+``create_all`` only creates missing tables, so changes to tables that already
+exist (new indexes, columns, backfills) are applied here. The schema version
+is kept in ``PRAGMA user_version``; each step runs once, in order, inside the
+caller's transaction, and is written to be safe on a freshly created schema.
+Steps spell out their DDL instead of reading the current models, so they keep
+doing the same thing as the models evolve.
+
+``prepare`` brings a database up to date at startup. Workers that find it
+current do no more than a read; only a database that needs work is locked.
+"""
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import models, rollups
+
+def _has_column(connection: Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in connection.exec_driver_sql(f"PRAGMA table_info({table})"))
+
+def _invalidate_rollups(connection: Connection):
+    # Without the overall row, rollups.ensure() rebuilds both tables once the schema is current
+    connection.exec_driver_sql("DELETE FROM wellness_rollups")
+
+def _date_indexes(connection: Connection):
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_mood_entries_date ON mood_entries (date)",
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_date ON journal_entries (date)",
+        "CREATE INDEX IF NOT EXISTS ix_wellness_activities_date ON wellness_activities (date)",
+        "CREATE INDEX IF NOT EXISTS ix_wellness_activities_type_date ON wellness_activities (activity_type, date)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_created_at ON goals (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_completed_created ON goals (is_completed, created_at)",
+    ):
+        connection.exec_driver_sql(statement)
+
+def _unique_mood_entry_day(connection: Connection):
+    if not _has_column(connection, "mood_entries", "entry_day"):
+        connection.exec_driver_sql("ALTER TABLE mood_entries ADD COLUMN entry_day DATE")
+    connection.exec_driver_sql("UPDATE mood_entries SET entry_day = date(date) WHERE entry_day IS NULL")
+    # Keep the most recent check-in of each day
+    connection.exec_driver_sql(
+        "DELETE FROM mood_entries WHERE entry_day IS NOT NULL AND id NOT IN "
+        "(SELECT max(id) FROM mood_entries GROUP BY entry_day)"
+    )
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_mood_entries_entry_day ON mood_entries (entry_day)"
+    )
+    _invalidate_rollups(connection)
+
+def _journal_search_index(connection: Connection):
+    # External-content FTS5 index over journal_entries, kept in sync by triggers
+    for statement in (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5("
+        "title, content, tags, content='journal_entries', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN "
+        "INSERT INTO journal_fts(rowid, title, content, tags) VALUES (new.id, new.title, new.content, new.tags); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS journal_entries_fts_delete AFTER DELETE ON journal_entries BEGIN "
+        "INSERT INTO journal_fts(journal_fts, rowid, title, content, tags) "
+        "VALUES ('delete', old.id, old.title, old.content, old.tags); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS journal_entries_fts_update AFTER UPDATE OF title, content, tags ON journal_entries BEGIN "
+        "INSERT INTO journal_fts(journal_fts, rowid, title, content, tags) "
+        "VALUES ('delete', old.id, old.title, old.content, old.tags); "
+        "INSERT INTO journal_fts(rowid, title, content, tags) VALUES (new.id, new.title, new.content, new.tags); "
+        "END",
+        "INSERT INTO journal_fts(journal_fts) VALUES ('rebuild')",
+    ):
+        connection.exec_driver_sql(statement)
+
+def _journal_tag_index(connection: Connection):
+    for statement in (
+        "CREATE TABLE IF NOT EXISTS tags ("
+        "id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, entry_count INTEGER NOT NULL DEFAULT 0)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_tags_name ON tags (name)",
+        "CREATE INDEX IF NOT EXISTS ix_tags_entry_count ON tags (entry_count)",
+        "CREATE TABLE IF NOT EXISTS journal_entry_tags ("
+        "tag_id INTEGER NOT NULL REFERENCES tags (id), "
+        "entry_id INTEGER NOT NULL REFERENCES journal_entries (id), "
+        "PRIMARY KEY (tag_id, entry_id))",
+        "CREATE INDEX IF NOT EXISTS ix_journal_entry_tags_entry ON journal_entry_tags (entry_id, tag_id)",
+        "DELETE FROM journal_entry_tags",
+        "DELETE FROM tags",
+    ):
+        connection.exec_driver_sql(statement)
+
+    # Split the comma-separated strings the same way utils.normalize_tags does
+    tag_ids = {}
+    links = []
+    for entry_id, tags in connection.exec_driver_sql("SELECT id, tags FROM journal_entries WHERE tags IS NOT NULL"):
+        names = dict.fromkeys(tag.strip().lower() for tag in tags.split(",") if tag.strip())
+        for name in names:
+            tag_ids.setdefault(name, len(tag_ids) + 1)
+            links.append((tag_ids[name], entry_id))
+    if tag_ids:
+        if _has_column(connection, "tags", "user_id"):
+            # create_all made the table with the current columns; the entries are all the default user's
+            connection.exec_driver_sql("INSERT INTO tags (id, user_id, name, entry_count) VALUES (?, 1, ?, 0)", [(tag_id, name) for name, tag_id in tag_ids.items()])
+        else:
+            connection.exec_driver_sql("INSERT INTO tags (id, name, entry_count) VALUES (?, ?, 0)", [(tag_id, name) for name, tag_id in tag_ids.items()])
+        connection.exec_driver_sql("INSERT INTO journal_entry_tags (tag_id, entry_id) VALUES (?, ?)", links)
+        connection.exec_driver_sql(
+            "UPDATE tags SET entry_count = (SELECT count(*) FROM journal_entry_tags WHERE tag_id = tags.id)"
+        )
+
+_ROLLUP_COLUMNS = (
+    "mood_entries INTEGER NOT NULL, mood_sum INTEGER NOT NULL, mood_count INTEGER NOT NULL, "
+    "energy_sum INTEGER NOT NULL, energy_count INTEGER NOT NULL, stress_sum INTEGER NOT NULL, "
+    "stress_count INTEGER NOT NULL, sleep_sum FLOAT NOT NULL, sleep_count INTEGER NOT NULL, "
+    "journal_entries INTEGER NOT NULL, activity_count INTEGER NOT NULL, activity_minutes INTEGER NOT NULL"
+)
+
+def _user_scoping(connection: Connection):
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, "
+        "password_hash VARCHAR, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP))"
+    )
+    # Everything recorded so far belongs to the default user
+    connection.exec_driver_sql("INSERT OR IGNORE INTO users (id, username) VALUES (1, 'default')")
+    for table in ("mood_entries", "journal_entries", "tags", "wellness_activities", "goals"):
+        if not _has_column(connection, table, "user_id"):
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1")
+
+    for statement in (
+        # Global indexes, replaced by per-user ones (and the redundant ones on the primary keys)
+        "DROP INDEX IF EXISTS ux_mood_entries_entry_day",
+        "DROP INDEX IF EXISTS ix_mood_entries_date",
+        "DROP INDEX IF EXISTS ix_mood_entries_id",
+        "DROP INDEX IF EXISTS ix_journal_entries_date",
+        "DROP INDEX IF EXISTS ix_journal_entries_id",
+        "DROP INDEX IF EXISTS ux_tags_name",
+        "DROP INDEX IF EXISTS ix_tags_entry_count",
+        "DROP INDEX IF EXISTS ix_wellness_activities_date",
+        "DROP INDEX IF EXISTS ix_wellness_activities_type_date",
+        "DROP INDEX IF EXISTS ix_wellness_activities_id",
+        "DROP INDEX IF EXISTS ix_goals_created_at",
+        "DROP INDEX IF EXISTS ix_goals_completed_created",
+        "DROP INDEX IF EXISTS ix_goals_id",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_mood_entries_user_day ON mood_entries (user_id, entry_day)",
+        "CREATE INDEX IF NOT EXISTS ix_mood_entries_user_date ON mood_entries (user_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_user_date ON journal_entries (user_id, date)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_tags_user_name ON tags (user_id, name)",
+        "CREATE INDEX IF NOT EXISTS ix_tags_user_entry_count ON tags (user_id, entry_count)",
+        "CREATE INDEX IF NOT EXISTS ix_wellness_activities_user_date ON wellness_activities (user_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_wellness_activities_user_type_date "
+        "ON wellness_activities (user_id, activity_type, date)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_user_created ON goals (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_user_completed_created ON goals (user_id, is_completed, created_at)",
+        # Rollups are keyed by user now; rollups.ensure() refills the empty tables
+        "DROP TABLE IF EXISTS daily_rollups",
+        "DROP TABLE IF EXISTS wellness_rollups",
+        f"CREATE TABLE daily_rollups (user_id INTEGER NOT NULL, day DATE NOT NULL, {_ROLLUP_COLUMNS}, "
+        "PRIMARY KEY (user_id, day)) WITHOUT ROWID",
+        "CREATE TABLE wellness_rollups (user_id INTEGER NOT NULL PRIMARY KEY, completed_goals INTEGER NOT NULL, "
+        f"active_goals INTEGER NOT NULL, {_ROLLUP_COLUMNS})",
+    ):
+        connection.exec_driver_sql(statement)
+
+    # Import ids are chosen by clients, so they are only unique per user
+    if not _has_column(connection, "import_checkpoints", "user_id"):
+        for statement in (
+            "CREATE TABLE import_checkpoints_new (user_id INTEGER NOT NULL, id VARCHAR NOT NULL, "
+            "position INTEGER NOT NULL, created INTEGER NOT NULL, failed INTEGER NOT NULL, "
+            "completed BOOLEAN NOT NULL, updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP), PRIMARY KEY (user_id, id))",
+            "INSERT INTO import_checkpoints_new (user_id, id, position, created, failed, completed, updated_at) "
+            "SELECT 1, id, position, created, failed, completed, updated_at FROM import_checkpoints",
+            "DROP TABLE import_checkpoints",
+            "ALTER TABLE import_checkpoints_new RENAME TO import_checkpoints",
+        ):
+            connection.exec_driver_sql(statement)
+
+def _drop_unused_tags(connection: Connection):
+    # Tags used to stay behind with entry_count 0 once their last entry lost them
+    connection.exec_driver_sql("DELETE FROM tags WHERE entry_count <= 0")
+
+# Append only: the position of a step is its schema version
+MIGRATIONS = [
+    ("date, activity_type and is_completed indexes", _date_indexes),
+    ("unique mood entry_day, deduplicating existing check-ins", _unique_mood_entry_day),
+    ("journal full-text search index", _journal_search_index),
+    ("normalized journal tags, backfilled from journal_entries.tags", _journal_tag_index),
+    ("users, with user_id on every table and per-user indexes and rollups", _user_scoping),
+    ("delete tags without entries", _drop_unused_tags),
+]
+
+def current_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+def upgrade(connection: Connection):
+    """Apply the migrations this database has not seen yet."""
+    version = current_version(connection)
+    for number, (description, step) in enumerate(MIGRATIONS[version:], start=version + 1):
+        step(connection)
+        connection.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+def is_current(connection: Connection) -> bool:
+    """Whether every table exists and every migration has run."""
+    tables = {row[0] for row in connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return current_version(connection) == len(MIGRATIONS) and set(models.Base.metadata.tables) <= tables
+
+def prepare(engine) -> bool:
+    """Create missing tables, migrate and backfill the rollups, unless the schema is already current.
+
+    The write lock is taken before changing anything, so several workers
+    starting against the same SQLite file do this one at a time, and those
+    that come later find the work done. Returns whether anything was run.
+    """
+    with engine.connect() as connection:
+        if is_current(connection):
+            return False
+        connection.rollback()
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        if is_current(connection):
+            return False
+        models.Base.metadata.create_all(bind=connection)
+        upgrade(connection)
+        with Session(bind=connection) as db:
+            rollups.ensure(db)
+        connection.commit()
+        return True
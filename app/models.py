@@ -1,12 +1,30 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, Text, Index, ForeignKey
 from sqlalchemy.sql import func
 from .database import Base
 
+DEFAULT_USER_ID = 1  # owns everything recorded before accounts existed; acts for anonymous requests, see auth.py
+
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String, nullable=False, unique=True)
+    password_hash = Column(String, nullable=True)  # see auth.hash_password; NULL for the default user
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Every per-user index leads with user_id, so one user's rows are a contiguous
+# range however many users share the database
 class MoodEntry(Base):
     __tablename__ = "mood_entries"
+    __table_args__ = (
+        Index("ux_mood_entries_user_day", "user_id", "entry_day", unique=True),
+        Index("ix_mood_entries_user_date", "user_id", "date"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(DateTime, default=func.now())
+    entry_day = Column(Date, nullable=True)  # calendar day of `date`, one check-in per day
     mood_level = Column(Integer)  # 1-10 scale
     energy_level = Column(Integer, nullable=True)  # 1-10 scale
     stress_level = Column(Integer, nullable=True)  # 1-10 scale
@@ -16,22 +34,52 @@ class MoodEntry(Base):
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index("ix_journal_entries_user_date", "user_id", "date"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(DateTime, default=func.now())
     title = Column(String, nullable=True)
     content = Column(Text)
     mood_before = Column(Integer, nullable=True)  # 1-10 scale
     mood_after = Column(Integer, nullable=True)  # 1-10 scale
-    tags = Column(String, nullable=True)  # comma-separated tags
+    tags = Column(String, nullable=True)  # comma-separated tags, indexed in journal_entry_tags
     is_private = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class Tag(Base):
+    __tablename__ = "tags"
+    __table_args__ = (
+        Index("ux_tags_user_name", "user_id", "name", unique=True),
+        Index("ix_tags_user_entry_count", "user_id", "entry_count"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)  # normalized, see utils.normalize_tags
+    entry_count = Column(Integer, nullable=False, default=0)  # journal entries carrying the tag
+
+class JournalEntryTag(Base):
+    __tablename__ = "journal_entry_tags"
+    __table_args__ = (
+        Index("ix_journal_entry_tags_entry", "entry_id", "tag_id"),
+    )
+
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    entry_id = Column(Integer, ForeignKey("journal_entries.id"), primary_key=True)
+
 class WellnessActivity(Base):
     __tablename__ = "wellness_activities"
+    __table_args__ = (
+        Index("ix_wellness_activities_user_date", "user_id", "date"),
+        Index("ix_wellness_activities_user_type_date", "user_id", "activity_type", "date"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(DateTime, default=func.now())
     activity_type = Column(String)  # meditation, exercise, reading, social, etc.
     duration_minutes = Column(Integer, nullable=True)
@@ -42,8 +90,13 @@ class WellnessActivity(Base):
 
 class Goal(Base):
     __tablename__ = "goals"
+    __table_args__ = (
+        Index("ix_goals_user_created", "user_id", "created_at"),
+        Index("ix_goals_user_completed_created", "user_id", "is_completed", "created_at"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String)
     description = Column(Text, nullable=True)
     goal_type = Column(String)  # mood, activity, sleep, etc.
@@ -54,3 +107,66 @@ class Goal(Base):
     is_completed = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class RollupTotals:
+    """Counters shared by the daily and overall rollup tables."""
+    mood_entries = Column(Integer, nullable=False, default=0)
+    mood_sum = Column(Integer, nullable=False, default=0)
+    mood_count = Column(Integer, nullable=False, default=0)
+    energy_sum = Column(Integer, nullable=False, default=0)
+    energy_count = Column(Integer, nullable=False, default=0)
+    stress_sum = Column(Integer, nullable=False, default=0)
+    stress_count = Column(Integer, nullable=False, default=0)
+    sleep_sum = Column(Float, nullable=False, default=0.0)
+    sleep_count = Column(Integer, nullable=False, default=0)
+    journal_entries = Column(Integer, nullable=False, default=0)
+    activity_count = Column(Integer, nullable=False, default=0)
+    activity_minutes = Column(Integer, nullable=False, default=0)
+
+class DailyRollup(RollupTotals, Base):
+    __tablename__ = "daily_rollups"
+    # Clustered on (user_id, day): a user's trend range is read straight from the primary key
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+
+class WellnessRollup(RollupTotals, Base):
+    __tablename__ = "wellness_rollups"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)  # one row per user with data
+    completed_goals = Column(Integer, nullable=False, default=0)
+    active_goals = Column(Integer, nullable=False, default=0)
+
+class ImportCheckpoint(Base):
+    """Progress of a streaming import, committed together with each chunk."""
+    __tablename__ = "import_checkpoints"
+
+    user_id = Column(Integer, primary_key=True)
+    id = Column(String, primary_key=True)  # client-chosen import_id
+    position = Column(Integer, nullable=False, default=0)  # input records consumed
+    created = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    completed = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class MaintenanceRun(Base):
+    """The last run of a maintenance job, shared by the worker processes (see app/maintenance.py)."""
+    __tablename__ = "maintenance_runs"
+
+    job = Column(String, primary_key=True)
+    started_at = Column(Float, nullable=True)  # Unix time; set when a worker claims the run
+    duration_ms = Column(Float, nullable=True)
+    result = Column(String, nullable=True)
+    failed = Column(Boolean, nullable=False, default=False)
+
+class EventFeedEntry(Base):
+    """A committed change of a user's data, read by the other worker processes (see app/events.py)."""
+    __tablename__ = "event_feed"
+    # Workers read past the last id they saw, so ids must not be reused once old entries are deleted
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    origin = Column(String, nullable=False)  # the worker process that made the change
+    user_id = Column(Integer, nullable=False)
+    created_at = Column(Float, nullable=False)  # Unix time
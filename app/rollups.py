@@ -0,0 +1,380 @@
+"""Incrementally maintained wellness rollups.
+
+The daily and overall rollup tables keep running sums and counts per user so
+the dashboard reads a constant number of rows no matter how much history (or
+how many other users) exist. The crud write paths call ``add``/``remove``
+inside their own transaction; ``rebuild`` and ``verify`` recompute everything
+from the raw tables. Days whose raw rows were all deleted keep a row of
+zeros until ``delete_empty_days`` removes it (the ``compact_rollups``
+maintenance job).
+
+Usage: python -m app.rollups [verify|rebuild]
+"""
+import sys
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, String, and_, cast, delete, func, insert as core_insert, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+MOOD_FIELDS = (
+    "mood_entries",
+    "mood_sum", "mood_count",
+    "energy_sum", "energy_count",
+    "stress_sum", "stress_count",
+    "sleep_sum", "sleep_count",
+)
+DAILY_FIELDS = MOOD_FIELDS + (
+    "journal_entries",
+    "activity_count", "activity_minutes",
+)
+OVERALL_FIELDS = DAILY_FIELDS + ("completed_goals", "active_goals")
+
+MEASURES = ("mood", "energy", "stress", "sleep")
+
+def _row_deltas(model, get, sign: int = 1) -> dict:
+    changes = {}
+    if model is models.MoodEntry:
+        changes["mood_entries"] = 1
+        readings = (get("mood_level"), get("energy_level"), get("stress_level"), get("sleep_hours"))
+        for name, value in zip(MEASURES, readings):
+            # NULL and zero readings are left out of the averages, as in the stats endpoint
+            if value:
+                changes[f"{name}_sum"] = value
+                changes[f"{name}_count"] = 1
+    elif model is models.JournalEntry:
+        changes["journal_entries"] = 1
+    elif model is models.WellnessActivity:
+        changes["activity_count"] = 1
+        changes["activity_minutes"] = get("duration_minutes") or 0
+    elif model is models.Goal:
+        changes["completed_goals"] = int(get("is_completed") is True)
+        changes["active_goals"] = int(get("is_completed") is False)
+    return {key: value * sign for key, value in changes.items()}
+
+def _row_day(model, get) -> Optional[date]:
+    if model is models.Goal:
+        return None
+    if model is models.MoodEntry and get("entry_day") is not None:
+        return get("entry_day")
+    return get("date").date() if get("date") is not None else None
+
+def deltas(obj, sign: int = 1) -> dict:
+    """Counter changes contributed by a single raw row."""
+    return _row_deltas(type(obj), lambda name: getattr(obj, name), sign)
+
+def _day(obj) -> Optional[date]:
+    return _row_day(type(obj), lambda name: getattr(obj, name))
+
+def _upsert(db: Session, model, key: dict, changes: dict):
+    table = model.__table__
+    stmt = insert(table).values(**key, **changes)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + stmt.excluded[name] for name in changes}
+    )
+    db.execute(stmt)
+
+def apply(db: Session, user_id: int, day: Optional[date], changes: dict):
+    """Add counter changes to the user's overall rollup and, if ``day`` is set, to that day's rollup."""
+    changes = {key: value for key, value in changes.items() if value}
+    if not changes:
+        return
+    _upsert(db, models.WellnessRollup, {"user_id": user_id}, changes)
+    daily = {key: value for key, value in changes.items() if key in DAILY_FIELDS}
+    if day is not None and daily:
+        _upsert(db, models.DailyRollup, {"user_id": user_id, "day": day}, daily)
+
+def add(db: Session, obj):
+    """Account for a newly written row. Pending objects must be flushed first."""
+    apply(db, obj.user_id, _day(obj), deltas(obj))
+
+def remove(db: Session, obj):
+    """Take a row's current values out of the rollups (before an update or delete)."""
+    apply(db, obj.user_id, _day(obj), deltas(obj, -1))
+
+def apply_many(db: Session, changes_by_key: dict):
+    """Like ``apply`` for many ``(user_id, day)`` keys at once, with one statement per rollup table."""
+    overall = {}
+    daily_rows = []
+    for (user_id, day), changes in changes_by_key.items():
+        totals = overall.setdefault(user_id, {})
+        for key, value in changes.items():
+            totals[key] = totals.get(key, 0) + value
+        daily = {key: changes.get(key, 0) for key in DAILY_FIELDS}
+        if day is not None and any(daily.values()):
+            daily_rows.append({"user_id": user_id, "day": day, **daily})
+    for user_id, changes in overall.items():
+        apply(db, user_id, None, changes)
+    if daily_rows:
+        table = models.DailyRollup.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={name: table.c[name] + stmt.excluded[name] for name in DAILY_FIELDS}
+        )
+        db.execute(stmt, daily_rows)
+
+def add_many(db: Session, model, rows):
+    """Account for many newly written rows, given as column mappings of ``model``."""
+    changes_by_key = {}
+    for row in rows:
+        totals = changes_by_key.setdefault((row["user_id"], _row_day(model, row.get)), {})
+        for key, value in _row_deltas(model, row.get).items():
+            totals[key] = totals.get(key, 0) + value
+    apply_many(db, changes_by_key)
+
+def replace_mood_days(db: Session, rows):
+    """Make each mood row, given as a column mapping, the only one counted for its day.
+
+    Used after the mood upsert, which does not report the values it overwrote;
+    since a day holds at most one mood entry, those are the stored day counters.
+    When several rows share a day the last one wins, as it does in the table.
+    """
+    by_key = {(row["user_id"], _row_day(models.MoodEntry, row.get)): row for row in rows}
+    table = models.DailyRollup.__table__
+    stored = {}
+    for user_id in {user_id for user_id, _ in by_key}:
+        days = [day for key_user, day in by_key if key_user == user_id]
+        stored.update(((user_id, row["day"]), row) for row in db.execute(
+            select(table.c.day, *(table.c[field] for field in MOOD_FIELDS))
+            .where(table.c.user_id == user_id, table.c.day.in_(days))
+        ).mappings())
+    changes_by_key = {}
+    for key, row in by_key.items():
+        current = _row_deltas(models.MoodEntry, row.get)
+        before = stored.get(key)
+        changes_by_key[key] = {field: current.get(field, 0) - (before[field] if before else 0) for field in MOOD_FIELDS}
+    apply_many(db, changes_by_key)
+
+def replace_mood_day(db: Session, entry: models.MoodEntry):
+    """Make ``entry`` the only mood row counted for its day (see ``replace_mood_days``)."""
+    replace_mood_days(db, [{column.key: getattr(entry, column.key) for column in models.MoodEntry.__table__.c}])
+
+# Reads
+def get_overall(db: Session, user_id: int):
+    """Return the user's overall rollup row, or None if they never recorded anything."""
+    table = models.WellnessRollup.__table__
+    return db.execute(select(table).where(table.c.user_id == user_id)).mappings().first()
+
+def get_daily(db: Session, user_id: int, start_day: date):
+    """Return the user's daily rollup rows from ``start_day`` onwards, oldest first."""
+    table = models.DailyRollup.__table__
+    return db.execute(
+        select(table).where(table.c.user_id == user_id, table.c.day >= start_day).order_by(table.c.day)
+    ).mappings().all()
+
+# Period start for each bucket size, as 'YYYY-MM-DD' text (weeks start on Monday)
+BUCKETS = {
+    "day": lambda day: cast(day, String),
+    "week": lambda day: func.date(day, "weekday 0", "-6 days"),
+    "month": lambda day: func.strftime("%Y-%m-01", day),
+}
+
+def get_buckets(db: Session, user_id: int, start_day: date, bucket: str = "day"):
+    """Aggregate the user's days with mood check-ins from ``start_day`` onwards per bucket, oldest first.
+
+    Rows carry the summed ``*_sum``/``*_count`` columns (see ``average``) and
+    ``*_min``/``*_max``, the lowest and highest daily average in the bucket.
+    """
+    table = models.DailyRollup.__table__
+    period = BUCKETS[bucket](table.c.day).label("period")
+    columns = [period, func.sum(table.c.mood_entries).label("mood_entries")]
+    for name in MEASURES:
+        total, count = table.c[f"{name}_sum"], table.c[f"{name}_count"]
+        daily = cast(total, Float) / func.nullif(count, 0)
+        columns += [
+            func.sum(total).label(f"{name}_sum"), func.sum(count).label(f"{name}_count"),
+            func.min(daily).label(f"{name}_min"), func.max(daily).label(f"{name}_max"),
+        ]
+    return db.execute(
+        select(*columns).where(table.c.user_id == user_id, table.c.day >= start_day, table.c.mood_entries > 0)
+        .group_by(period).order_by(period)
+    ).mappings().all()
+
+def average(row, name: str) -> Optional[float]:
+    count = row[f"{name}_count"]
+    return row[f"{name}_sum"] / count if count else None
+
+# Compaction
+def _is_empty_day(table):
+    # The float sleep sum may keep rounding residue after its readings are subtracted
+    return and_(*(table.c[field] == 0 for field in DAILY_FIELDS if field != "sleep_sum"),
+                func.abs(table.c.sleep_sum) < 1e-6)
+
+def find_empty_days(db: Session, after: Optional[Tuple[int, date]] = None, scan: int = 5000):
+    """Scan up to ``scan`` daily rows in key order after ``after`` for days whose counters are all zero.
+
+    Returns the empty ``(user_id, day)`` keys and the key to continue after,
+    or None once the table has been scanned to the end.
+    """
+    table = models.DailyRollup.__table__
+    query = select(table.c.user_id, table.c.day, _is_empty_day(table).label("empty"))
+    if after is not None:
+        query = query.where(tuple_(table.c.user_id, table.c.day) > tuple_(*after))
+    rows = db.execute(query.order_by(table.c.user_id, table.c.day).limit(scan)).all()
+    empty = [(row.user_id, row.day) for row in rows if row.empty]
+    return empty, ((rows[-1].user_id, rows[-1].day) if len(rows) == scan else None)
+
+def delete_empty_days(db: Session, keys) -> int:
+    """Delete the given days' rollup rows if they are still empty; the caller commits."""
+    if not keys:
+        return 0
+    table = models.DailyRollup.__table__
+    return db.execute(
+        delete(table).where(tuple_(table.c.user_id, table.c.day).in_(keys), _is_empty_day(table))
+    ).rowcount
+
+# Recompute from raw rows
+def _measure_columns(model):
+    columns = []
+    for name, column in zip(MEASURES, (model.mood_level, model.energy_level, model.stress_level, model.sleep_hours)):
+        columns.append(func.coalesce(func.sum(func.nullif(column, 0)), 0).label(f"{name}_sum"))
+        columns.append(func.count(func.nullif(column, 0)).label(f"{name}_count"))
+    return columns
+
+def _raw_daily(db: Session) -> dict:
+    """Daily totals recomputed from the raw rows, by ``(user_id, day)``."""
+    days = {}
+
+    def merge(rows):
+        for row in rows:
+            if row.day is None:
+                continue
+            day = row.day if isinstance(row.day, date) else date.fromisoformat(row.day)
+            totals = days.setdefault((row.user_id, day), dict.fromkeys(DAILY_FIELDS, 0))
+            for key, value in row._mapping.items():
+                if key not in ("user_id", "day"):
+                    totals[key] += value
+
+    mood_day = func.coalesce(models.MoodEntry.entry_day, func.date(models.MoodEntry.date))
+    merge(db.query(
+        models.MoodEntry.user_id,
+        mood_day.label("day"),
+        func.count(models.MoodEntry.id).label("mood_entries"),
+        *_measure_columns(models.MoodEntry)
+    ).group_by(models.MoodEntry.user_id, mood_day))
+
+    journal_day = func.date(models.JournalEntry.date)
+    merge(db.query(
+        models.JournalEntry.user_id,
+        journal_day.label("day"),
+        func.count(models.JournalEntry.id).label("journal_entries")
+    ).group_by(models.JournalEntry.user_id, journal_day))
+
+    activity_day = func.date(models.WellnessActivity.date)
+    merge(db.query(
+        models.WellnessActivity.user_id,
+        activity_day.label("day"),
+        func.count(models.WellnessActivity.id).label("activity_count"),
+        func.coalesce(func.sum(models.WellnessActivity.duration_minutes), 0).label("activity_minutes")
+    ).group_by(models.WellnessActivity.user_id, activity_day))
+    return days
+
+def _raw_overall(db: Session) -> dict:
+    """Overall totals recomputed from the raw rows, by user."""
+    users = {}
+
+    def merge(rows):
+        for row in rows:
+            totals = users.setdefault(row.user_id, dict.fromkeys(OVERALL_FIELDS, 0))
+            for key, value in row._mapping.items():
+                if key != "user_id":
+                    totals[key] += value
+
+    merge(db.query(
+        models.MoodEntry.user_id,
+        func.count(models.MoodEntry.id).label("mood_entries"),
+        *_measure_columns(models.MoodEntry)
+    ).group_by(models.MoodEntry.user_id))
+    merge(db.query(
+        models.JournalEntry.user_id,
+        func.count(models.JournalEntry.id).label("journal_entries")
+    ).group_by(models.JournalEntry.user_id))
+    merge(db.query(
+        models.WellnessActivity.user_id,
+        func.count(models.WellnessActivity.id).label("activity_count"),
+        func.coalesce(func.sum(models.WellnessActivity.duration_minutes), 0).label("activity_minutes")
+    ).group_by(models.WellnessActivity.user_id))
+    merge(db.query(
+        models.Goal.user_id,
+        func.count(models.Goal.id).filter(models.Goal.is_completed == True).label("completed_goals"),
+        func.count(models.Goal.id).filter(models.Goal.is_completed == False).label("active_goals")
+    ).group_by(models.Goal.user_id))
+    return users
+
+def rebuild(db: Session):
+    """Replace both rollup tables with totals recomputed from the raw rows. Does not commit."""
+    daily = _raw_daily(db)
+    overall = _raw_overall(db)
+    db.execute(delete(models.DailyRollup))
+    db.execute(delete(models.WellnessRollup))
+    if daily:
+        db.execute(core_insert(models.DailyRollup), [
+            {"user_id": user_id, "day": day, **totals} for (user_id, day), totals in daily.items()
+        ])
+    if overall:
+        db.execute(core_insert(models.WellnessRollup), [
+            {"user_id": user_id, **totals} for user_id, totals in overall.items()
+        ])
+
+def _differs(stored, expected) -> bool:
+    return abs((stored or 0) - (expected or 0)) > 1e-6
+
+def verify(db: Session) -> List[str]:
+    """Compare the stored rollups with the raw rows and describe any drift."""
+    drift = []
+    expected_users = _raw_overall(db)
+    stored_users = {row["user_id"]: row for row in db.execute(select(models.WellnessRollup.__table__)).mappings()}
+    for user_id in sorted(set(expected_users) | set(stored_users)):
+        expected = expected_users.get(user_id, dict.fromkeys(OVERALL_FIELDS, 0))
+        stored = stored_users.get(user_id)
+        for key in OVERALL_FIELDS:
+            value = stored[key] if stored else 0
+            if _differs(value, expected[key]):
+                drift.append(f"user {user_id} overall.{key}: stored={value} expected={expected[key]}")
+
+    expected_days = _raw_daily(db)
+    stored_days = {
+        (row["user_id"], row["day"]): row for row in db.execute(select(models.DailyRollup.__table__)).mappings()
+    }
+    for user_id, day in sorted(set(expected_days) | set(stored_days)):
+        expected = expected_days.get((user_id, day), dict.fromkeys(DAILY_FIELDS, 0))
+        stored = stored_days.get((user_id, day))
+        for key in DAILY_FIELDS:
+            value = stored[key] if stored else 0
+            if _differs(value, expected[key]):
+                drift.append(f"user {user_id} {day}.{key}: stored={value} expected={expected[key]}")
+    return drift
+
+def ensure(db: Session):
+    """Build the rollups for databases whose rollup tables are empty (created before they existed, or migrated)."""
+    if db.execute(select(models.WellnessRollup.user_id).limit(1)).first() is None:
+        rebuild(db)
+        db.commit()
+
+def main(argv=None):
+    from . import database, migrations
+
+    command = (argv or sys.argv[1:] or ["verify"])[0]
+    if command not in ("verify", "rebuild"):
+        print("Usage: python -m app.rollups [verify|rebuild]")
+        return 2
+
+    migrations.prepare(database.configure())
+    with database.SessionLocal() as db:
+        drift = verify(db)
+        for line in drift:
+            print(line)
+        print(f"{len(drift)} drifted value(s)")
+        if command == "rebuild":
+            rebuild(db)
+            db.commit()
+            print("Rollups rebuilt")
+        return 1 if drift and command == "verify" else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -12,6 +12,9 @@ class MoodEntryBase(BaseModel):
 class MoodEntryCreate(MoodEntryBase):
     pass
 
+class MoodEntryBatchItem(MoodEntryCreate):
+    date: Optional[datetime] = None  # when the check-in happened, defaults to now
+
 class MoodEntry(MoodEntryBase):
     id: int
     date: datetime
@@ -22,7 +25,8 @@ class MoodEntry(MoodEntryBase):
 
 class MoodEntryList(BaseModel):
     entries: List[MoodEntry]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class JournalEntryBase(BaseModel):
     title: Optional[str] = None
@@ -35,6 +39,9 @@ class JournalEntryBase(BaseModel):
 class JournalEntryCreate(JournalEntryBase):
     pass
 
+class JournalEntryBatchItem(JournalEntryCreate):
+    date: Optional[datetime] = None
+
 class JournalEntry(JournalEntryBase):
     id: int
     date: datetime
@@ -46,7 +53,25 @@ class JournalEntry(JournalEntryBase):
 
 class JournalEntryList(BaseModel):
     entries: List[JournalEntry]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class JournalSearchResult(BaseModel):
+    entry: JournalEntry
+    score: float
+    snippet: str
+    title_highlight: Optional[str] = None
+
+class JournalSearchResults(BaseModel):
+    results: List[JournalSearchResult]
+    query: str
+
+class TagCount(BaseModel):
+    name: str
+    count: int
+
+class TagCountList(BaseModel):
+    tags: List[TagCount]
 
 class WellnessActivityBase(BaseModel):
     activity_type: str
@@ -58,6 +83,9 @@ class WellnessActivityBase(BaseModel):
 class WellnessActivityCreate(WellnessActivityBase):
     pass
 
+class WellnessActivityBatchItem(WellnessActivityCreate):
+    date: Optional[datetime] = None
+
 class WellnessActivity(WellnessActivityBase):
     id: int
     date: datetime
@@ -68,7 +96,8 @@ class WellnessActivity(WellnessActivityBase):
 
 class WellnessActivityList(BaseModel):
     activities: List[WellnessActivity]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class GoalBase(BaseModel):
     title: str
@@ -81,6 +110,10 @@ class GoalBase(BaseModel):
 class GoalCreate(GoalBase):
     pass
 
+class GoalBatchItem(GoalCreate):
+    start_date: Optional[datetime] = None
+    is_completed: bool = False
+
 class Goal(GoalBase):
     id: int
     start_date: datetime
@@ -93,7 +126,28 @@ class Goal(GoalBase):
 
 class GoalList(BaseModel):
     goals: List[Goal]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    index: int  # position of the item in the request body
+    status: str  # "created" or "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchItemResult]
+
+class ImportResult(BaseModel):
+    import_id: str
+    resumed_from: int  # records skipped because an earlier run already imported them
+    position: int  # records consumed so far, across runs
+    created: int
+    failed: int
+    completed: bool
+    errors: List[BatchItemResult]  # the first errors of this run
 
 class WellnessStats(BaseModel):
     total_entries: int
@@ -105,3 +159,19 @@ class WellnessStats(BaseModel):
     total_activities: int
     completed_goals: int
     active_goals: int
+
+class UserCreate(BaseModel):
+    username: str = Field(min_length=1, max_length=64)
+    password: str = Field(min_length=8, max_length=256)
+
+class User(BaseModel):
+    id: int
+    username: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
@@ -1,5 +1,6 @@
 from typing import Optional
-from datetime import datetime
+from calendar import monthrange
+from datetime import date, datetime, timedelta
 
 def get_mood_emoji(mood_level: int) -> str:
     """Get emoji representation of mood level."""
@@ -88,8 +89,7 @@ def get_weekly_mood_average(mood_entries) -> Optional[float]:
         return None
 
     # Get entries from the last 7 days
-    week_ago = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    week_ago = week_ago.replace(day=week_ago.day - 7)
+    week_ago = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
 
     weekly_entries = [entry for entry in mood_entries if entry.date >= week_ago]
 
@@ -113,12 +113,31 @@ def get_mood_streak(mood_entries, target_mood: int = 5) -> int:
 
     return streak
 
+def range_days(value: str, today: Optional[date] = None) -> int:
+    """Number of days in a range such as ``30d``, ``12w``, ``6m`` or ``5y`` that ends today."""
+    today = today or date.today()
+    count, unit = int(value[:-1]), value[-1]
+    if unit == "d":
+        return count
+    if unit == "w":
+        return count * 7
+    if unit not in ("m", "y"):
+        raise ValueError(f"Unknown range unit: {unit}")
+    # Calendar months back, clamped to the end of shorter months
+    year, month = divmod(today.year * 12 + today.month - 1 - (count if unit == "m" else count * 12), 12)
+    start = date(year, month + 1, min(today.day, monthrange(year, month + 1)[1]))
+    return (today - start).days
+
 def parse_tags(tags_string: Optional[str]) -> list:
     """Parse comma-separated tags string into list."""
     if not tags_string:
         return []
     return [tag.strip() for tag in tags_string.split(',') if tag.strip()]
 
+def normalize_tags(tags_string: Optional[str]) -> list:
+    """Parse tags into unique lowercase names, keeping their order."""
+    return list(dict.fromkeys(tag.lower() for tag in parse_tags(tags_string)))
+
 def format_tags(tags_list: list) -> str:
     """Format tags list into comma-separated string."""
     return ', '.join(tags_list)
@@ -0,0 +1,130 @@
+"""Group commit for single-row writes (``WRITE_COALESCING=1``).
+
+Each small write normally commits on its own, so under bursty load the
+requests queue on SQLite's write lock and pay for one commit each. With
+coalescing on, the write endpoints hand their crud call to one writer task
+instead. It collects writes for up to ``WRITE_BATCH_MS`` milliseconds or
+``WRITE_BATCH_MAX`` writes, runs them in a single transaction and commits
+once.
+
+Every write runs in its own SAVEPOINT. The ``db.commit()`` inside a crud
+function then only releases that savepoint, and an error rolls back just
+that write. A request is answered after the commit that made its write
+durable. If that commit fails, every write in the batch fails with it.
+The ``/api/events`` deltas of the batch are published after that commit.
+"""
+import asyncio
+import contextvars
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import database, events
+from .config import settings
+
+@dataclass
+class _Write:
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    future: asyncio.Future
+
+class WriteQueue:
+    def __init__(self, max_delay_ms: int, max_writes: int):
+        self.max_delay = max_delay_ms / 1000
+        self.max_writes = max_writes
+        self.batches = 0
+        self.writes = 0
+        self._loop = None
+        self._queue = None
+        self._full = None
+        self._task = None
+
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        # A fresh context, so the writer's SQL is not counted towards the request that happened to start it
+        self._task = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(db, *args, **kwargs)``; returns its result once the batch it ran in has committed."""
+        self._ensure_writer()
+        future = self._loop.create_future()
+        self._queue.put_nowait(_Write(fn, args, kwargs, future))
+        if self._queue.qsize() >= self.max_writes:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.max_writes - 1:
+                # Give concurrent requests a moment to join this commit
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_writes and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        try:
+            outcomes = await run_in_threadpool(self._apply, batch)
+        except Exception as e:
+            outcomes = [(None, e)] * len(batch)
+        for write, (result, error) in zip(batch, outcomes):
+            if not write.future.done():  # the request may have been cancelled meanwhile
+                if error is not None:
+                    write.future.set_exception(error)
+                else:
+                    write.future.set_result(result)
+            self._queue.task_done()
+
+    def _apply(self, batch) -> list:
+        """Run the writes in one transaction, each in its own savepoint, then commit."""
+        outcomes, published = [], []
+        with database.engine.connect() as connection:
+            if connection.dialect.name == "sqlite":
+                # pysqlite does not open a transaction for SAVEPOINT, so open it here, with the write lock
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+            for write in batch:
+                with Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint",
+                             info={events.DEFER_KEY: []}) as db:
+                    try:
+                        outcomes.append((write.fn(db, *write.args, **write.kwargs), None))
+                        published.extend(db.info[events.DEFER_KEY])
+                    except Exception as e:
+                        db.rollback()
+                        outcomes.append((None, e))
+            connection.commit()
+        events.publish_all(published)
+        self.batches += 1
+        self.writes += len(batch)
+        return outcomes
+
+    async def drain(self):
+        """Wait until every queued write has been committed."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+write_queue = WriteQueue(settings.write_batch_ms, settings.write_batch_max)
+
+def configure() -> WriteQueue:
+    """Start a fresh ``write_queue`` from the settings (at app startup)."""
+    global write_queue
+    write_queue = WriteQueue(settings.write_batch_ms, settings.write_batch_max)
+    return write_queue
+
+async def run(db, fn, *args, **kwargs):
+    """Run a single-row crud write: through the write queue if coalescing is on, else like ``database.run``."""
+    if settings.write_coalescing:
+        return await write_queue.submit(fn, *args, **kwargs)
+    return await database.run(db, fn, *args, **kwargs)
@@ -0,0 +1,74 @@
+"""Latency of the NumPy analytics against the pure-Python mood helpers on multi-year histories.
+
+Each history has one check-in per day and a few activities per day. The
+``python`` column loads every mood entry as an ORM object and runs
+``utils.get_weekly_mood_average`` and ``utils.get_mood_streak``; the
+``numpy`` column runs ``analytics.rolling_averages`` over the whole history
+and ``analytics.streaks``, which answer the same questions for every day.
+The last two columns are the other analytics endpoints on their own:
+
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --years 1,5,20 --activities-per-day 5
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import analytics, migrations, models, utils
+from benchmarks.common import fill_mood_entries, rebuild_rollups, temp_engine, timed
+
+ACTIVITY_TYPES = ("exercise", "meditation", "reading", "social", "nature")
+
+
+def _fill_activities(engine, days: int, per_day: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=days)
+    with engine.begin() as connection:
+        connection.execute(insert(models.WellnessActivity), [{
+            "user_id": models.DEFAULT_USER_ID,
+            "date": start + timedelta(days=i, minutes=rng.randint(0, 24 * 60 - 1)),
+            "activity_type": rng.choice(ACTIVITY_TYPES),
+            "duration_minutes": rng.randint(5, 90),
+        } for i in range(days) for _ in range(per_day)])
+
+
+def _python_helpers(db):
+    entries = db.query(models.MoodEntry).all()
+    utils.get_weekly_mood_average(entries)
+    utils.get_mood_streak(entries)
+    db.expunge_all()
+
+
+def _numpy_analytics(db, days: int):
+    analytics.rolling_averages(db, models.DEFAULT_USER_ID, days)
+    analytics.streaks(db, models.DEFAULT_USER_ID)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", default="1,3,5,10")
+    parser.add_argument("--activities-per-day", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'years':>6} {'entries':>8} {'python ms':>10} {'numpy ms':>9} {'correlations ms':>16} {'impact ms':>10}")
+    for years in (int(value) for value in args.years.split(",")):
+        days = years * 365
+        engine, SessionLocal = temp_engine()
+        fill_mood_entries(engine, days)
+        _fill_activities(engine, days, args.activities_per_day)
+        rebuild_rollups(engine)
+        with engine.begin() as connection:
+            migrations.upgrade(connection)  # the app's indexes
+        with SessionLocal() as db:
+            python = timed(lambda: _python_helpers(db))
+            vectorized = timed(lambda: _numpy_analytics(db, days))
+            correlations = timed(lambda: analytics.correlations(db, models.DEFAULT_USER_ID))
+            impact = timed(lambda: analytics.activity_impact(db, models.DEFAULT_USER_ID))
+        engine.dispose()
+        print(f"{years:>6} {days:>8} {python:>10.2f} {vectorized:>9.2f} {correlations:>16.2f} {impact:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Bytes and requests for the page's assets and large JSON responses.
+
+Static assets: builds a copy of ``static/`` with ``app.assets.build`` and
+serves it in process through plain ``StaticFiles`` (as before) and through
+``AssetFiles``. For each ``Accept-Encoding`` reports the bytes of a first
+page load's CSS and JS, and how many of them a browser revalidates on a
+repeat load (those without a ``max-age``).
+
+JSON: seeds ``--years`` of history with ``benchmarks.seed`` and fetches
+large API responses with and without ``Accept-Encoding: gzip``, reporting
+body sizes and p50 latency, and for the same bodies the size and time of
+gzip at the middleware's level and at level 9:
+
+    python -m benchmarks.bench_assets
+    python -m benchmarks.bench_assets --years 10 --requests 100
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile
+
+ASSETS = ("css/style.css", "js/app.js")
+ENCODINGS = ("br, gzip", "gzip", "identity")
+JSON_PATHS = ("/api/dashboard/trends?range=5y", "/api/mood?limit=100", "/api/journal?limit=50",
+              "/api/activities?limit=100", "/api/analytics/rolling?days=365")
+
+
+async def _static():
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+    from app import assets
+
+    static_dir = Path(tempfile.mkdtemp(prefix="mhc-bench-")) / "static"
+    shutil.copytree(assets.STATIC_DIR, static_dir, ignore=shutil.ignore_patterns(assets.DIST))
+    manifest = assets.build(static_dir)
+    handlers = {
+        "plain": (StaticFiles(directory=static_dir), {path: path for path in ASSETS}),
+        "hashed": (assets.AssetFiles(directory=static_dir), manifest),
+    }
+    print(f"{'assets':<8} {'accept-encoding':<16} {'first load KB':>14} {'revalidated':>12}")
+    for name, (handler, paths) in handlers.items():
+        transport = httpx.ASGITransport(app=Starlette(routes=[Mount("/static", app=handler)]))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for encoding in ENCODINGS:
+                received = revalidated = 0
+                for path in ASSETS:
+                    response = await client.get(f"/static/{paths[path]}", headers={"accept-encoding": encoding})
+                    received += int(response.headers["content-length"])
+                    revalidated += "max-age" not in response.headers.get("cache-control", "")
+                print(f"{name:<8} {encoding:<16} {received / 1024:>14.1f} {revalidated:>12}")
+
+
+async def _timed(client, path: str, headers: dict, requests: int):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return response, percentile(latencies, 50)
+
+
+def _compress_ms(body: bytes, level: int, repeat: int = 20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        compressed = gzip.compress(body, level, mtime=0)
+    return len(compressed), (time.perf_counter() - started) * 1000 / repeat
+
+
+async def _json(requests: int):
+    from app import compression
+    from benchmarks.common import app_client
+
+    print(f"\n{'endpoint':<36} {'KB':>7} {'gzip KB':>8} {'p50 ms':>7} {'gzip p50':>9} "
+          f"{f'level {compression.COMPRESS_LEVEL}':>13} {'level 9':>13}")
+    async with app_client(timeout=None) as client:
+        for path in JSON_PATHS:
+            await _timed(client, path, {"accept-encoding": "gzip"}, 5)  # warm up
+            plain, plain_ms = await _timed(client, path, {"accept-encoding": "identity"}, requests)
+            zipped, zipped_ms = await _timed(client, path, {"accept-encoding": "gzip"}, requests)
+            assert zipped.headers.get("content-encoding") == "gzip", path
+            levels = [_compress_ms(plain.content, level) for level in (compression.COMPRESS_LEVEL, 9)]
+            print(f"{path:<36} {len(plain.content) / 1024:>7.1f} {int(zipped.headers['content-length']) / 1024:>8.1f} "
+                  f"{plain_ms:>7.2f} {zipped_ms:>9.2f} "
+                  + " ".join(f"{size / 1024:>5.1f}KB {ms:>4.2f}ms" for size, ms in levels), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=5, help="years of seeded history")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint and encoding")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_static())
+        asyncio.run(_json(args.requests))
+        return
+
+    root = Path(__file__).resolve().parent.parent
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db", CACHE_ENABLED="0")
+    subprocess.run([sys.executable, "-m", "benchmarks.seed", "--years", str(args.years)],
+                   cwd=workdir, env=env, check=True)
+    subprocess.run([sys.executable, "-m", "benchmarks.bench_assets", "--child", "--requests", str(args.requests)],
+                   cwd=workdir, env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
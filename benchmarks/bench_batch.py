@@ -0,0 +1,58 @@
+"""Rows per second through the per-row create endpoints vs. the batch endpoints.
+
+Both paths go through the ASGI app, so the per-row numbers include one
+request, one transaction and one commit per row, as a syncing client sees it:
+
+    python -m benchmarks.bench_batch
+    python -m benchmarks.bench_batch --rows 5000 --chunk 1000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+PAYLOADS = {
+    "journal": ("/api/journal", lambda i: {"title": f"Entry {i}", "content": "Slept well, long walk. " * 5,
+                                           "tags": "sleep, walk" if i % 2 else "work"}),
+    "activities": ("/api/activities", lambda i: {"activity_type": "exercise", "duration_minutes": 30 + i % 30}),
+    "goals": ("/api/goals", lambda i: {"title": f"Goal {i}", "goal_type": "activity", "target_value": 10}),
+}
+
+
+async def _run(rows: int):
+    from benchmarks.common import app_client
+
+    async with app_client() as client:
+        print(f"{'kind':>10} {'per-row/s':>10} {'batch/s':>10} {'speedup':>8}")
+        for kind, (path, payload) in PAYLOADS.items():
+            started = time.perf_counter()
+            for i in range(rows):
+                (await client.post(path, json=payload(i))).raise_for_status()
+            per_row = rows / (time.perf_counter() - started)
+
+            body = [payload(i) for i in range(rows)]
+            started = time.perf_counter()
+            response = await client.post(f"{path}/batch", json=body, timeout=None)
+            response.raise_for_status()
+            assert response.json()["created"] == rows
+            batch = rows / (time.perf_counter() - started)
+            print(f"{kind:>10} {per_row:>10.0f} {batch:>10.0f} {batch / per_row:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, help="BATCH_CHUNK_SIZE for the batch path")
+    args = parser.parse_args()
+
+    # The app reads its settings at import time
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    if args.chunk:
+        os.environ["BATCH_CHUNK_SIZE"] = str(args.chunk)
+    asyncio.run(_run(args.rows))
+
+
+if __name__ == "__main__":
+    main()
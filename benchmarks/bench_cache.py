@@ -0,0 +1,80 @@
+"""Requests per second on the dashboard endpoints with the response cache on and off.
+
+Each setting runs in its own interpreter because the cache is configured from
+the environment at import time. "revalidate" sends the ETag from the previous
+response, the way the browser does for the SPA's repeated dashboard loads:
+
+    python -m benchmarks.bench_cache
+    python -m benchmarks.bench_cache --requests 5000 --rows 50000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PATHS = ("/api/dashboard/stats", "/api/dashboard/trends", "/api/dashboard/recent")
+
+
+async def _measure(client, requests: int, concurrency: int, etags=None):
+    async def worker(offset):
+        for i in range(offset, requests, concurrency):
+            path = PATHS[i % len(PATHS)]
+            headers = {"If-None-Match": etags[path]} if etags else {}
+            response = await client.get(path, headers=headers)
+            assert response.status_code == (304 if etags else 200), response.status_code
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+async def _child(requests: int, concurrency: int, rows: int):
+    import logging
+
+    from app import database
+    from benchmarks.common import app_client, fill_mood_entries
+
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)  # statements queue on the threadpool at this concurrency
+    async with app_client() as client:
+        fill_mood_entries(database.engine, rows)
+        stats = (await client.get("/api/dashboard/stats")).json()
+        assert stats["total_entries"] == rows, stats  # time real aggregates, not empty rollups
+        etags = {path: (await client.get(path)).headers["etag"] for path in PATHS}
+        await _measure(client, 100, concurrency)  # warm up
+        full = await _measure(client, requests, concurrency)
+        revalidated = await _measure(client, requests, concurrency, etags)
+        mode = "on" if os.getenv("CACHE_ENABLED") == "1" else "off"
+        print(f"{mode:>6} {full:>10.0f} {revalidated:>12.0f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args.requests, args.concurrency, args.rows))
+        return
+
+    print(f"{'cache':>6} {'200 req/s':>10} {'304 req/s':>12}")
+    root = Path(__file__).resolve().parent.parent
+    for enabled in ("0", "1"):
+        workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+        env = dict(os.environ, PYTHONPATH=str(root), CACHE_ENABLED=enabled,
+                   DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cache", "--child", "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--rows", str(args.rows)],
+            cwd=workdir, env=env, check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""p50/p99 latency of the API under 50, 200 and 1000 in-flight requests.
+
+Each database mode runs in its own interpreter because the data path is
+chosen from the environment at import time:
+
+    python -m benchmarks.bench_concurrency            # threadpool and async
+    python -m benchmarks.bench_concurrency --modes async --levels 50,200
+
+Running the same script against an older checkout gives the "before" numbers.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile
+
+PATHS = ("/api/dashboard/stats", "/api/mood?limit=20", "/api/dashboard/trends")
+
+
+async def _measure(client, level: int):
+    latencies = []
+
+    async def one(i):
+        started = time.perf_counter()
+        response = await client.get(PATHS[i % len(PATHS)])
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(level)))
+    elapsed = time.perf_counter() - started
+    return percentile(latencies, 50), percentile(latencies, 99), level / elapsed
+
+
+async def _child(levels, rows: int):
+    from app import database
+    from benchmarks.common import app_client, fill_mood_entries
+
+    async with app_client() as client:
+        fill_mood_entries(database.engine, rows)
+        await _measure(client, 20)  # warm up pools and caches
+        for level in levels:
+            p50, p99, rps = await _measure(client, level)
+            mode = "async" if os.getenv("DB_ASYNC") == "1" else "threadpool"
+            print(f"{mode:>10} {level:>6} {p50:>9.1f} {p99:>9.1f} {rps:>9.0f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="threadpool,async")
+    parser.add_argument("--levels", default="50,200,1000")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+
+    if args.child:
+        asyncio.run(_child(levels, args.rows))
+        return
+
+    print(f"{'mode':>10} {'inflight':>6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    root = Path(__file__).resolve().parent.parent
+    for mode in args.modes.split(","):
+        workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+        env = dict(os.environ, PYTHONPATH=str(root), DB_ASYNC="1" if mode == "async" else "0",
+                   DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_concurrency", "--child",
+             "--levels", args.levels, "--rows", str(args.rows)],
+            cwd=workdir, env=env, check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Multi-process write/read contention on one SQLite file.
+
+Starts writer and reader processes (the equivalent of several uvicorn
+workers) against the same database and counts completed operations and
+``database is locked`` errors, once with the pre-tuning SQLite defaults
+(rollback journal, synchronous=FULL, no cache or mmap) and once with the
+defaults from ``app/config.py``.
+
+    python -m benchmarks.bench_contention --writers 4 --readers 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROFILES = {
+    "untuned": {"SQLITE_WAL": "0", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_CACHE_SIZE": "-2000",
+                "SQLITE_MMAP_SIZE": "0", "SQLITE_BUSY_TIMEOUT": "5000"},
+    "tuned": {},
+}
+
+
+def _worker(role: str, seconds: float, results):
+    from sqlalchemy.exc import OperationalError
+    from app import crud, database, models, schemas
+
+    database.configure()
+    done = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        with database.SessionLocal() as db:
+            try:
+                if role == "writer":
+                    crud.create_wellness_activity(db, models.DEFAULT_USER_ID, schemas.WellnessActivityCreate(
+                        activity_type="exercise", duration_minutes=30))
+                else:
+                    crud.get_wellness_stats(db, models.DEFAULT_USER_ID)
+                    crud.get_wellness_activities(db, models.DEFAULT_USER_ID, limit=20)
+                done += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                db.rollback()
+                locked += 1
+    results.put((role, done, locked))
+
+
+def _child(writers: int, readers: int, seconds: float, profile: str):
+    from benchmarks.common import prepare_database
+
+    prepare_database()  # the schema is ready before the workers start
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=("writer", seconds, results)) for _ in range(writers)]
+    processes += [context.Process(target=_worker, args=("reader", seconds, results)) for _ in range(readers)]
+    for process in processes:
+        process.start()
+    totals = {"writer": [0, 0], "reader": [0, 0]}
+    for _ in processes:
+        role, done, locked = results.get()
+        totals[role][0] += done
+        totals[role][1] += locked
+    for process in processes:
+        process.join()
+    for role, (done, locked) in totals.items():
+        print(f"{profile:>8} {role:>7} {done / seconds:>10.0f} {locked:>8}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profiles", default="untuned,tuned")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.writers, args.readers, args.seconds, args.child)
+        return
+
+    print(f"{'profile':>8} {'role':>7} {'ops/s':>10} {'locked':>8}")
+    root = Path(__file__).resolve().parent.parent
+    for profile in args.profiles.split(","):
+        workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+        env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db",
+                   **PROFILES[profile])
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_contention", "--child", profile,
+             "--writers", str(args.writers), "--readers", str(args.readers), "--seconds", str(args.seconds)],
+            cwd=workdir, env=env, check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
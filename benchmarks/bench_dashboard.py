@@ -0,0 +1,75 @@
+"""First-paint latency of the SPA: five parallel requests vs /api/dashboard.
+
+The page used to fetch the stats and the four list panels separately on load;
+it now makes one combined request. Each "load" below is one complete set of
+requests, timed until the last response has arrived. Runs with the response
+cache off and on, each in its own interpreter:
+
+    python -m benchmarks.bench_dashboard
+    python -m benchmarks.bench_dashboard --loads 500 --rows 50000
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SEPARATE = ("/api/dashboard/stats", "/api/mood", "/api/journal", "/api/activities", "/api/goals")
+COMBINED = ("/api/dashboard?fields=stats,mood,journal,activities,goals",)
+
+
+async def _loads(client, paths, loads: int):
+    samples = []
+    for _ in range(loads):
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(path) for path in paths))
+        samples.append((time.perf_counter() - started) * 1000)
+        assert all(response.status_code == 200 for response in responses)
+    return samples
+
+
+async def _child(loads: int, rows: int):
+    from app import database
+    from benchmarks.common import app_client, fill_mood_entries, percentile
+
+    mode = "on" if os.getenv("CACHE_ENABLED") == "1" else "off"
+    async with app_client() as client:
+        fill_mood_entries(database.engine, rows)
+        stats = (await client.get("/api/dashboard/stats")).json()
+        assert stats["total_entries"] == rows, stats  # time real aggregates, not empty rollups
+        for name, paths in (("separate", SEPARATE), ("combined", COMBINED)):
+            await _loads(client, paths, 20)  # warm up
+            samples = await _loads(client, paths, loads)
+            print(f"{mode:>6} {name:>9} {len(paths):>9} {percentile(samples, 50):>9.2f} "
+                  f"{percentile(samples, 95):>9.2f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loads", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args.loads, args.rows))
+        return
+
+    print(f"{'cache':>6} {'page load':>9} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    root = Path(__file__).resolve().parent.parent
+    for enabled in ("0", "1"):
+        workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+        env = dict(os.environ, PYTHONPATH=str(root), CACHE_ENABLED=enabled,
+                   DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_dashboard", "--child",
+             "--loads", str(args.loads), "--rows", str(args.rows)],
+            cwd=workdir, env=env, check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
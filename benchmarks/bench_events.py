@@ -0,0 +1,157 @@
+"""Read traffic of keeping an open dashboard current: refetching vs ``/api/events``.
+
+Seeds a history with ``benchmarks.seed``, starts the app under uvicorn and
+makes ``--writes`` single writes (check-ins, activities, journal entries and
+goal progress), with one client keeping its dashboard current in one of two
+ways:
+
+* ``refetch``: after each write, GET the list it touched and
+  ``/api/dashboard/stats``, as the web UI used to;
+* ``events``: an open ``/api/events`` stream; the client is current once the
+  write's delta and the new stats have arrived.
+
+Reports, per write, the read requests sent, the bytes received for them, the
+SQL statements the server ran (writes included, from ``/metrics``) and how
+long after the write returned the client was current:
+
+    python -m benchmarks.bench_events
+    python -m benchmarks.bench_events --years 2 --writes 500
+"""
+import argparse
+import asyncio
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile
+
+LISTS = {"mood": "/api/mood", "activity": "/api/activities", "journal": "/api/journal", "goal": "/api/goals"}
+
+
+def _write(client, i: int, goal: int):
+    """The ``i``-th write and the event name of the list it changes."""
+    kind = ("mood", "activity", "journal", "goal")[i % 4]
+    if kind == "mood":
+        request = client.post("/api/mood", json={"mood_level": i % 10 + 1, "energy_level": 5})
+    elif kind == "activity":
+        request = client.post("/api/activities", json={"activity_type": "exercise", "duration_minutes": 30})
+    elif kind == "journal":
+        request = client.post("/api/journal", json={"content": f"Short note {i}", "tags": "work"})
+    else:
+        request = client.put(f"/api/goals/{goal}/progress", params={"current_value": i % 20})
+    return kind, request
+
+
+async def _queries(client) -> int:
+    text = (await client.get("/metrics")).text
+    return int(float(re.search(r"^db_queries_total (\S+)$", text, re.M).group(1)))
+
+
+async def _refetch(client, writes: int, goal: int) -> dict:
+    reads = received = 0
+    delays = []
+    for i in range(writes):
+        kind, request = _write(client, i, goal)
+        (await request).raise_for_status()
+        started = time.perf_counter()
+        for path in (LISTS[kind], "/api/dashboard/stats"):
+            response = await client.get(path)
+            reads += 1
+            received += len(response.content)
+        delays.append((time.perf_counter() - started) * 1000)
+    return {"reads": reads, "received": received, "delays": delays}
+
+
+async def _events(client, writes: int, goal: int) -> dict:
+    messages = asyncio.Queue()
+
+    async def listen():
+        async with client.stream("GET", "/api/events") as response:
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    messages.put_nowait((event, len(line) + len(event) + 9))  # "event: " + "\n" and the blank line
+
+    listener = asyncio.create_task(listen())
+    assert (await messages.get())[0] == "ready"
+    received = 0
+    delays = []
+    for i in range(writes):
+        kind, request = _write(client, i, goal)
+        (await request).raise_for_status()
+        started = time.perf_counter()
+        seen = set()
+        while seen != {kind, "stats"}:
+            event, size = await messages.get()
+            seen.add(event)
+            received += size
+        delays.append((time.perf_counter() - started) * 1000)
+    listener.cancel()
+    return {"reads": 1, "received": received, "delays": delays}
+
+
+async def _drive(base_url: str, writes: int, modes):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        goal = (await client.post("/api/goals", json={"title": "Walk", "goal_type": "activity",
+                                                     "target_value": 20.0})).json()["id"]
+        print(f"{'mode':<8} {'reads/write':>12} {'KB/write':>9} {'SQL/write':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in modes:
+            before = await _queries(client)
+            result = await {"refetch": _refetch, "events": _events}[mode](client, writes, goal)
+            statements = await _queries(client) - before
+            print(f"{mode:<8} {result['reads'] / writes:>12.2f} {result['received'] / writes / 1024:>9.2f} "
+                  f"{statements / writes:>10.1f} {percentile(result['delays'], 50):>8.2f} "
+                  f"{percentile(result['delays'], 95):>8.2f}", flush=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=1, help="years of seeded history")
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--modes", default="refetch,events")
+    args = parser.parse_args()
+
+    import httpx
+
+    root = Path(__file__).resolve().parent.parent
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    subprocess.run([sys.executable, "-m", "benchmarks.seed", "--years", str(args.years)],
+                   cwd=workdir, env=env, check=True)
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        asyncio.run(_drive(base_url, args.writes, args.modes.split(",")))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""File size, read latency and foreground impact of the maintenance jobs.
+
+Seeds ``--years`` of history with ``benchmarks.seed``, then deletes
+``--delete`` of the journal entries and activities through the API's delete
+endpoints. Reports the database file size, free pages and empty rollup days
+and the p50 latency of a few reads before and after the maintenance jobs
+run. The jobs run while ``--clients`` clients keep sending mixed reads and
+writes; the foreground p50/p95/max latency during the run is compared with
+the same load without maintenance, along with each job's time and how much
+of it was spent waiting for a pause in requests:
+
+    python -m benchmarks.bench_maintenance
+    python -m benchmarks.bench_maintenance --years 10 --delete 0.8 --clients 4
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile
+
+READS = ("/api/dashboard/stats", "/api/journal?limit=20", "/api/activities?limit=20", "/api/dashboard/trends?range=1y")
+
+
+def _file_state() -> dict:
+    from app import database
+
+    with database.engine.connect() as connection:
+        # Count the WAL too: freed pages only leave the file at a checkpoint
+        size = sum(os.path.getsize(path) for path in (database.SQLITE_PATH, database.SQLITE_PATH + "-wal")
+                   if os.path.exists(path))
+        return {
+            "size": size,
+            "free": connection.exec_driver_sql("PRAGMA freelist_count").scalar(),
+            "empty_days": connection.exec_driver_sql(
+                "SELECT count(*) FROM daily_rollups WHERE mood_entries = 0 AND journal_entries = 0 "
+                "AND activity_count = 0").scalar(),
+        }
+
+
+def _print_state(label: str, state: dict):
+    print(f"{label:<8} {state['size'] / 2**20:>8.1f} MiB {state['free']:>8} free pages "
+          f"{state['empty_days']:>6} empty rollup days", flush=True)
+
+
+async def _ids(client, path: str, key: str) -> list:
+    ids, params = [], {"limit": 500, "include_total": "false"}
+    while True:
+        page = (await client.get(path, params=params)).json()
+        ids += [row["id"] for row in page[key]]
+        if not page["next_cursor"]:
+            return ids
+        params["cursor"] = page["next_cursor"]
+
+
+async def _delete(client, fraction: float) -> int:
+    deleted = 0
+    for path, key in (("/api/journal", "entries"), ("/api/activities", "activities")):
+        ids = await _ids(client, path, key)
+        for entry_id in ids[:int(len(ids) * fraction)]:
+            (await client.delete(f"{path}/{entry_id}")).raise_for_status()
+            deleted += 1
+    return deleted
+
+
+async def _read_latencies(client, requests: int) -> dict:
+    latencies = {}
+    for path in READS:
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            (await client.get(path)).raise_for_status()
+            samples.append((time.perf_counter() - started) * 1000)
+        latencies[path] = percentile(samples, 50)
+    return latencies
+
+
+async def _load(client, clients: int, until) -> list:
+    """Mixed reads and writes from ``clients`` clients until ``until()`` is true; returns latencies in ms."""
+    latencies = []
+
+    async def worker(offset: int):
+        i = offset
+        while not until():
+            started = time.perf_counter()
+            if i % 4 == 0:
+                response = await client.post("/api/activities", json={"activity_type": "exercise", "duration_minutes": 20})
+            else:
+                response = await client.get(READS[i % len(READS)])
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            i += clients
+
+    await asyncio.gather(*(worker(offset) for offset in range(clients)))
+    return latencies
+
+
+def _print_load(label: str, latencies: list):
+    print(f"{label:<22} {len(latencies):>8} {percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} "
+          f"{max(latencies):>8.2f}", flush=True)
+
+
+async def _child(args):
+    import logging
+
+    from app import maintenance
+    from app.config import settings
+    from benchmarks.common import app_client
+
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+    async with app_client(timeout=None) as client:
+        # The benchmark runs the jobs itself
+        await maintenance.scheduler.stop()
+        deleted = await _delete(client, args.delete)
+        print(f"deleted {deleted} journal entries and activities\n")
+        before = _file_state()
+        reads_before = await _read_latencies(client, args.requests)
+
+        print(f"{'load':<22} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        deadline = time.monotonic() + args.seconds
+        _print_load("without maintenance", await _load(client, args.clients, lambda: time.monotonic() > deadline))
+        scheduler = maintenance.Scheduler(dict.fromkeys(maintenance.JOBS, 0), settings.maintenance_idle_ms)
+        jobs = asyncio.create_task(scheduler.run_due(force=True))
+        _print_load("during maintenance", await _load(client, args.clients, jobs.done))
+        await jobs
+
+        print(f"\n{'job':<16} {'ms':>8} {'yielded ms':>11}  result")
+        for name, stats in scheduler.jobs.items():
+            print(f"{name:<16} {stats.seconds * 1000:>8.1f} {stats.yielded * 1000:>11.1f}  {stats.last_result}")
+
+        after = _file_state()
+        reads_after = await _read_latencies(client, args.requests)
+        print()
+        _print_state("before", before)
+        _print_state("after", after)
+        print(f"\n{'read':<36} {'p50 before':>11} {'p50 after':>10}")
+        for path in READS:
+            print(f"{path:<36} {reads_before[path]:>11.2f} {reads_after[path]:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=5, help="years of seeded history")
+    parser.add_argument("--delete", type=float, default=0.5, help="fraction of journal entries and activities to delete")
+    parser.add_argument("--clients", type=int, default=2, help="concurrent foreground clients")
+    parser.add_argument("--seconds", type=float, default=5, help="foreground load without maintenance")
+    parser.add_argument("--requests", type=int, default=50, help="requests per read for the p50s")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args))
+        return
+
+    root = Path(__file__).resolve().parent.parent
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db", CACHE_ENABLED="0")
+    subprocess.run([sys.executable, "-m", "benchmarks.seed", "--years", str(args.years)],
+                   cwd=workdir, env=env, check=True)
+    subprocess.run([sys.executable, "-m", "benchmarks.bench_maintenance", "--child"] + sys.argv[1:],
+                   cwd=workdir, env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Overhead of the request and SQL metrics.
+
+A/B runs with METRICS_ENABLED off and on are too noisy to resolve a few
+percent, so this measures the fixed costs directly instead: the middleware
+around a no-op ASGI app (per request) and the cursor listeners around
+``SELECT 1`` (per statement). These are then set against each endpoint's
+time per request, with the statement counts the metrics themselves report:
+
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --requests 5000 --rows 50000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PATHS = ("/health", "/api/mood?limit=20", "/api/journal?limit=20", "/api/dashboard/stats", "/api/dashboard/trends")
+
+
+async def _measure(client, path: str, requests: int, concurrency: int) -> float:
+    async def worker(offset):
+        for _ in range(offset, requests, concurrency):
+            response = await client.get(path)
+            assert response.status_code == 200, response.status_code
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return (time.perf_counter() - started) / requests
+
+
+async def _middleware_cost(repeat: int = 20_000) -> float:
+    from app.metrics import Metrics, MetricsMiddleware
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    class Router:
+        routes = []
+
+    async def run(app):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await app({"type": "http", "method": "GET", "path": "/"}, None, send)
+        return (time.perf_counter() - started) / repeat
+
+    wrapped = MetricsMiddleware(endpoint, Router(), Metrics(1.0))
+    return min([await run(wrapped) for _ in range(3)]) - min([await run(endpoint) for _ in range(3)])
+
+
+def _listener_cost(repeat: int = 20_000) -> float:
+    from sqlalchemy import create_engine
+    from app.metrics import Metrics, instrument_engine
+
+    def run(engine):
+        with engine.connect() as connection:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                connection.exec_driver_sql("SELECT 1")
+            return (time.perf_counter() - started) / repeat
+
+    plain, instrumented = create_engine("sqlite://"), create_engine("sqlite://")
+    instrument_engine(instrumented, Metrics(1.0))
+    return min(run(instrumented) for _ in range(3)) - min(run(plain) for _ in range(3))
+
+
+async def _child(requests: int, concurrency: int, rows: int):
+    from app import database, metrics
+    from benchmarks.common import app_client, fill_mood_entries
+
+    logging.getLogger(metrics.__name__).setLevel(logging.ERROR)  # slow queries under load are expected here
+    async with app_client() as client:
+        fill_mood_entries(database.engine, rows)
+        per_request, per_query = await _middleware_cost(), _listener_cost()
+        print(f"middleware {per_request * 1e6:.1f} us per request, listeners {per_query * 1e6:.1f} us per statement\n")
+        print(f"{'endpoint':<24} {'us/request':>10} {'queries':>8} {'overhead':>9}")
+        for path in PATHS:
+            await _measure(client, path, 100, concurrency)  # warm up
+            seconds = await _measure(client, path, requests, concurrency)
+            route = path.split("?")[0]
+            queries = metrics.registry.request_queries.series[("GET", route)]
+            per_call = queries[-1] / sum(queries[:-1])
+            cost = per_request + per_call * per_query
+            print(f"{path:<24} {seconds * 1e6:>10.0f} {per_call:>8.1f} {cost / seconds:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args.requests, args.concurrency, args.rows))
+        return
+
+    # The app reads its settings from the environment at import time
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(root), METRICS_ENABLED="1", CACHE_ENABLED="0",
+               DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_metrics", "--child", "--requests", str(args.requests),
+         "--concurrency", str(args.concurrency), "--rows", str(args.rows)],
+        cwd=workdir, env=env, check=True
+    )
+
+
+if __name__ == "__main__":
+    main()
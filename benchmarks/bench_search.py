@@ -0,0 +1,86 @@
+"""Journal full-text search: indexing throughput and query latency.
+
+Inserts a synthetic corpus through the FTS5 sync triggers, then times a mix
+of term, multi-term, prefix, date-filtered and private-filtered searches.
+
+    python -m benchmarks.bench_search --entries 500000
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import crud, migrations, models
+from benchmarks.common import percentile, temp_engine
+
+WORDS = (
+    "anxious calm tired grateful work meeting family friend walk run sleep dream coffee rain sun "
+    "stress deadline therapy meditation breathe journal music read book cook dinner project focus "
+    "headache energy motivated lonely happy sad angry hopeful weekend holiday travel garden dog cat"
+).split()
+TAGS = ("work", "family", "health", "anxiety", "gratitude", "sleep", "exercise", "social")
+
+QUERIES = {
+    "term": dict(query="meditation"),
+    "two terms": dict(query="anxious meeting"),
+    "prefix": dict(query="grat", prefix=True),
+    "date range": dict(query="coffee", start_date=date.today() - timedelta(days=90), end_date=date.today()),
+    "public only": dict(query="family", include_private=False),
+}
+
+
+def corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    # Zipf-like vocabulary: the mood words above are the rarer tail of a larger filler vocabulary
+    vocabulary = [f"word{i}" for i in range(5000)] + list(WORDS)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    start = datetime.now() - timedelta(days=count // 3)
+    for i in range(count):
+        yield {
+            "user_id": models.DEFAULT_USER_ID,
+            "date": start + timedelta(hours=8 * i),
+            "title": " ".join(rng.choices(WORDS, k=3)).capitalize(),
+            "content": " ".join(rng.choices(vocabulary, weights, k=rng.randint(30, 120))),
+            "tags": ", ".join(rng.sample(TAGS, 2)),
+            "is_private": rng.random() < 0.2,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=500_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    engine, SessionLocal = temp_engine()
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+
+    elapsed = 0.0  # time spent inserting and indexing, excluding corpus generation
+    rows = corpus(args.entries)
+    with engine.begin() as connection:
+        while True:
+            chunk = [row for _, row in zip(range(args.chunk), rows)]
+            if not chunk:
+                break
+            started = time.perf_counter()
+            connection.execute(insert(models.JournalEntry), chunk)
+            elapsed += time.perf_counter() - started
+    print(f"indexed {args.entries} entries in {elapsed:.1f}s ({args.entries / elapsed:,.0f} entries/s)")
+
+    print(f"{'query':>12} {'p50 ms':>8} {'p99 ms':>8} {'hits':>6}")
+    with SessionLocal() as db:
+        for name, params in QUERIES.items():
+            samples = []
+            for _ in range(args.runs):
+                t = time.perf_counter()
+                hits = crud.search_journal_entries(db, models.DEFAULT_USER_ID, limit=20, **params)
+                samples.append((time.perf_counter() - t) * 1000)
+            print(f"{name:>12} {percentile(samples, 50):>8.2f} {percentile(samples, 99):>8.2f} {len(hits):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Rows serialized per second for each list endpoint.
+
+Compares, for 100-row pages:
+
+* ``orm``: ORM objects validated through the list response model with
+  ``from_attributes`` and encoded with the stdlib ``json``, which is what the
+  list endpoints used to do;
+* ``rows``: the plain rows from crud encoded with orjson, what they do now;
+* ``endpoint``: the whole request through the ASGI app.
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --rows 20000 --pages 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import desc, insert
+
+from app import crud, models, schemas
+from benchmarks.common import fill_mood_entries, rebuild_rollups
+
+LIMIT = 100
+
+# name: (path, model, list schema, list key, crud function)
+ENDPOINTS = {
+    "mood": ("/api/mood", models.MoodEntry, schemas.MoodEntryList, "entries", crud.get_mood_entries),
+    "journal": ("/api/journal", models.JournalEntry, schemas.JournalEntryList, "entries", crud.get_journal_entries),
+    "activities": ("/api/activities", models.WellnessActivity, schemas.WellnessActivityList, "activities",
+                   crud.get_wellness_activities),
+    "goals": ("/api/goals", models.Goal, schemas.GoalList, "goals", crud.get_goals),
+}
+
+
+def _fill(engine, rows: int):
+    fill_mood_entries(engine, rows)
+    with engine.begin() as connection:
+        connection.execute(insert(models.JournalEntry), [{
+            "user_id": models.DEFAULT_USER_ID, "title": f"Entry {i}", "content": "Slept well, long walk in the park. " * 8, "tags": "sleep,walk",
+        } for i in range(rows)])
+        connection.execute(insert(models.WellnessActivity), [{
+            "user_id": models.DEFAULT_USER_ID, "activity_type": "exercise", "duration_minutes": 30 + i % 30, "description": "Morning run",
+        } for i in range(rows)])
+        connection.execute(insert(models.Goal), [{
+            "user_id": models.DEFAULT_USER_ID, "title": f"Goal {i}", "goal_type": "activity", "target_value": 10, "current_value": i % 10,
+        } for i in range(rows)])
+    rebuild_rollups(engine)  # the list totals are read from the rollups
+
+
+def _orm_page(db, model, list_schema, key):
+    key_column = model.created_at if model is models.Goal else model.date
+    rows = db.query(model).order_by(desc(key_column), desc(model.id)).limit(LIMIT).all()
+    payload = list_schema.model_validate({key: rows, "total": len(rows), "next_cursor": None})
+    return json.dumps(jsonable_encoder(payload)).encode()
+
+
+def _rows_page(db, get_page, key):
+    rows, next_cursor = get_page(db, models.DEFAULT_USER_ID, limit=LIMIT)
+    return orjson.dumps({key: rows, "total": len(rows), "next_cursor": next_cursor})
+
+
+def _rate(fn, pages: int) -> float:
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(pages):
+        fn()
+    return pages * LIMIT / (time.perf_counter() - started)
+
+
+async def _endpoint_rates(pages: int):
+    from benchmarks.common import app_client
+
+    rates = {}
+    async with app_client() as client:
+        for name, (path, _, _, key, _) in ENDPOINTS.items():
+            assert len((await client.get(path)).json()[key]) == LIMIT
+            started = time.perf_counter()
+            for _ in range(pages):
+                (await client.get(path, params={"limit": LIMIT})).raise_for_status()
+            rates[name] = pages * LIMIT / (time.perf_counter() - started)
+    return rates
+
+
+def _child(rows: int, pages: int):
+    from app import database
+    from benchmarks.common import prepare_database
+
+    _fill(prepare_database(), rows)
+    endpoint = asyncio.run(_endpoint_rates(pages))
+
+    print(f"{'endpoint':>10} {'orm rows/s':>11} {'rows rows/s':>12} {'speedup':>8} {'endpoint rows/s':>16}")
+    with database.SessionLocal() as db:
+        for name, (_, model, list_schema, key, get_page) in ENDPOINTS.items():
+            assert orjson.loads(_orm_page(db, model, list_schema, key))[key] == orjson.loads(_rows_page(db, get_page, key))[key]
+            orm = _rate(lambda: _orm_page(db, model, list_schema, key), pages)
+            rows = _rate(lambda: _rows_page(db, get_page, key), pages)
+            print(f"{name:>10} {orm:>11.0f} {rows:>12.0f} {rows / orm:>7.1f}x {endpoint[name]:>16.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.rows, args.pages)
+        return
+
+    # The app configures its engine from the environment at import time
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(root), CACHE_ENABLED="0", DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_serialization", "--child", "--rows", str(args.rows),
+         "--pages", str(args.pages)],
+        cwd=workdir, env=env, check=True
+    )
+
+
+if __name__ == "__main__":
+    main()
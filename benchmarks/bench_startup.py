@@ -0,0 +1,138 @@
+"""Startup budget: import time of ``app.main`` and time to the first request.
+
+For a fresh database and then for the same, already migrated database, each
+``--runs`` times in new processes:
+
+* ``import``: wall time of ``import app.main`` in a new interpreter, which
+  must not create the database file or anything else;
+* ``ready``: from launching ``uvicorn app.main:app`` until ``/health``
+  answers, i.e. interpreter start, imports and the lifespan's startup;
+* ``first``: the first ``/api/dashboard`` request after that.
+
+Medians are compared with the budgets and the script exits with status 1 if
+any is over. ``--importtime`` also lists the slowest modules from
+``python -X importtime``:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 5 --importtime
+    python -m benchmarks.bench_startup --import-budget-ms 1500 --ready-budget-ms 2500
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+IMPORT_SCRIPT = """
+import os, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+assert not os.listdir("."), f"importing app.main created {os.listdir('.')}"
+print(elapsed * 1000)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _import_ms(env: dict) -> float:
+    # Imports in an empty directory, so anything it creates shows up
+    with tempfile.TemporaryDirectory(prefix="mhc-bench-") as cwd:
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=cwd, env=env,
+                                check=True, capture_output=True, text=True).stdout
+    return float(output)
+
+
+def _serve_ms(workdir: str, env: dict) -> tuple:
+    """Milliseconds from launching uvicorn to the first ``/health`` answer, and for the first API request."""
+    import httpx
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                try:
+                    client.get("/health").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter()
+            client.get("/api/dashboard").raise_for_status()
+            first = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait()
+    return (ready - started) * 1000, (first - ready) * 1000
+
+
+def _slowest_imports(env: dict, count: int = 10):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            env=env, check=True, capture_output=True, text=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            modules.append((int(match.group(1)) / 1000, match.group(2)))
+    print(f"\n{'cumulative ms':>14}  module (slowest of {len(modules)} imports)")
+    for cumulative, name in sorted(modules, reverse=True)[:count]:
+        print(f"{cumulative:>14.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=2000)
+    parser.add_argument("--ready-budget-ms", type=float, default=3000)
+    parser.add_argument("--first-budget-ms", type=float, default=500)
+    parser.add_argument("--importtime", action="store_true", help="list the slowest module imports")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parent.parent
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    budgets = {"import": args.import_budget_ms, "ready": args.ready_budget_ms, "first": args.first_budget_ms}
+
+    print(f"{'database':<10} {'import ms':>10} {'ready ms':>10} {'first ms':>10}")
+    over = []
+    for database in ("fresh", "migrated"):
+        samples = {name: [] for name in budgets}
+        for _ in range(args.runs):
+            if database == "fresh":
+                for path in Path(workdir).glob("bench.db*"):
+                    path.unlink()
+            samples["import"].append(_import_ms(env))
+            ready, first = _serve_ms(workdir, env)
+            samples["ready"].append(ready)
+            samples["first"].append(first)
+        medians = {name: statistics.median(values) for name, values in samples.items()}
+        print(f"{database:<10} {medians['import']:>10.0f} {medians['ready']:>10.0f} {medians['first']:>10.1f}",
+              flush=True)
+        over += [f"{database} {name} {medians[name]:.0f} ms > {budget:.0f} ms"
+                 for name, budget in budgets.items() if medians[name] > budget]
+
+    if args.importtime:
+        _slowest_imports(env)
+    if over:
+        print(f"\nover budget: {'; '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Latency and peak Python memory of ``crud.get_wellness_stats`` as mood history grows.
+
+Entries are one per day, so 500,000 (about 1,370 years) is the most one user can hold.
+"""
+import argparse
+import tracemalloc
+
+from app import crud, models
+from benchmarks.common import fill_mood_entries, temp_engine, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000,500000")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'median ms':>10} {'peak KiB':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        engine, SessionLocal = temp_engine()
+        fill_mood_entries(engine, size)
+        with SessionLocal() as db:
+            total = crud.get_wellness_stats(db, models.DEFAULT_USER_ID).total_entries
+            assert total == size, f"stats count {total} of {size} filled entries"
+            latency = timed(lambda: crud.get_wellness_stats(db, models.DEFAULT_USER_ID))
+            tracemalloc.start()
+            crud.get_wellness_stats(db, models.DEFAULT_USER_ID)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        engine.dispose()
+        print(f"{size:>10} {latency:>10.2f} {peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Per-user dashboard latency as the number of users grows to 10k.
+
+Every user gets ``--days`` of interleaved history (daily check-ins,
+activities, journal entries and goals, all ending today), inserted in bulk
+with the rollups rebuilt afterwards. After each step in ``--users`` the full
+dashboard (``crud.get_dashboard``) is built for randomly chosen users; its
+latency should not depend on how many other users share the database.
+
+At the largest size every statement the dashboard issues is run through
+``EXPLAIN QUERY PLAN``; the benchmark fails if a raw table is scanned or
+sorted instead of searched through an index leading with ``user_id``:
+
+    python -m benchmarks.bench_users
+    python -m benchmarks.bench_users --users 1,1000,10000,20000 --days 30
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from app import crud, migrations, models, rollups
+from benchmarks.check_query_plans import plan_problems
+from benchmarks.common import percentile, temp_engine
+
+ACTIVITY_TYPES = ("exercise", "meditation", "reading", "social", "nature")
+TAGS = ("work", "family", "sleep", "friends", "gratitude")
+
+
+def _history(user_id: int, days: int, rng: random.Random) -> dict:
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    rows = {"mood": [], "journal": [], "activities": [], "goals": []}
+    for day in range(days):
+        date = start + timedelta(days=day, hours=rng.randint(7, 22), minutes=rng.randint(0, 59))
+        if rng.random() < 0.9:
+            rows["mood"].append({
+                "user_id": user_id, "date": date, "entry_day": date.date(), "mood_level": rng.randint(1, 10),
+                "energy_level": rng.randint(1, 10), "stress_level": rng.randint(1, 10),
+                "sleep_hours": round(rng.uniform(4, 10), 1),
+            })
+        for _ in range(rng.choice((0, 1, 1, 2))):
+            rows["activities"].append({
+                "user_id": user_id, "date": date, "activity_type": rng.choice(ACTIVITY_TYPES),
+                "duration_minutes": rng.randint(5, 90), "mood_impact": rng.randint(-2, 5),
+            })
+        if rng.random() < 0.3:
+            rows["journal"].append({
+                "user_id": user_id, "date": date, "title": "Evening notes",
+                "content": "Long walk after work, talked with friends.", "tags": ",".join(rng.sample(TAGS, 2)),
+            })
+    for _ in range(3):
+        rows["goals"].append({
+            "user_id": user_id, "title": "Walk more", "goal_type": "activity", "target_value": 20.0,
+            "current_value": float(rng.randint(0, 20)), "is_completed": rng.random() < 0.3,
+        })
+    return rows
+
+
+MODELS = {"mood": models.MoodEntry, "journal": models.JournalEntry, "activities": models.WellnessActivity,
+          "goals": models.Goal}
+
+
+def _add_users(engine, first: int, last: int, days: int, rng: random.Random, chunk: int = 500) -> int:
+    """Insert users ``first``..``last`` with their histories; returns the number of raw rows written."""
+    written = 0
+    for offset in range(first, last + 1, chunk):
+        user_ids = range(offset, min(offset + chunk, last + 1))
+        pending = {kind: [] for kind in MODELS}
+        for user_id in user_ids:
+            for kind, rows in _history(user_id, days, rng).items():
+                pending[kind].extend(rows)
+        accounts = [{"id": user_id, "username": f"user{user_id}"}
+                    for user_id in user_ids if user_id != models.DEFAULT_USER_ID]
+        with engine.begin() as connection:
+            if accounts:
+                connection.execute(insert(models.User), accounts)
+            for kind, rows in pending.items():
+                connection.execute(insert(MODELS[kind]), rows)
+                written += len(rows)
+    return written
+
+
+def _dashboard_latencies(SessionLocal, users: int, samples: int, rng: random.Random) -> list:
+    latencies = []
+    with SessionLocal() as db:
+        for _ in range(samples):
+            user_id = rng.randint(1, users)
+            started = time.perf_counter()
+            crud.get_dashboard(db, user_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+            db.rollback()  # end get_dashboard's read transaction
+    return latencies
+
+
+def _check_plans(engine, SessionLocal, user_id: int) -> int:
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    with SessionLocal() as db:
+        crud.get_dashboard(db, user_id)
+        db.rollback()
+    event.remove(engine, "before_cursor_execute", capture)
+
+    failures = 0
+    with engine.connect() as connection:
+        for statement, parameters in captured:
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            problems = plan_problems(connection, statement, parameters)
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok':>4}  {' | '.join(plan)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,100,1000,10000", help="user counts to measure at, ascending")
+    parser.add_argument("--days", type=int, default=60, help="days of history per user")
+    parser.add_argument("--samples", type=int, default=200, help="dashboards built per user count")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    engine, SessionLocal = temp_engine()
+    with engine.begin() as connection:
+        migrations.upgrade(connection)  # the per-user indexes and the default user
+
+    print(f"{'users':>7} {'raw rows':>10} {'insert s':>9} {'rollups s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    users, rows = 0, 0
+    for target in (int(value) for value in args.users.split(",")):
+        started = time.perf_counter()
+        rows += _add_users(engine, users + 1, target, args.days, rng)
+        inserted = time.perf_counter() - started
+        users = target
+
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            rollups.rebuild(db)
+            db.commit()
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+        rebuilt = time.perf_counter() - started
+
+        _dashboard_latencies(SessionLocal, users, 20, rng)  # warm up
+        latencies = _dashboard_latencies(SessionLocal, users, args.samples, rng)
+        print(f"{users:>7} {rows:>10} {inserted:>9.1f} {rebuilt:>10.1f} {percentile(latencies, 50):>8.2f} "
+              f"{percentile(latencies, 95):>8.2f} {percentile(latencies, 99):>8.2f}", flush=True)
+
+    print(f"\nquery plans of one user's dashboard with {users} users:")
+    failures = _check_plans(engine, SessionLocal, rng.randint(1, users))
+    engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
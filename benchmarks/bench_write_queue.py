@@ -0,0 +1,127 @@
+"""Write throughput with group commit (WRITE_COALESCING) off and on.
+
+Starts ``--processes`` app processes (the equivalent of uvicorn workers) on
+one SQLite file. Each drives its write endpoints in process over ASGI with
+``--clients`` concurrent clients for ``--seconds``: activity and journal
+creates, goal progress updates and check-ins. Reports completed writes per
+second, latency, and the requests that failed, with those that failed
+because the ``database is locked`` counted separately. Runs once per
+``SQLITE_SYNCHRONOUS`` level, since group commit saves the most where every
+commit waits for an fsync:
+
+    python -m benchmarks.bench_write_queue
+    python -m benchmarks.bench_write_queue --processes 4 --clients 32 --synchronous FULL
+    SQLITE_BUSY_TIMEOUT=200 python -m benchmarks.bench_write_queue   # lock errors show up sooner
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MODES = {"off": {"WRITE_COALESCING": "0"}, "on": {"WRITE_COALESCING": "1"}}
+
+
+async def _drive(clients: int, seconds: float, start_at: float, goal: int) -> dict:
+    from benchmarks.common import app_client
+
+    latencies, failed, locked = [], 0, 0
+    async with app_client(timeout=None) as client:
+        writes = (
+            lambda i: client.post("/api/activities", json={"activity_type": "exercise", "duration_minutes": i % 60}),
+            lambda i: client.post("/api/journal", json={"content": f"Short note {i}", "tags": "work"}),
+            lambda i: client.put(f"/api/goals/{goal}/progress", params={"current_value": i % 100}),
+            lambda i: client.post("/api/mood", json={"mood_level": i % 10 + 1}),
+        )
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        deadline = time.monotonic() + seconds
+
+        async def worker(offset: int):
+            nonlocal failed, locked
+            i = offset
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await writes[i % len(writes)](i)
+                if response.status_code >= 400:
+                    failed += 1
+                    locked += "database is locked" in response.text
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                i += clients
+
+        await asyncio.gather(*(worker(offset) for offset in range(clients)))
+    return {"latencies": latencies, "failed": failed, "locked": locked}
+
+
+def _process(clients: int, seconds: float, start_at: float, goal: int, results):
+    import logging
+
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)  # slow commits are expected under contention
+    results.put(asyncio.run(_drive(clients, seconds, start_at, goal)))
+
+
+def _child(processes: int, clients: int, seconds: float, label: str):
+    from app import crud, database, models, schemas
+    from benchmarks.common import percentile, prepare_database
+
+    prepare_database()  # the schema is ready before the workers start
+
+    with database.SessionLocal() as db:
+        goal = crud.create_goal(db, models.DEFAULT_USER_ID, schemas.GoalCreate(
+            title="Walk", goal_type="activity", target_value=100.0)).id
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start_at = time.time() + 3 + processes  # after every process has imported the app
+    workers = [context.Process(target=_process, args=(clients, seconds, start_at, goal, results))
+               for _ in range(processes)]
+    for process in workers:
+        process.start()
+    outcomes = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+
+    latencies = [latency for outcome in outcomes for latency in outcome["latencies"]]
+    failed = sum(outcome["failed"] for outcome in outcomes)
+    locked = sum(outcome["locked"] for outcome in outcomes)
+    attempted = len(latencies) + failed
+    p50, p95 = (percentile(latencies, 50), percentile(latencies, 95)) if latencies else (0.0, 0.0)
+    print(f"{label:<16} {len(latencies) / seconds:>9.0f} {p50:>8.1f} {p95:>8.1f} {failed:>7} "
+          f"{locked:>7} {locked / max(attempted, 1):>8.2%}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients per process")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--synchronous", default="NORMAL,FULL", help="SQLITE_SYNCHRONOUS levels to run")
+    parser.add_argument("--modes", default="off,on")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.processes, args.clients, args.seconds, args.child)
+        return
+
+    print(f"{'sync / coalesce':<16} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7} {'locked':>7} "
+          f"{'locked %':>8}")
+    root = Path(__file__).resolve().parent.parent
+    for synchronous in args.synchronous.split(","):
+        for mode in args.modes.split(","):
+            workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+            env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db",
+                       SQLITE_SYNCHRONOUS=synchronous, **MODES[mode])
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_write_queue", "--child", f"{synchronous} / {mode}",
+                 "--processes", str(args.processes), "--clients", str(args.clients), "--seconds", str(args.seconds)],
+                cwd=workdir, env=env, check=True
+            )
+
+
+if __name__ == "__main__":
+    main()
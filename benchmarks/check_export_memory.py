@@ -0,0 +1,95 @@
+"""Check that /api/export streams in constant memory.
+
+Fills a database with 1M activity rows in one process, then exports it in a
+fresh one and compares the peak RSS after the first few output chunks with
+the peak at the end. Exits 1 if memory grew by more than the tolerance.
+
+    python -m benchmarks.check_export_memory
+    python -m benchmarks.check_export_memory --rows 200000 --format csv --gzip
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+WARMUP_CHUNKS = 32  # caches, pools and imports are settled by then
+
+
+def _peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _fill(rows: int, chunk: int = 50_000):
+    from sqlalchemy import insert
+    from app import models
+    from benchmarks.common import prepare_database
+
+    engine = prepare_database()
+    rng = random.Random(42)
+    start = datetime(2000, 1, 1)
+    for offset in range(0, rows, chunk):
+        with engine.begin() as connection:
+            connection.execute(insert(models.WellnessActivity), [{
+                "user_id": models.DEFAULT_USER_ID,
+                "date": start + timedelta(minutes=i),
+                "activity_type": rng.choice(["exercise", "meditation", "reading", "social"]),
+                "duration_minutes": rng.randint(5, 120),
+                "description": "Synthetic activity for the export memory check",
+            } for i in range(offset, min(offset + chunk, rows))])
+
+
+def _export(fmt: str, compress: bool) -> float:
+    from app import database, export, models
+
+    database.configure()
+    baseline = None
+    written = 0
+    started = time.perf_counter()
+    for index, chunk in enumerate(export.stream(fmt, ["activities"], models.DEFAULT_USER_ID, compress=compress)):
+        written += len(chunk)
+        if index == WARMUP_CHUNKS:
+            baseline = _peak_rss_mib()
+    elapsed = time.perf_counter() - started
+    peak = _peak_rss_mib()
+    baseline = baseline or peak
+    print(f"exported {written / 2**20:.1f} MiB in {elapsed:.1f}s; peak RSS {baseline:.1f} MiB "
+          f"after the first {WARMUP_CHUNKS} chunks, {peak:.1f} MiB at the end")
+    return peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--tolerance-mib", type=float, default=16)
+    parser.add_argument("--child", choices=("fill", "export"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "fill":
+        _fill(args.rows)
+        return 0
+    if args.child == "export":
+        growth = _export(args.format, args.gzip)
+        ok = growth <= args.tolerance_mib
+        print(f"{'ok' if ok else 'FAIL'}: RSS grew {growth:.1f} MiB (tolerance {args.tolerance_mib} MiB)")
+        return 0 if ok else 1
+
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    command = [sys.executable, "-m", "benchmarks.check_export_memory", "--rows", str(args.rows),
+               "--format", args.format, "--tolerance-mib", str(args.tolerance_mib)] + (["--gzip"] if args.gzip else [])
+    print(f"filling {args.rows} rows...")
+    subprocess.run(command + ["--child", "fill"], cwd=workdir, env=env, check=True)
+    return subprocess.run(command + ["--child", "export"], cwd=workdir, env=env).returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
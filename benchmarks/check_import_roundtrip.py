@@ -0,0 +1,114 @@
+"""Check that exported data imports back unchanged.
+
+Creates records of every type for one account, including empty strings in
+required text fields and missing optional values, exports them as CSV (one
+type at a time) and as NDJSON, imports each export into a fresh account and
+compares that account's export with the original, leaving out ids and
+timestamps. Exits 1 if any record differs or fails to import.
+
+    python -m benchmarks.check_import_roundtrip
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RECORDS = {
+    "mood": [
+        {"mood_level": 7, "energy_level": 5, "stress_level": 3, "sleep_hours": 7.5, "notes": "Good day",
+         "date": "2026-01-02T08:30:00"},
+        {"mood_level": 4, "date": "2026-01-03T21:00:00"},
+    ],
+    "journal": [
+        {"title": "Walk", "content": "Long walk, with a comma and \"quotes\"\nover two lines", "tags": "walk,calm",
+         "mood_before": 4, "mood_after": 7, "date": "2026-01-02T20:00:00"},
+        {"content": "", "date": "2026-01-03T20:00:00"},
+    ],
+    "activities": [
+        {"activity_type": "exercise", "duration_minutes": 30, "description": "Run", "mood_impact": 2,
+         "date": "2026-01-02T07:00:00"},
+        {"activity_type": "", "date": "2026-01-03T07:00:00"},
+    ],
+    "goals": [
+        {"title": "Sleep more", "goal_type": "sleep", "target_value": 8, "current_value": 6.5,
+         "target_date": "2026-03-01T00:00:00"},
+        {"title": "", "goal_type": "", "is_completed": True},
+    ],
+}
+IGNORED = {"id", "created_at", "updated_at"}
+
+
+async def _account(client, username: str) -> dict:
+    credentials = {"username": username, "password": "roundtrip-password"}
+    (await client.post("/api/auth/register", json=credentials)).raise_for_status()
+    token = (await client.post("/api/auth/token", json=credentials)).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _csv_rows(body: str) -> list:
+    return [{key: value for key, value in row.items() if key not in IGNORED} for row in csv.DictReader(io.StringIO(body))]
+
+
+def _ndjson_rows(body: str) -> list:
+    rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+    return [{key: value for key, value in row.items() if key not in IGNORED} for row in rows]
+
+
+def _compare(name: str, original: list, imported: list, result: dict) -> bool:
+    ok = not result["failed"] and sorted(map(repr, original)) == sorted(map(repr, imported))
+    print(f"{'ok' if ok else 'FAIL':>4}  {name}: {len(original)} exported, {result['created']} imported, "
+          f"{result['failed']} failed")
+    if not ok:
+        for error in result["errors"]:
+            print(f"      {error}")
+        for row in original:
+            if row not in imported:
+                print(f"      missing {row}")
+    return ok
+
+
+async def _child() -> int:
+    from benchmarks.common import app_client
+
+    failures = 0
+    async with app_client() as client:
+        source = await _account(client, "roundtrip-source")
+        for record_type, items in RECORDS.items():
+            results = (await client.post(f"/api/{record_type}/batch", json=items, headers=source)).json()["results"]
+            assert all(result["status"] == "created" for result in results), results
+
+        for record_type in RECORDS:
+            target = await _account(client, f"roundtrip-csv-{record_type}")
+            params = {"format": "csv", "types": record_type}
+            exported = (await client.get("/api/export", params=params, headers=source)).text
+            result = (await client.post("/api/import", params={"format": "csv", "type": record_type},
+                                        content=exported, headers=target)).json()
+            imported = (await client.get("/api/export", params=params, headers=target)).text
+            failures += not _compare(f"csv {record_type}", _csv_rows(exported), _csv_rows(imported), result)
+
+        target = await _account(client, "roundtrip-ndjson")
+        exported = (await client.get("/api/export", headers=source)).text
+        result = (await client.post("/api/import", content=exported, headers=target)).json()
+        imported = (await client.get("/api/export", headers=target)).text
+        failures += not _compare("ndjson", _ndjson_rows(exported), _ndjson_rows(imported), result)
+    return 1 if failures else 0
+
+
+def main():
+    if "--child" in sys.argv:
+        return asyncio.run(_child())
+
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/check.db", CACHE_ENABLED="0")
+    return subprocess.run([sys.executable, "-m", "benchmarks.check_import_roundtrip", "--child"],
+                          cwd=workdir, env=env).returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Assert that the crud read paths are served by indexes.
+
+Every SELECT issued by the functions below is captured and run through
+``EXPLAIN QUERY PLAN`` against a populated database; the check fails on a
+full table scan or a temporary B-tree sort over one of the raw tables.
+
+    python -m benchmarks.check_query_plans
+"""
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import crud, migrations, models
+from benchmarks.common import fill_mood_entries, temp_engine
+
+RAW_TABLES = ("mood_entries", "journal_entries", "wellness_activities", "goals", "tags", "journal_entry_tags")
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+USER = models.DEFAULT_USER_ID
+
+CHECKS = {
+    "get_mood_entries": lambda db: crud.get_mood_entries(db, USER, limit=20),
+    "get_mood_entries_cursor": lambda db: crud.get_mood_entries(
+        db, USER, limit=20, cursor=crud.get_mood_entries(db, USER, limit=20)[1]),
+    "get_mood_entry_by_date": lambda db: crud.get_mood_entry_by_date(db, USER, datetime.now()),
+    "get_journal_entries": lambda db: crud.get_journal_entries(db, USER, limit=20),
+    "get_journal_entries_by_any_tag": lambda db: crud.get_journal_entries_by_tags(
+        db, USER, ["work", "sleep"], limit=20),
+    "get_journal_entries_by_all_tags": lambda db: crud.get_journal_entries_by_tags(
+        db, USER, ["work", "sleep"], match_all=True, limit=20),
+    "count_journal_entries_by_tags": lambda db: crud.count_journal_entries_by_tags(db, USER, ["work", "sleep"]),
+    "get_tag_counts": lambda db: crud.get_tag_counts(db, USER),
+    "get_wellness_activities": lambda db: crud.get_wellness_activities(db, USER, limit=20),
+    "get_activities_by_type": lambda db: crud.get_activities_by_type(db, USER, "exercise", limit=20),
+    "get_goals": lambda db: crud.get_goals(db, USER, limit=20),
+    "get_active_goals": lambda db: crud.get_goals(db, USER, limit=20, include_completed=False),
+    "get_active_goals_cursor": lambda db: crud.get_goals(
+        db, USER, limit=20, include_completed=False, cursor=crud.encode_cursor("2030-01-01 00:00:00", 1)),
+    "get_mood_trends": lambda db: crud.get_mood_trends(db, USER, 30),
+    "get_recent_activities": lambda db: crud.get_recent_activities(db, USER, 7),
+}
+
+# Rows are found through the tag indexes; only the matching entries get sorted by date
+SORT_ALLOWED = {"get_journal_entries_by_any_tag", "get_journal_entries_by_all_tags"}
+
+
+def plan_problems(connection, statement, parameters, allow_sort=False):
+    problems = []
+    for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+        detail = row[-1]
+        scan = FULL_SCAN.match(detail)
+        if scan and scan.group(1) in RAW_TABLES:
+            problems.append(detail)
+        if detail.startswith(SORT) and not allow_sort and any(table in statement for table in RAW_TABLES):
+            problems.append(detail)
+    return problems
+
+
+def main():
+    engine, SessionLocal = temp_engine()
+    with engine.begin() as connection:
+        migrations.upgrade(connection)
+    fill_mood_entries(engine, 5000)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    for name, check in CHECKS.items():
+        captured.clear()
+        with SessionLocal() as db:
+            check(db)
+        with engine.connect() as connection:
+            problems = [p for s, params in captured for p in plan_problems(connection, s, params, name in SORT_ALLOWED)]
+        status = "FAIL" if problems else "ok"
+        print(f"{status:>4}  {name}" + (f": {'; '.join(problems)}" if problems else ""))
+        failures += bool(problems)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
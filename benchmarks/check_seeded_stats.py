@@ -0,0 +1,73 @@
+"""Check that seeded benchmark data shows up in the dashboard aggregates.
+
+Fills one user's mood history with ``common.fill_mood_entries`` (raw inserts,
+as most benchmarks do) and seeds another user with ``seed.seed`` (the crud
+batch inserters), then checks that the stats and trends read from the
+rollups count every seeded row and that ``rollups.verify`` finds no drift.
+Exits 1 if any check fails, since benchmarks on empty rollups time nothing.
+
+    python -m benchmarks.check_seeded_stats
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+def _checks(db, user_id: int, expected: dict) -> dict:
+    from app import crud
+
+    stats = crud.get_wellness_stats(db, user_id)
+    trends = crud.get_mood_trends(db, user_id, days=365)
+    checks = {
+        f"total_entries == {expected['mood']}": stats.total_entries == expected["mood"],
+        "avg_mood is set": stats.avg_mood is not None,
+        "trends have mood points": any(point["mood"] is not None for point in trends),
+    }
+    if "journal" in expected:
+        checks[f"total_journal_entries == {expected['journal']}"] = stats.total_journal_entries == expected["journal"]
+        checks[f"total_activities == {expected['activities']}"] = stats.total_activities == expected["activities"]
+        goals = stats.completed_goals + stats.active_goals
+        checks[f"goals == {expected['goals']}"] = goals == expected["goals"]
+    return checks
+
+
+def _child() -> int:
+    from app import crud, database, models, rollups
+    from benchmarks import seed
+    from benchmarks.common import fill_mood_entries, prepare_database
+
+    engine = prepare_database()
+    fill_mood_entries(engine, 400)
+    with database.SessionLocal() as db:
+        seeded = crud.create_user(db, "seeded", "not-a-password-hash")
+        counts = seed.seed(db, years=1, user_id=seeded.id)
+        results = {
+            "fill_mood_entries": _checks(db, models.DEFAULT_USER_ID, {"mood": 400}),
+            "seed.seed": _checks(db, seeded.id, counts),
+        }
+        drift = rollups.verify(db)
+    results["rollups"] = {f"no drift ({len(drift)} drifted values)": not drift}
+
+    failures = 0
+    for source, checks in results.items():
+        for name, ok in checks.items():
+            print(f"{'ok' if ok else 'FAIL':>4}  {source}: {name}")
+            failures += not ok
+    return 1 if failures else 0
+
+
+def main():
+    if "--child" in sys.argv:
+        return _child()
+
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/check.db")
+    return subprocess.run([sys.executable, "-m", "benchmarks.check_seeded_stats", "--child"],
+                          cwd=workdir, env=env).returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Shared helpers for the benchmark scripts.
+
+Run any benchmark from the repository root, e.g. ``python -m benchmarks.bench_stats``.
+"""
+import contextlib
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import models, rollups
+
+
+def temp_engine(name: str = "bench.db"):
+    """Create an engine on a fresh SQLite file with the app schema."""
+    path = Path(tempfile.mkdtemp(prefix="mhc-bench-")) / name
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def prepare_database():
+    """Set up the app's engines from the environment and bring the schema up to date, as app startup does."""
+    from app import database, migrations
+
+    migrations.prepare(database.configure())
+    return database.engine
+
+
+@contextlib.asynccontextmanager
+async def app_client(**client_args):
+    """An httpx client for the app in process over ASGI, with the app's startup and shutdown around it."""
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", **client_args) as client:
+            yield client
+
+
+def rebuild_rollups(engine):
+    """Recompute the rollups after raw inserts, which skip the crud write paths that maintain them."""
+    with Session(engine) as db:
+        rollups.rebuild(db)
+        db.commit()
+
+
+def fill_mood_entries(engine, count: int, chunk: int = 50_000, seed: int = 42, user_id: int = models.DEFAULT_USER_ID):
+    """Bulk insert ``count`` synthetic daily mood entries for one user, ending today, and rebuild the rollups."""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=count)
+    with engine.begin() as conn:
+        for offset in range(0, count, chunk):
+            rows = [{
+                "user_id": user_id,
+                "date": start + timedelta(days=i),
+                "entry_day": (start + timedelta(days=i)).date(),
+                "mood_level": rng.randint(1, 10),
+                "energy_level": rng.choice([None, rng.randint(1, 10)]),
+                "stress_level": rng.choice([None, rng.randint(1, 10)]),
+                "sleep_hours": rng.choice([None, round(rng.uniform(4, 10), 1)]),
+            } for i in range(offset, min(offset + chunk, count))]
+            conn.execute(insert(models.MoodEntry), rows)
+    rebuild_rollups(engine)
+
+
+def timed(fn, repeat: int = 5):
+    """Return the median wall time of ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def percentile(samples, pct: float):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,182 @@
+"""Synthetic multi-year wellness histories for benchmarks and local testing.
+
+Generates one mood check-in per day (with a few skipped days), journal
+entries, activities and goals, with the loose relationships real data has:
+mood drifts slowly and dips on weekdays, sleep and energy move with it,
+stress moves against it, and exercise and social days lift it a little.
+Rows go through the crud batch inserters, so rollups, tags and the search
+index are maintained exactly as for the batch endpoints.
+
+    python -m benchmarks.seed --years 5                  # into DATABASE_URL
+    python -m benchmarks.seed --years 10 --scale 4 --seed 7
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+from app import crud, models, schemas
+
+
+ACTIVITY_TYPES = {  # type: (relative frequency, typical minutes, mood lift)
+    "exercise": (5, 45, 0.6),
+    "meditation": (4, 15, 0.4),
+    "reading": (3, 30, 0.1),
+    "social": (3, 90, 0.5),
+    "nature": (2, 60, 0.5),
+    "music": (2, 30, 0.2),
+    "therapy": (1, 50, 0.3),
+}
+TAGS = ("work", "family", "sleep", "health", "friends", "anxiety", "gratitude", "exercise", "travel", "study")
+WORDS = ("today", "felt", "really", "tired", "calm", "busy", "walk", "talked", "with", "about", "work", "slept",
+         "badly", "well", "morning", "evening", "plans", "worried", "happy", "grateful", "meeting", "dinner")
+GOAL_TYPES = ("mood", "activity", "sleep", "journal")
+
+
+class Generator:
+    """Deterministic synthetic history ending today.
+
+    ``scale`` multiplies the journal, activity and goal rates; there is
+    always at most one mood check-in per day.
+    """
+
+    def __init__(self, years: float = 5, scale: float = 1.0, seed: int = 42):
+        self.days = max(1, int(years * 365))
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=self.days - 1)
+        self._baseline = self._mood_baseline()
+
+    def _mood_baseline(self) -> List[float]:
+        # Slow random walk around 6, pulled back towards the middle
+        level, levels = 6.0, []
+        for _ in range(self.days):
+            level += self.rng.gauss(0, 0.25) + (6.0 - level) * 0.05
+            levels.append(level)
+        return levels
+
+    def _at(self, day: int, hour_low: int = 7, hour_high: int = 23) -> datetime:
+        return self.start + timedelta(days=day, hours=self.rng.randint(hour_low, hour_high - 1),
+                                      minutes=self.rng.randint(0, 59))
+
+    def _count(self, rate: float) -> int:
+        # Binomial draw with mean ``rate``: a few chances per day, each under 50%
+        trials = math.ceil(rate * 2)
+        return sum(self.rng.random() < rate / trials for _ in range(trials)) if trials else 0
+
+    def _activities(self) -> List[str]:
+        names, weights = zip(*((name, spec[0]) for name, spec in ACTIVITY_TYPES.items()))
+        return self.rng.choices(names, weights=weights, k=self._count(1.5 * self.scale))
+
+    def _text(self, low: int, high: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high))).capitalize() + "."
+
+    def history(self) -> Iterator[Tuple[str, object]]:
+        """Yield ``(record_type, batch item)`` pairs, day by day."""
+        rng = self.rng
+        for day in range(self.days):
+            date = self.start + timedelta(days=day)
+            activities = self._activities()
+            lift = sum(ACTIVITY_TYPES[name][2] for name in activities)
+            weekday_dip = -0.4 if date.weekday() < 5 else 0.3
+            mood = min(10, max(1, round(self._baseline[day] + weekday_dip + lift + rng.gauss(0, 1.2))))
+
+            for name in activities:
+                minutes = max(5, int(rng.gauss(ACTIVITY_TYPES[name][1], ACTIVITY_TYPES[name][1] / 3)))
+                yield "activities", schemas.WellnessActivityBatchItem.model_construct(
+                    activity_type=name, duration_minutes=minutes, description=None,
+                    mood_impact=max(-5, min(5, round(ACTIVITY_TYPES[name][2] * 4 + rng.gauss(0, 1)))),
+                    notes=None, date=self._at(day, 6, 21),
+                )
+
+            if rng.random() < 0.93:
+                yield "mood", schemas.MoodEntryBatchItem.model_construct(
+                    mood_level=mood,
+                    energy_level=rng.choice([None, min(10, max(1, mood + rng.randint(-2, 2)))]),
+                    stress_level=min(10, max(1, 11 - mood + rng.randint(-2, 2))),
+                    sleep_hours=rng.choice([None, round(min(11, max(3, 5 + mood * 0.3 + rng.gauss(0, 0.8))), 1)]),
+                    notes=rng.choice([None, None, self._text(3, 12)]),
+                    date=self._at(day, 19, 23),
+                )
+
+            for _ in range(self._count(0.6 * self.scale)):
+                before = min(10, max(1, mood + rng.randint(-2, 1)))
+                yield "journal", schemas.JournalEntryBatchItem.model_construct(
+                    title=rng.choice([None, self._text(2, 5)]),
+                    content=self._text(20, 120),
+                    mood_before=before,
+                    mood_after=min(10, max(1, before + rng.randint(-1, 2))),
+                    tags=",".join(rng.sample(TAGS, rng.randint(0, 3))) or None,
+                    is_private=rng.random() < 0.2,
+                    date=self._at(day),
+                )
+
+            for _ in range(self._count(2 / 30 * self.scale)):
+                target = rng.choice([5.0, 10.0, 20.0, 30.0])
+                yield "goals", schemas.GoalBatchItem.model_construct(
+                    title=self._text(2, 6), description=rng.choice([None, self._text(5, 20)]),
+                    goal_type=rng.choice(GOAL_TYPES), target_value=target,
+                    current_value=float(rng.randint(0, int(target))),
+                    target_date=date + timedelta(days=rng.randint(14, 120)),
+                    start_date=date, is_completed=day < self.days - 60 and rng.random() < 0.7,
+                )
+
+
+BATCH_CREATORS = {
+    "mood": crud.create_mood_entries_batch,
+    "journal": crud.create_journal_entries_batch,
+    "activities": crud.create_wellness_activities_batch,
+    "goals": crud.create_goals_batch,
+}
+
+
+def seed(db, years: float = 5, scale: float = 1.0, random_seed: int = 42, chunk_size: int = 5000,
+         user_id: int = models.DEFAULT_USER_ID) -> dict:
+    """Write a generated history for one user through ``db``; returns the row count per record type."""
+    pending = {record_type: [] for record_type in BATCH_CREATORS}
+    counts = dict.fromkeys(BATCH_CREATORS, 0)
+
+    def flush(record_type):
+        items = list(enumerate(pending[record_type]))
+        results = BATCH_CREATORS[record_type](db, user_id, items, chunk_size=1000)
+        failed = [result for result in results if result["status"] != "created"]
+        if failed:
+            raise RuntimeError(f"Seeding {record_type} failed: {failed[0]}")
+        counts[record_type] += len(items)
+        pending[record_type] = []
+
+    for record_type, item in Generator(years, scale, random_seed).history():
+        pending[record_type].append(item)
+        if len(pending[record_type]) >= chunk_size:
+            flush(record_type)
+    for record_type in BATCH_CREATORS:
+        if pending[record_type]:
+            flush(record_type)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for journal, activity and goal rates")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app import database
+    from benchmarks.common import prepare_database
+
+    prepare_database()
+
+    started = time.perf_counter()
+    with database.SessionLocal() as db:
+        counts = seed(db, args.years, args.scale, args.seed)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(", ".join(f"{count} {record_type}" for record_type, count in counts.items()))
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
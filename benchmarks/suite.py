@@ -0,0 +1,263 @@
+"""Throughput and latency of every API endpoint on a seeded database.
+
+Seeds a fresh database with ``benchmarks.seed``, then drives the app in
+process over ASGI with ``--concurrency`` clients: ``--requests`` requests per
+endpoint, reads first, then creates, updates and deletes. Reports requests
+per second and p50/p95/p99 latency per endpoint. Results can be saved as a
+JSON baseline and later runs compared against it; the comparison exits with
+status 1 if any endpoint's p95 got slower by more than ``--tolerance``:
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --compare baseline.json
+    python -m benchmarks.suite --years 10 --scale 2 --only /api/journal
+    DB_ASYNC=1 CACHE_ENABLED=0 python -m benchmarks.suite --compare baseline.json
+
+Settings such as ``DB_ASYNC`` and ``CACHE_ENABLED`` are passed through from
+the environment and recorded in the results.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+RECORDED_SETTINGS = ("DB_ASYNC", "CACHE_ENABLED", "METRICS_ENABLED", "SQLITE_WAL", "SQLITE_SYNCHRONOUS", "WRITE_COALESCING")
+TABLES = {"mood": "mood_entries", "journal": "journal_entries", "activities": "wellness_activities", "goals": "goals"}
+
+
+def _mood(i):
+    return {"mood_level": i % 10 + 1, "energy_level": (i * 3) % 10 + 1, "stress_level": (i * 7) % 10 + 1,
+            "sleep_hours": 5 + i % 5, "notes": "Benchmark check-in"}
+
+
+def _journal(i):
+    return {"title": f"Entry {i}", "content": "Felt calm after a long walk and talked with friends about work. " * 4,
+            "mood_before": i % 10 + 1, "mood_after": (i + 2) % 10 + 1, "tags": "work,friends"}
+
+
+def _activity(i):
+    return {"activity_type": ("exercise", "meditation", "reading")[i % 3], "duration_minutes": 10 + i % 50,
+            "mood_impact": i % 5}
+
+
+def _goal(i):
+    return {"title": f"Goal {i}", "goal_type": "activity", "target_value": 20.0, "current_value": 0.0}
+
+
+def _past(i):
+    # Distinct past days, so batched mood items do not replace each other
+    return (datetime.now() - timedelta(days=i + 1)).isoformat()
+
+
+def _batch(body, size: int = 50):
+    return lambda i: [dict(body(i * size + n), date=_past(i * size + n)) for n in range(size)]
+
+
+# (method, path, body); "{mood}", "{journal}", ... take ids of existing rows, newest first
+READS = (
+    ("GET", "/health", None),
+    ("GET", "/api/dashboard", None),
+    ("GET", "/api/dashboard/stats", None),
+    ("GET", "/api/dashboard/trends", None),
+    ("GET", "/api/dashboard/trends?range=5y&bucket=week", None),
+    ("GET", "/api/dashboard/recent", None),
+    ("GET", "/api/analytics/rolling?days=365", None),
+    ("GET", "/api/analytics/streaks", None),
+    ("GET", "/api/analytics/correlations", None),
+    ("GET", "/api/analytics/activity-impact", None),
+    ("GET", "/api/mood?limit=20", None),
+    ("GET", "/api/mood?limit=100&include_total=false", None),
+    ("GET", "/api/mood/today", None),
+    ("GET", "/api/journal?limit=20", None),
+    ("GET", "/api/journal/{journal}", None),
+    ("GET", "/api/journal/search?q=walk", None),
+    ("GET", "/api/journal/search?q=grat&prefix=true", None),
+    ("GET", "/api/journal/tags", None),
+    ("GET", "/api/journal/tagged?tags=work,family&match=any&limit=20", None),
+    ("GET", "/api/activities?limit=20", None),
+    ("GET", "/api/goals?limit=20", None),
+    ("GET", "/api/goals/{goals}", None),
+    ("GET", "/api/export?types=mood&format=csv", None),
+    ("GET", "/metrics", None),
+)
+WRITES = (
+    ("POST", "/api/mood", _mood),
+    ("POST", "/api/journal", _journal),
+    ("POST", "/api/activities", _activity),
+    ("POST", "/api/goals", _goal),
+    ("POST", "/api/mood/batch", _batch(_mood)),
+    ("POST", "/api/journal/batch", _batch(_journal)),
+    ("POST", "/api/activities/batch", _batch(_activity)),
+    ("PUT", "/api/mood/{mood}", _mood),
+    ("PUT", "/api/journal/{journal}", _journal),
+    ("PUT", "/api/activities/{activities}", _activity),
+    ("PUT", "/api/goals/{goals}/progress?current_value=5", None),
+    ("POST", "/api/goals/{goals}/complete", None),
+    ("DELETE", "/api/mood/{mood}", None),
+    ("DELETE", "/api/journal/{journal}", None),
+    ("DELETE", "/api/activities/{activities}", None),
+    ("DELETE", "/api/goals/{goals}", None),
+)
+
+
+def _ids(kinds, limit: int) -> dict:
+    from sqlalchemy import text
+    from app import database
+
+    with database.engine.connect() as conn:
+        return {kind: conn.execute(text(f"SELECT id FROM {TABLES[kind]} ORDER BY id DESC LIMIT :limit"),
+                                   {"limit": limit}).scalars().all() for kind in kinds}
+
+
+async def _run_endpoint(client, method: str, path: str, body, requests: int, concurrency: int) -> dict:
+    kinds = [kind for kind in TABLES if f"{{{kind}}}" in path]
+    ids = _ids(kinds, requests)
+    if method == "DELETE":
+        # Each row can only be deleted once
+        requests = min([requests] + [len(pool) for pool in ids.values()])
+    latencies, errors = [], 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            url = path.format(**{kind: pool[i % len(pool)] for kind, pool in ids.items() if pool})
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body(i) if body else None)
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return _summary(latencies, errors, elapsed)
+
+
+def _summary(latencies, errors: int, elapsed: float) -> dict:
+    from benchmarks.common import percentile
+
+    if not latencies:
+        return {"requests": 0, "errors": errors, "rps": 0.0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def _print_row(name: str, result: dict):
+    latency = " ".join(f"{result[key]:>8.2f}" if result[key] is not None else f"{'-':>8}"
+                       for key in ("p50_ms", "p95_ms", "p99_ms"))
+    print(f"{name:<60} {result['requests']:>6} {result['errors']:>6} {result['rps']:>8.0f} {latency}", flush=True)
+
+
+async def _child(args, out: Path):
+    import logging
+
+    from app import database
+    from benchmarks import seed
+    from benchmarks.common import app_client
+
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)  # slow write statements are expected under contention
+    async with app_client(timeout=None) as client:
+        started = time.perf_counter()
+        with database.SessionLocal() as db:
+            counts = seed.seed(db, args.years, args.scale, args.seed)
+        print(f"seeded {', '.join(f'{count} {kind}' for kind, count in counts.items())} "
+              f"in {time.perf_counter() - started:.1f}s", flush=True)
+
+        endpoints = [spec for spec in READS + WRITES if not args.only or args.only in spec[1]]
+        print(f"{'endpoint':<60} {'reqs':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        results = {}
+        for method, path, body in endpoints:
+            name = f"{method} {path}"
+            if method == "GET":
+                await _run_endpoint(client, method, path, body, min(20, args.requests), args.concurrency)  # warm up
+            results[name] = await _run_endpoint(client, method, path, body, args.requests, args.concurrency)
+            _print_row(name, results[name])
+
+    out.write_text(json.dumps({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "years": args.years, "scale": args.scale, "seed": args.seed,
+            "requests": args.requests, "concurrency": args.concurrency,
+            "rows": counts, "settings": {name: os.getenv(name) for name in RECORDED_SETTINGS if os.getenv(name)},
+        },
+        "endpoints": results,
+    }, indent=2))
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Print p95 and throughput against the baseline; return the endpoints whose p95 regressed."""
+    if baseline["config"] != current["config"]:
+        print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+    regressions = []
+    print(f"\n{'endpoint':<60} {'base p95':>9} {'p95':>9} {'change':>8} {'base req/s':>11} {'req/s':>8}")
+    for name, result in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base or base["p95_ms"] is None or result["p95_ms"] is None:
+            continue
+        change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        flag = " !" if change > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<60} {base['p95_ms']:>9.2f} {result['p95_ms']:>9.2f} {change:>+7.0%} "
+              f"{base['rps']:>11.0f} {result['rps']:>8.0f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=5, help="years of seeded history")
+    parser.add_argument("--scale", type=float, default=1.0, help="journal, activity and goal rate multiplier")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", help="only endpoints whose path contains this")
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="compare with a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95 slowdown (0.5 = 50%%)")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args, args.child))
+        return
+
+    root = Path(__file__).resolve().parent.parent
+    workdir = tempfile.mkdtemp(prefix="mhc-bench-")
+    out = Path(workdir) / "results.json"
+    env = dict(os.environ, PYTHONPATH=str(root), DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    child_args = ["--years", str(args.years), "--scale", str(args.scale), "--seed", str(args.seed),
+                  "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    if args.only:
+        child_args += ["--only", args.only]
+    subprocess.run([sys.executable, "-m", "benchmarks.suite", "--child", str(out)] + child_args,
+                   cwd=workdir, env=env, check=True)
+
+    current = json.loads(out.read_text())
+    if args.save:
+        args.save.write_text(out.read_text())
+        print(f"\nsaved {args.save}")
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), current, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
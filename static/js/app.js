@@ -29,16 +29,118 @@ function showMessage(message, type = 'success') {
     }
 }
 
+// For user text inserted with innerHTML
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// Dashboard: every panel in one request, see /api/dashboard
+async function loadDashboard() {
+    const response = await fetch(`${API_BASE}/api/dashboard?fields=stats,mood,journal,activities,goals`);
+    if (!response.ok) throw new Error('Failed to load dashboard');
+
+    const data = await response.json();
+    renderDashboardStats(data.stats);
+    renderMoodEntries(state.mood = data.mood);
+    renderJournalPanel(state.journal = data.journal);
+    renderActivities(state.activities = data.activities);
+    renderGoals(state.goals = data.goals);
+}
+
+// Live updates: /api/events pushes each saved or deleted item and the new
+// stats, which are patched into the lists loaded last instead of refetching
+const state = { mood: null, journal: null, activities: null, goals: null };
+const LIVE_LISTS = {
+    mood: { key: 'mood', items: 'entries', render: renderMoodEntries },
+    journal: { key: 'journal', items: 'entries', render: renderJournalPanel },
+    activity: { key: 'activities', items: 'activities', render: renderActivities },
+    goal: { key: 'goals', items: 'goals', render: renderGoals }
+};
+let liveEvents = null;
+let dashboardLoading = false;
+let pendingEvents = [];
+
+function liveUpdatesOpen() {
+    return liveEvents !== null && liveEvents.readyState === EventSource.OPEN;
+}
+
+function connectLiveUpdates() {
+    liveEvents = new EventSource(`${API_BASE}/api/events`);
+    // Sent on every (re)connect: reload once, then follow the deltas
+    liveEvents.addEventListener('ready', reloadDashboard);
+    ['stats', 'resync', ...Object.keys(LIVE_LISTS)].forEach(name => {
+        liveEvents.addEventListener(name, event => onLiveEvent(name, JSON.parse(event.data)));
+    });
+}
+
+async function reloadDashboard() {
+    dashboardLoading = true;
+    try {
+        await loadDashboard();
+    } catch (error) {
+        console.error('Error loading dashboard:', error);
+        showMessage('Failed to load application. Please refresh the page.', 'error');
+    } finally {
+        // Deltas that arrived meanwhile may or may not be in the response; applying them again is harmless
+        dashboardLoading = false;
+        const pending = pendingEvents;
+        pendingEvents = [];
+        pending.forEach(([name, data]) => onLiveEvent(name, data));
+    }
+}
+
+function onLiveEvent(name, data) {
+    if (dashboardLoading) {
+        pendingEvents.push([name, data]);
+    } else if (name === 'stats') {
+        renderDashboardStats(data);
+    } else if (name === 'resync') {
+        reloadDashboard();
+    } else {
+        applyChange(name, data);
+    }
+}
+
+function applyChange(name, change) {
+    const list = LIVE_LISTS[name];
+    const panel = state[list.key];
+    if (!panel) return;
+
+    const items = panel[list.items];
+    const index = items.findIndex(item => item.id === change.item.id);
+    if (change.action === 'deleted') {
+        if (index >= 0) items.splice(index, 1);
+    } else if (index >= 0) {
+        items[index] = change.item;
+    } else {
+        items.unshift(change.item);
+    }
+    // Keep search results on screen; the list is up to date once the search is cleared
+    if (name === 'journal' && document.getElementById('journal-search')?.value.trim()) return;
+    list.render(panel);
+}
+
+// After a form submit: show the saved item right away, and refetch stats only without a live stream
+function showSaved(name, item) {
+    applyChange(name, { action: 'saved', item });
+    if (!liveUpdatesOpen()) loadDashboardStats();
+}
+
 // Dashboard stats
+function renderDashboardStats(stats) {
+    document.getElementById('total-entries').textContent = stats.total_entries;
+    document.getElementById('avg-mood').textContent = stats.avg_mood ? stats.avg_mood.toFixed(1) : 'N/A';
+    document.getElementById('journal-entries').textContent = stats.total_journal_entries;
+    document.getElementById('active-goals').textContent = stats.active_goals;
+}
+
 async function loadDashboardStats() {
     try {
         const response = await fetch(`${API_BASE}/api/dashboard/stats`);
         if (response.ok) {
-            const stats = await response.json();
-            document.getElementById('total-entries').textContent = stats.total_entries;
-            document.getElementById('avg-mood').textContent = stats.avg_mood ? stats.avg_mood.toFixed(1) : 'N/A';
-            document.getElementById('journal-entries').textContent = stats.total_journal_entries;
-            document.getElementById('active-goals').textContent = stats.active_goals;
+            renderDashboardStats(await response.json());
         }
     } catch (error) {
         console.error('Error loading dashboard stats:', error);
@@ -128,72 +230,53 @@ async function createMoodEntry(event) {
         console.log('Mood entry saved successfully:', data);
         showMessage('Mood entry saved successfully!');
         hideMoodForm();
-        loadMoodEntries();
-        loadDashboardStats();
+        showSaved('mood', data);
     } catch (error) {
         console.error('Error creating mood entry:', error);
         showMessage(error.message || 'Failed to save mood entry. Please check the console for details.', 'error');
     }
 }
 
-async function loadMoodEntries() {
-    const container = document.getElementById('mood-entries');
+function renderMoodEntries(data) {
     const loading = document.getElementById('mood-loading');
     const empty = document.getElementById('mood-empty');
     const list = document.getElementById('mood-list');
 
-    try {
-        loading.classList.remove('hidden');
-        empty.classList.add('hidden');
-        list.classList.add('hidden');
+    loading.classList.add('hidden');
 
-        const response = await fetch(`${API_BASE}/api/mood`);
-        if (!response.ok) throw new Error('Failed to load mood entries');
+    empty.classList.toggle('hidden', data.entries.length > 0);
+    list.classList.toggle('hidden', data.entries.length === 0);
 
-        const data = await response.json();
-        loading.classList.add('hidden');
+    list.innerHTML = '';
+    data.entries.forEach(entry => {
+        const entryDiv = document.createElement('div');
+        entryDiv.className = 'list-item';
 
-        if (data.entries.length === 0) {
-            empty.classList.remove('hidden');
-            return;
-        }
+        const moodEmoji = entry.mood_level >= 7 ? '😊' : entry.mood_level >= 4 ? '😐' : '😢';
+        const energyEmoji = entry.energy_level >= 7 ? '⚡' : entry.energy_level >= 4 ? '🔋' : '😴';
+        const stressEmoji = entry.stress_level >= 7 ? '😰' : entry.stress_level >= 4 ? '😟' : '😌';
 
-        list.innerHTML = '';
-        data.entries.forEach(entry => {
-            const entryDiv = document.createElement('div');
-            entryDiv.className = 'list-item';
-
-            const moodEmoji = entry.mood_level >= 7 ? '😊' : entry.mood_level >= 4 ? '😐' : '😢';
-            const energyEmoji = entry.energy_level >= 7 ? '⚡' : entry.energy_level >= 4 ? '🔋' : '😴';
-            const stressEmoji = entry.stress_level >= 7 ? '😰' : entry.stress_level >= 4 ? '😟' : '😌';
-
-            entryDiv.innerHTML = `
-                <div class="item-header">
-                    <div class="item-date">${new Date(entry.date).toLocaleDateString()}</div>
+        entryDiv.innerHTML = `
+            <div class="item-header">
+                <div class="item-date">${new Date(entry.date).toLocaleDateString()}</div>
+            </div>
+            <div class="item-meta">
+                <div class="meta-item">
+                    <span class="meta-badge primary">${moodEmoji} Mood: ${entry.mood_level}/10</span>
                 </div>
-                <div class="item-meta">
-                    <div class="meta-item">
-                        <span class="meta-badge primary">${moodEmoji} Mood: ${entry.mood_level}/10</span>
-                    </div>
-                    <div class="meta-item">
-                        <span class="meta-badge primary">${energyEmoji} Energy: ${entry.energy_level}/10</span>
-                    </div>
-                    <div class="meta-item">
-                        <span class="meta-badge ${entry.stress_level >= 7 ? 'warning' : 'success'}">${stressEmoji} Stress: ${entry.stress_level}/10</span>
-                    </div>
-                    ${entry.sleep_hours ? `<div class="meta-item"><span class="meta-badge">💤 Sleep: ${entry.sleep_hours}h</span></div>` : ''}
+                <div class="meta-item">
+                    <span class="meta-badge primary">${energyEmoji} Energy: ${entry.energy_level}/10</span>
                 </div>
-                ${entry.notes ? `<div style="margin-top: 1rem; color: var(--text-secondary);">${entry.notes}</div>` : ''}
-            `;
-
-            list.appendChild(entryDiv);
-        });
+                <div class="meta-item">
+                    <span class="meta-badge ${entry.stress_level >= 7 ? 'warning' : 'success'}">${stressEmoji} Stress: ${entry.stress_level}/10</span>
+                </div>
+                ${entry.sleep_hours ? `<div class="meta-item"><span class="meta-badge">💤 Sleep: ${entry.sleep_hours}h</span></div>` : ''}
+            </div>
+            ${entry.notes ? `<div style="margin-top: 1rem; color: var(--text-secondary);">${escapeHtml(entry.notes)}</div>` : ''}
+        `;
 
-        list.classList.remove('hidden');
-    } catch (error) {
-        loading.classList.add('hidden');
-        showMessage('Failed to load mood entries', 'error');
-    }
+        list.appendChild(entryDiv);
+    });
 }
 
 // Journal functionality
@@ -254,8 +337,7 @@ async function createJournalEntry(event) {
 
         showMessage('Journal entry saved successfully!');
         hideJournalForm();
-        loadJournalEntries();
-        loadDashboardStats();
+        showSaved('journal', data);
     } catch (error) {
         console.error('Error creating journal entry:', error);
         showMessage(error.message || 'Failed to save journal entry. Please try again.', 'error');
@@ -276,37 +358,81 @@ async function loadJournalEntries() {
         const response = await fetch(`${API_BASE}/api/journal`);
         if (!response.ok) throw new Error('Failed to load journal entries');
 
-        const data = await response.json();
+        renderJournalPanel(state.journal = await response.json());
+    } catch (error) {
         loading.classList.add('hidden');
+        showMessage('Failed to load journal entries', 'error');
+    }
+}
 
-        if (data.entries.length === 0) {
-            empty.classList.remove('hidden');
-            return;
-        }
+function renderJournalPanel(data) {
+    const loading = document.getElementById('journal-loading');
+    const empty = document.getElementById('journal-empty');
+    const list = document.getElementById('journal-list');
 
-        list.innerHTML = '';
-        data.entries.forEach(entry => {
-            const entryDiv = document.createElement('div');
-            entryDiv.className = 'list-item';
+    loading.classList.add('hidden');
 
-            entryDiv.innerHTML = `
-                <div class="item-header">
-                    <div class="item-date">${new Date(entry.date).toLocaleDateString()}</div>
-                </div>
-                ${entry.title ? `<div style="font-size: 1.125rem; font-weight: 600; margin-bottom: 0.75rem; color: var(--text-primary);">${entry.title}</div>` : ''}
-                <div style="color: var(--text-secondary); line-height: 1.6; margin-bottom: 1rem;">${entry.content}</div>
-                ${entry.mood_before || entry.mood_after ?
-                    `<div class="item-meta"><div class="meta-item"><span class="meta-badge primary">Mood: ${entry.mood_before || '?'} → ${entry.mood_after || '?'}</span></div></div>` : ''}
-                ${entry.tags ? `<div class="item-meta" style="margin-top: 0.5rem;"><div class="meta-item"><span class="meta-badge">Tags: ${entry.tags}</span></div></div>` : ''}
-            `;
-
-            list.appendChild(entryDiv);
-        });
+    empty.classList.toggle('hidden', data.entries.length > 0);
+    list.classList.toggle('hidden', data.entries.length === 0);
+
+    renderJournalEntries(list, data.entries);
+}
+
+// Search snippets come escaped from the server, with only <mark> tags added
+function renderJournalEntries(list, entries, snippets = {}) {
+    list.innerHTML = '';
+    entries.forEach(entry => {
+        const entryDiv = document.createElement('div');
+        entryDiv.className = 'list-item';
+        const match = snippets[entry.id];
+        const title = match && match.title_highlight ? match.title_highlight : entry.title && escapeHtml(entry.title);
+        const content = match ? match.snippet : escapeHtml(entry.content);
+
+        entryDiv.innerHTML = `
+            <div class="item-header">
+                <div class="item-date">${new Date(entry.date).toLocaleDateString()}</div>
+            </div>
+            ${title ? `<div style="font-size: 1.125rem; font-weight: 600; margin-bottom: 0.75rem; color: var(--text-primary);">${title}</div>` : ''}
+            <div style="color: var(--text-secondary); line-height: 1.6; margin-bottom: 1rem;">${content}</div>
+            ${entry.mood_before || entry.mood_after ?
+                `<div class="item-meta"><div class="meta-item"><span class="meta-badge primary">Mood: ${entry.mood_before || '?'} → ${entry.mood_after || '?'}</span></div></div>` : ''}
+            ${entry.tags ? `<div class="item-meta" style="margin-top: 0.5rem;"><div class="meta-item"><span class="meta-badge">Tags: ${escapeHtml(entry.tags)}</span></div></div>` : ''}
+        `;
+
+        list.appendChild(entryDiv);
+    });
+}
 
-        list.classList.remove('hidden');
+let journalSearchTimer = null;
+
+function onJournalSearch(event) {
+    clearTimeout(journalSearchTimer);
+    journalSearchTimer = setTimeout(() => searchJournal(event.target.value.trim()), 250);
+}
+
+async function searchJournal(query) {
+    if (!query) {
+        loadJournalEntries();
+        return;
+    }
+
+    const empty = document.getElementById('journal-empty');
+    const list = document.getElementById('journal-list');
+
+    try {
+        const params = new URLSearchParams({ q: query, prefix: 'true', limit: '50' });
+        const response = await fetch(`${API_BASE}/api/journal/search?${params}`);
+        if (!response.ok) throw new Error('Failed to search journal entries');
+
+        const data = await response.json();
+        const snippets = {};
+        data.results.forEach(result => { snippets[result.entry.id] = result; });
+
+        empty.classList.toggle('hidden', data.results.length > 0);
+        list.classList.toggle('hidden', data.results.length === 0);
+        renderJournalEntries(list, data.results.map(result => result.entry), snippets);
     } catch (error) {
-        loading.classList.add('hidden');
-        showMessage('Failed to load journal entries', 'error');
+        showMessage('Failed to search journal entries', 'error');
     }
 }
 
@@ -368,68 +494,49 @@ async function createActivity(event) {
 
         showMessage('Activity logged successfully!');
         hideActivityForm();
-        loadActivities();
-        loadDashboardStats();
+        showSaved('activity', data);
     } catch (error) {
         console.error('Error creating activity:', error);
         showMessage(error.message || 'Failed to log activity. Please try again.', 'error');
     }
 }
 
-async function loadActivities() {
-    const container = document.getElementById('activities-list');
+function renderActivities(data) {
     const loading = document.getElementById('activities-loading');
     const empty = document.getElementById('activities-empty');
     const list = document.getElementById('activities-content');
 
-    try {
-        loading.classList.remove('hidden');
-        empty.classList.add('hidden');
-        list.classList.add('hidden');
-
-        const response = await fetch(`${API_BASE}/api/activities`);
-        if (!response.ok) throw new Error('Failed to load activities');
-
-        const data = await response.json();
-        loading.classList.add('hidden');
+    loading.classList.add('hidden');
 
-        if (data.activities.length === 0) {
-            empty.classList.remove('hidden');
-            return;
-        }
+    empty.classList.toggle('hidden', data.activities.length > 0);
+    list.classList.toggle('hidden', data.activities.length === 0);
 
-        list.innerHTML = '';
-        data.activities.forEach(activity => {
-            const activityDiv = document.createElement('div');
-            activityDiv.className = 'list-item';
-
-            const typeEmoji = activity.activity_type === 'meditation' ? '🧘' :
-                            activity.activity_type === 'exercise' ? '💪' :
-                            activity.activity_type === 'reading' ? '📚' : '✨';
-
-            const moodImpactClass = activity.mood_impact > 0 ? 'success' : activity.mood_impact < 0 ? 'warning' : '';
-            
-            activityDiv.innerHTML = `
-                <div class="item-header">
-                    <div style="font-weight: 600; color: var(--text-primary);">${typeEmoji} ${activity.activity_type.charAt(0).toUpperCase() + activity.activity_type.slice(1).replace('_', ' ')}</div>
-                    <div class="item-date">${new Date(activity.date).toLocaleDateString()}</div>
-                </div>
-                <div class="item-meta">
-                    ${activity.duration_minutes ? `<div class="meta-item"><span class="meta-badge">⏱ ${activity.duration_minutes} min</span></div>` : ''}
-                    ${activity.mood_impact ? `<div class="meta-item"><span class="meta-badge ${moodImpactClass}">${activity.mood_impact > 0 ? '+' : ''}${activity.mood_impact} Impact</span></div>` : ''}
-                </div>
-                ${activity.description ? `<div style="margin-top: 1rem; color: var(--text-secondary);">${activity.description}</div>` : ''}
-                ${activity.notes ? `<div style="margin-top: 0.75rem; color: var(--text-muted); font-size: 0.875rem;">${activity.notes}</div>` : ''}
-            `;
+    list.innerHTML = '';
+    data.activities.forEach(activity => {
+        const activityDiv = document.createElement('div');
+        activityDiv.className = 'list-item';
 
-            list.appendChild(activityDiv);
-        });
+        const typeEmoji = activity.activity_type === 'meditation' ? '🧘' :
+                        activity.activity_type === 'exercise' ? '💪' :
+                        activity.activity_type === 'reading' ? '📚' : '✨';
 
-        list.classList.remove('hidden');
-    } catch (error) {
-        loading.classList.add('hidden');
-        showMessage('Failed to load activities', 'error');
-    }
+        const moodImpactClass = activity.mood_impact > 0 ? 'success' : activity.mood_impact < 0 ? 'warning' : '';
+        
+        activityDiv.innerHTML = `
+            <div class="item-header">
+                <div style="font-weight: 600; color: var(--text-primary);">${typeEmoji} ${escapeHtml(activity.activity_type.charAt(0).toUpperCase() + activity.activity_type.slice(1).replace('_', ' '))}</div>
+                <div class="item-date">${new Date(activity.date).toLocaleDateString()}</div>
+            </div>
+            <div class="item-meta">
+                ${activity.duration_minutes ? `<div class="meta-item"><span class="meta-badge">⏱ ${activity.duration_minutes} min</span></div>` : ''}
+                ${activity.mood_impact ? `<div class="meta-item"><span class="meta-badge ${moodImpactClass}">${activity.mood_impact > 0 ? '+' : ''}${activity.mood_impact} Impact</span></div>` : ''}
+            </div>
+            ${activity.description ? `<div style="margin-top: 1rem; color: var(--text-secondary);">${escapeHtml(activity.description)}</div>` : ''}
+            ${activity.notes ? `<div style="margin-top: 0.75rem; color: var(--text-muted); font-size: 0.875rem;">${escapeHtml(activity.notes)}</div>` : ''}
+        `;
+
+        list.appendChild(activityDiv);
+    });
 }
 
 // Goals functionality
@@ -490,64 +597,45 @@ async function createGoal(event) {
 
         showMessage('Goal created successfully!');
         hideGoalForm();
-        loadGoals();
-        loadDashboardStats();
+        showSaved('goal', data);
     } catch (error) {
         console.error('Error creating goal:', error);
         showMessage(error.message || 'Failed to create goal. Please try again.', 'error');
     }
 }
 
-async function loadGoals() {
-    const container = document.getElementById('goals-list');
+function renderGoals(data) {
     const loading = document.getElementById('goals-loading');
     const empty = document.getElementById('goals-empty');
     const list = document.getElementById('goals-content');
 
-    try {
-        loading.classList.remove('hidden');
-        empty.classList.add('hidden');
-        list.classList.add('hidden');
-
-        const response = await fetch(`${API_BASE}/api/goals`);
-        if (!response.ok) throw new Error('Failed to load goals');
-
-        const data = await response.json();
-        loading.classList.add('hidden');
-
-        if (data.goals.length === 0) {
-            empty.classList.remove('hidden');
-            return;
-        }
-
-        list.innerHTML = '';
-        data.goals.forEach(goal => {
-            const goalDiv = document.createElement('div');
-            goalDiv.className = 'list-item';
-
-            const progressPercent = goal.target_value ? Math.min((goal.current_value / goal.target_value) * 100, 100) : 0;
-            const statusEmoji = goal.is_completed ? '✅' : progressPercent >= 75 ? '🚀' : '🎯';
-
-            goalDiv.innerHTML = `
-                <div class="item-header">
-                    <div style="font-weight: 600; color: var(--text-primary); font-size: 1.125rem;">${statusEmoji} ${goal.title}</div>
-                    <div class="meta-badge ${goal.is_completed ? 'success' : 'primary'}">${goal.is_completed ? 'Completed' : 'Active'}</div>
-                </div>
-                ${goal.description ? `<div style="margin-top: 0.75rem; color: var(--text-secondary);">${goal.description}</div>` : ''}
-                <div class="item-meta" style="margin-top: 1rem;">
-                    <div class="meta-item"><span class="meta-badge primary">Progress: ${goal.current_value}${goal.target_value ? ` / ${goal.target_value}` : ''}</span></div>
-                    ${goal.target_date ? `<div class="meta-item"><span class="meta-badge">Target: ${new Date(goal.target_date).toLocaleDateString()}</span></div>` : ''}
-                </div>
-            `;
-
-            list.appendChild(goalDiv);
-        });
-
-        list.classList.remove('hidden');
-    } catch (error) {
-        loading.classList.add('hidden');
-        showMessage('Failed to load goals', 'error');
-    }
+    loading.classList.add('hidden');
+
+    empty.classList.toggle('hidden', data.goals.length > 0);
+    list.classList.toggle('hidden', data.goals.length === 0);
+
+    list.innerHTML = '';
+    data.goals.forEach(goal => {
+        const goalDiv = document.createElement('div');
+        goalDiv.className = 'list-item';
+
+        const progressPercent = goal.target_value ? Math.min((goal.current_value / goal.target_value) * 100, 100) : 0;
+        const statusEmoji = goal.is_completed ? '✅' : progressPercent >= 75 ? '🚀' : '🎯';
+
+        goalDiv.innerHTML = `
+            <div class="item-header">
+                <div style="font-weight: 600; color: var(--text-primary); font-size: 1.125rem;">${statusEmoji} ${escapeHtml(goal.title)}</div>
+                <div class="meta-badge ${goal.is_completed ? 'success' : 'primary'}">${goal.is_completed ? 'Completed' : 'Active'}</div>
+            </div>
+            ${goal.description ? `<div style="margin-top: 0.75rem; color: var(--text-secondary);">${escapeHtml(goal.description)}</div>` : ''}
+            <div class="item-meta" style="margin-top: 1rem;">
+                <div class="meta-item"><span class="meta-badge primary">Progress: ${goal.current_value}${goal.target_value ? ` / ${goal.target_value}` : ''}</span></div>
+                ${goal.target_date ? `<div class="meta-item"><span class="meta-badge">Target: ${new Date(goal.target_date).toLocaleDateString()}</span></div>` : ''}
+            </div>
+        `;
+
+        list.appendChild(goalDiv);
+    });
 }
 
 // Range input updates
@@ -564,13 +652,11 @@ document.addEventListener('input', function(e) {
 // Initialize the app
 async function init() {
     try {
-        await Promise.all([
-            loadDashboardStats(),
-            loadMoodEntries(),
-            loadJournalEntries(),
-            loadActivities(),
-            loadGoals()
-        ]);
+        if (window.EventSource) {
+            connectLiveUpdates();
+        } else {
+            await loadDashboard();
+        }
 
         // Set default tab
         showTab('mood');
@@ -613,6 +699,11 @@ function setupEventListeners() {
             console.warn('Goal form not found');
         }
 
+        const journalSearch = document.getElementById('journal-search');
+        if (journalSearch) {
+            journalSearch.addEventListener('input', onJournalSearch);
+        }
+
         // Button click handlers
         const addMoodBtn = document.getElementById('add-mood-btn');
         const addJournalBtn = document.getElementById('add-journal-btn');